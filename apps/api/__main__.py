@@ -1,19 +1,25 @@
+import typing as t
 from logging import getLogger
+from uuid import UUID
 
 from flasgger import Swagger, swag_from
 from flask import Flask
 from flask_restful import Api
 from openai import OpenAI
-from psycopg import connect
 
 from apps.web.conf import init_settings
 from internal.delivery.api.delivery import Delivery
+from internal.repository.factory import new_storages
 from internal.repository.receipt.recognizer.openai.chat_v2 import OpenIAChatV2
-from internal.repository.receipt.storage.postgres.repository import Repository as ReceiptStorage
-from internal.repository.receipt_item.storage.postgres.repository import Repository as ReceiptItemStorage
+from internal.repository.receipt.storage.archive.repository import Repository as ReceiptArchive
+from internal.repository.receipt.storage.cache.repository import Repository as ReceiptCache
+from internal.repository.receipt_item.storage.postgres.repository import RECEIPT_CHANGED_CHANNEL
 from internal.usecase.receipt.read import ReceiptReadUseCase
 from internal.usecase.receipt.recognize import ReceiptRecognizeUseCase
+from internal.usecase.receipt.search import ReceiptSearchUseCase
 from pkg.log import init_logging
+from pkg.cache import LRUCache
+from pkg.postgres import Listener
 
 app = Flask(__name__)
 
@@ -31,18 +37,44 @@ logger = getLogger("web_api")
 
 logger.info("init app")
 
-postgresql_conn = connect(
-    conninfo=settings.postgresql_url.unicode_string()
-)
-receipt_item_storage = ReceiptItemStorage(
-    conn=postgresql_conn
-)
-receipt_storage = ReceiptStorage(
-    conn=postgresql_conn,
-    item_repo=receipt_item_storage,
-)
+storages = new_storages(settings)
+receipt_reader = storages.receipts
+if settings.receipt_archive_path is not None:
+    receipt_reader = ReceiptArchive(
+        reader=storages.receipts,
+        path=settings.receipt_archive_path,
+    )
+receipt_cached_reader = receipt_reader
+receipt_listener = None
+# cached receipts are evicted on the notifications of postgres, sqlite has none and
+# those of the shards are not listened to
+if (
+        settings.receipt_cache_max_bytes > 0
+        and settings.database_url.scheme != "sqlite"
+        and not settings.postgresql_shard_urls
+):
+    receipt_cached_reader = ReceiptCache(
+        reader=receipt_reader,
+        cache=LRUCache(
+            max_bytes=settings.receipt_cache_max_bytes,
+            ttl=settings.receipt_cache_ttl,
+        ),
+    )
+
+    def receipt_changed(payload: str):
+        receipt_cached_reader.evict(payload)
+        # the reads filling the cache again must not get the receipt from a lagging replica
+        storages.pool.written(UUID(payload))
+
+    receipt_listener = Listener(
+        conninfo=settings.database_url.unicode_string(),
+        channel=RECEIPT_CHANGED_CHANNEL,
+        on_notify=receipt_changed,
+        on_reset=receipt_cached_reader.clear,
+    )
 receipt_reader_uc = ReceiptReadUseCase(
-    reader=receipt_storage,
+    reader=receipt_cached_reader,
+    settlement_reader=storages.settlements,
 )
 openai_client = OpenAI(
     api_key=settings.openai_api_key.get_secret_value()
@@ -53,11 +85,15 @@ receipt_recognizer = OpenIAChatV2(
 )
 receipt_recognizer_uc = ReceiptRecognizeUseCase(
     recognizer=receipt_recognizer,
-    creator=receipt_storage,
+    creator=storages.receipts,
+)
+receipt_searcher_uc = ReceiptSearchUseCase(
+    searcher=storages.receipts,
 )
 delivery = Delivery(
     receipt_reader_uc,
     receipt_recognizer_uc,
+    receipt_searcher_uc,
     flask_app=app,
     flask_api=api,
     host=settings.web_host,
@@ -66,15 +102,18 @@ delivery = Delivery(
 
 
 class App:
-    def __init__(self, http_listener: Delivery):
+    def __init__(self, http_listener: Delivery, receipt_listener: t.Optional[Listener] = None):
         self.http_listener = http_listener
+        self.receipt_listener = receipt_listener
 
     def start(self):
+        if self.receipt_listener is not None:
+            self.receipt_listener.start()
         self.http_listener.start()
 
 
 if __name__ == "__main__":
-    web_app = App(http_listener=delivery)
+    web_app = App(http_listener=delivery, receipt_listener=receipt_listener)
 
     logger.info("start rest api")
 
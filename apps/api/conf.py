@@ -1,19 +1,19 @@
+import typing as t
+
 from dotenv import load_dotenv
 from pydantic import (
     Field,
     HttpUrl,
     SecretStr,
-    PostgresDsn,
-)
-from pydantic_settings import (
-    BaseSettings,
-    SettingsConfigDict,
 )
+from pydantic_settings import SettingsConfigDict
+
+from internal.repository.factory import StorageSettings
 
 load_dotenv()
 
 
-class Settings(BaseSettings, case_sensitive=False):
+class Settings(StorageSettings):
     model_config = SettingsConfigDict(
         env_nested_delimiter='__',
         env_file='.env',
@@ -36,7 +36,17 @@ class Settings(BaseSettings, case_sensitive=False):
     logging_level: str = Field(
         default="INFO"
     )
-    postgresql_url: PostgresDsn
+    # receipts archived by apps.partition, read when they are not in the database
+    receipt_archive_path: t.Optional[str] = Field(
+        default=None
+    )
+    # in-process cache of the receipts read by uuid, disabled when 0
+    receipt_cache_max_bytes: int = Field(
+        default=64 * 1024 * 1024
+    )
+    receipt_cache_ttl: float = Field(
+        default=300.0
+    )
 
 
 def init_settings() -> Settings:
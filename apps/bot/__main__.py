@@ -1,13 +1,11 @@
 from openai import OpenAI
-from psycopg import connect
 from telebot import TeleBot
 from logging import getLogger
 
 from pkg.log import init_logging
 from internal.delivery.telegram_bot.delivery import Delivery
+from internal.repository.factory import new_storages
 from internal.repository.receipt.recognizer.openai.chat_v2 import OpenIAChatV2
-from internal.repository.receipt.storage.postgres.repository import Repository as ReceiptStorage
-from internal.repository.receipt_item.storage.postgres.repository import Repository as ReceiptItemStorage
 from internal.usecase.receipt.recognize import ReceiptRecognizeUseCase
 
 from apps.bot.conf import init_settings
@@ -26,27 +24,18 @@ telegram_bot = TeleBot(
 openai_client = OpenAI(
     api_key=settings.openai_api_key.get_secret_value()
 )
-postgresql_conn = connect(
-    conninfo=settings.postgresql_url.unicode_string()
-)
 receipt_recognizer = OpenIAChatV2(
     openai_client,
     model=settings.openai_model
 )
-receipt_item_storage = ReceiptItemStorage(
-    conn=postgresql_conn
-)
-receipt_storage = ReceiptStorage(
-    conn=postgresql_conn,
-    item_repo=receipt_item_storage,
-)
+storages = new_storages(settings)
 
 delivery = Delivery(
     bot=telegram_bot,
     url=settings.url,
     receipt_recognizer_uc=ReceiptRecognizeUseCase(
         recognizer=receipt_recognizer,
-        creator=receipt_storage,
+        creator=storages.receipts,
     )
 )
 
@@ -3,17 +3,15 @@ from pydantic import (
     Field,
     HttpUrl,
     SecretStr,
-    PostgresDsn,
-)
-from pydantic_settings import (
-    BaseSettings,
-    SettingsConfigDict,
 )
+from pydantic_settings import SettingsConfigDict
+
+from internal.repository.factory import StorageSettings
 
 load_dotenv()
 
 
-class Settings(BaseSettings, case_sensitive=False):
+class Settings(StorageSettings):
     model_config = SettingsConfigDict(
         env_nested_delimiter='__',
         env_file='.env',
@@ -28,7 +26,6 @@ class Settings(BaseSettings, case_sensitive=False):
     openai_api_url: HttpUrl
     openai_model: str
     ollama_model: str
-    postgresql_url: PostgresDsn
 
 
 def init_settings() -> Settings:
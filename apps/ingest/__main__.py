@@ -0,0 +1,43 @@
+from logging import getLogger
+
+from apps.ingest.conf import init_settings
+from internal.delivery.cli.ingest import IngestDelivery
+from internal.repository.factory import new_storages
+from internal.usecase.receipt.ingest import ReceiptIngestUseCase
+from pkg.log import init_logging
+
+settings = init_settings()
+
+init_logging()
+
+logger = getLogger("ingest")
+
+logger.info("init app")
+
+storages = new_storages(settings)
+delivery = IngestDelivery(
+    receipt_ingest_uc=ReceiptIngestUseCase(
+        creator=storages.receipts,
+        batch_size=settings.ingest_batch_size,
+    )
+)
+
+
+class App:
+    def __init__(self, cli_listener: IngestDelivery):
+        self.cli_listener = cli_listener
+
+    def start(self):
+        self.cli_listener.start()
+
+
+if __name__ == "__main__":
+    ingest_app = App(cli_listener=delivery)
+
+    logger.info("start ingest")
+
+    ingest_app.start()
+
+    storages.timer.report()
+
+    storages.close()
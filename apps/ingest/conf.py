@@ -0,0 +1,25 @@
+from dotenv import load_dotenv
+from pydantic import Field
+from pydantic_settings import SettingsConfigDict
+
+from internal.repository.factory import StorageSettings
+
+load_dotenv()
+
+
+class Settings(StorageSettings):
+    model_config = SettingsConfigDict(
+        env_nested_delimiter='__',
+        env_file='.env',
+        env_file_encoding='utf-8'
+    )
+    logging_level: str = Field(
+        default="INFO"
+    )
+    ingest_batch_size: int = Field(
+        default=1000
+    )
+
+
+def init_settings() -> Settings:
+    return Settings()
@@ -0,0 +1,74 @@
+import typing as t
+from logging import getLogger
+
+from apps.migrate.conf import init_settings
+from internal.repository.migrations import migrations
+from internal.repository.migrations.sqlite import migrations as sqlite_migrations
+from pkg.log import init_logging
+from pkg.postgres import Pool, Migrator
+from pkg.sqlite import Database, Migrator as SqliteMigrator, database_path
+
+settings = init_settings()
+
+init_logging()
+
+logger = getLogger("migrate")
+
+logger.info("init app")
+
+shard_pools = {}
+if settings.database_url.scheme == "sqlite":
+    storage_pool = Database(
+        path=database_path(settings.database_url),
+        max_size=1,
+    )
+    migrators = [
+        SqliteMigrator(
+            db=storage_pool,
+            migrations=sqlite_migrations(),
+        )
+    ]
+else:
+    storage_pool = Pool(
+        conninfo=settings.database_url.unicode_string(),
+        min_size=1,
+        max_size=1,
+    )
+    # the shards get the same schema as the database of the directory
+    shard_pools = {
+        shard: Pool(
+            conninfo=url.unicode_string(),
+            min_size=1,
+            max_size=1,
+        )
+        for shard, url in settings.postgresql_shard_urls.items()
+    }
+    migrators = [
+        Migrator(
+            pool=pool,
+            migrations=migrations(),
+        )
+        for pool in [storage_pool, *shard_pools.values()]
+    ]
+
+
+class App:
+    def __init__(self, schema_migrators: t.List[t.Union[Migrator, SqliteMigrator]]):
+        self.schema_migrators = schema_migrators
+
+    def start(self):
+        for schema_migrator in self.schema_migrators:
+            applied = schema_migrator.migrate()
+            logger.info("schema is up to date: applied=%s" % [m.version for m in applied])
+
+
+if __name__ == "__main__":
+    migrate_app = App(schema_migrators=migrators)
+
+    logger.info("start migrate")
+
+    migrate_app.start()
+
+    for pool in shard_pools.values():
+        pool.close()
+    storage_pool.close()
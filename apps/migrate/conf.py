@@ -0,0 +1,41 @@
+import typing as t
+
+from dotenv import load_dotenv
+from pydantic import (
+    AliasChoices,
+    Field,
+    PostgresDsn,
+)
+from pydantic_settings import (
+    BaseSettings,
+    SettingsConfigDict,
+)
+
+from pkg.sqlite import SqliteDsn
+
+load_dotenv()
+
+
+class Settings(BaseSettings, case_sensitive=False):
+    model_config = SettingsConfigDict(
+        env_nested_delimiter='__',
+        env_file='.env',
+        env_file_encoding='utf-8'
+    )
+    logging_level: str = Field(
+        default="INFO"
+    )
+    # postgresql://... or sqlite:///path/to/receipts.db for single node deployments,
+    # also read from POSTGRESQL_URL
+    database_url: t.Union[PostgresDsn, SqliteDsn] = Field(
+        validation_alias=AliasChoices("database_url", "postgresql_url")
+    )
+    # postgres shards of the receipts and users by name, e.g. {"s1": "postgresql://..."},
+    # the directory of the users staying on the database above; unsharded when empty
+    postgresql_shard_urls: t.Dict[str, PostgresDsn] = Field(
+        default={}
+    )
+
+
+def init_settings() -> Settings:
+    return Settings()
@@ -0,0 +1,46 @@
+from logging import getLogger
+
+from apps.partition.conf import init_settings
+from internal.repository.receipt.storage.postgres.repository import PARTITIONED_TABLES
+from pkg.log import init_logging
+from pkg.postgres import Pool, Partitioner
+
+settings = init_settings()
+
+init_logging()
+
+logger = getLogger("partition")
+
+logger.info("init app")
+
+postgresql_pool = Pool(
+    conninfo=settings.postgresql_url.unicode_string(),
+    min_size=1,
+    max_size=1,
+)
+partitioner = Partitioner(
+    pool=postgresql_pool,
+    tables=PARTITIONED_TABLES,
+    archive_path=settings.receipt_archive_path,
+    months_ahead=settings.partition_months_ahead,
+    retention_months=settings.partition_retention_months,
+)
+
+
+class App:
+    def __init__(self, receipt_partitioner: Partitioner):
+        self.receipt_partitioner = receipt_partitioner
+
+    def start(self):
+        archived = self.receipt_partitioner.run()
+        logger.info("receipt partitions are up to date: archived=%s" % archived)
+
+
+if __name__ == "__main__":
+    partition_app = App(receipt_partitioner=partitioner)
+
+    logger.info("start partition")
+
+    partition_app.start()
+
+    postgresql_pool.close()
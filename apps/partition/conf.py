@@ -0,0 +1,39 @@
+import typing as t
+
+from dotenv import load_dotenv
+from pydantic import (
+    Field,
+    PostgresDsn,
+)
+from pydantic_settings import (
+    BaseSettings,
+    SettingsConfigDict,
+)
+
+load_dotenv()
+
+
+class Settings(BaseSettings, case_sensitive=False):
+    model_config = SettingsConfigDict(
+        env_nested_delimiter='__',
+        env_file='.env',
+        env_file_encoding='utf-8'
+    )
+    logging_level: str = Field(
+        default="INFO"
+    )
+    postgresql_url: PostgresDsn
+    partition_months_ahead: int = Field(
+        default=3
+    )
+    # months of receipts kept in the database, older ones are archived; kept forever when unset
+    partition_retention_months: t.Optional[int] = Field(
+        default=None
+    )
+    receipt_archive_path: str = Field(
+        default="archive"
+    )
+
+
+def init_settings() -> Settings:
+    return Settings()
@@ -0,0 +1,79 @@
+import typing as t
+from argparse import ArgumentParser
+from logging import getLogger
+
+from apps.reshard.conf import init_settings
+from internal.repository.shard.directory import Directory
+from internal.repository.shard.mover import Mover
+from pkg.log import init_logging
+from pkg.postgres import Pool, HashRing
+
+settings = init_settings()
+
+init_logging()
+
+logger = getLogger("reshard")
+
+logger.info("init app")
+
+postgresql_pool = Pool(
+    conninfo=settings.postgresql_url.unicode_string(),
+    min_size=1,
+    max_size=1,
+)
+shard_pools = {
+    shard: Pool(
+        conninfo=url.unicode_string(),
+        min_size=1,
+        max_size=2,
+        name=shard,
+    )
+    for shard, url in settings.postgresql_shard_urls.items()
+}
+shard_directory = Directory(
+    pool=postgresql_pool,
+    ring=HashRing(shard_pools),
+)
+mover = Mover(
+    directory=shard_directory,
+    pools=shard_pools,
+)
+
+
+class App:
+    # moves the users not on the shard the ring gives for them (e.g. after adding a
+    # shard to POSTGRESQL_SHARD_URLS), or one user to the given shard
+    def __init__(self, user_mover: Mover, directory: Directory):
+        self.user_mover = user_mover
+        self.directory = directory
+        self.parser = ArgumentParser(description="move users between the postgres shards")
+        self.parser.add_argument("--dry-run", action="store_true", help="only list the users to move")
+        self.parser.add_argument("--user-id", type=int, help="move this user only")
+        self.parser.add_argument("--to", choices=directory.shards(), help="shard to move the user to (the ring's one)")
+
+    def start(self, argv: t.Optional[t.List[str]] = None):
+        args = self.parser.parse_args(argv)
+        if args.user_id is not None:
+            moves = [(args.user_id, args.to or self.directory.ring_shard(args.user_id))]
+        else:
+            moves = list(self.user_mover.misplaced())
+
+        moved = 0
+        for user_id, shard in moves:
+            if args.dry_run:
+                logger.info("user to move: user_id=%d, to=%s" % (user_id, shard))
+                continue
+            moved += self.user_mover.move(user_id, shard)
+        logger.info("users are on their shards: to_move=%d, moved=%d" % (len(moves), moved))
+
+
+if __name__ == "__main__":
+    reshard_app = App(user_mover=mover, directory=shard_directory)
+
+    logger.info("start reshard")
+
+    reshard_app.start()
+
+    for pool in shard_pools.values():
+        pool.close()
+    postgresql_pool.close()
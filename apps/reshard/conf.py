@@ -0,0 +1,32 @@
+import typing as t
+
+from dotenv import load_dotenv
+from pydantic import (
+    Field,
+    PostgresDsn,
+)
+from pydantic_settings import (
+    BaseSettings,
+    SettingsConfigDict,
+)
+
+load_dotenv()
+
+
+class Settings(BaseSettings, case_sensitive=False):
+    model_config = SettingsConfigDict(
+        env_nested_delimiter='__',
+        env_file='.env',
+        env_file_encoding='utf-8'
+    )
+    logging_level: str = Field(
+        default="INFO"
+    )
+    # the database of the shard directory
+    postgresql_url: PostgresDsn
+    # postgres shards of the receipts and users by name, as for the other apps
+    postgresql_shard_urls: t.Dict[str, PostgresDsn]
+
+
+def init_settings() -> Settings:
+    return Settings()
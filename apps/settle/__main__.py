@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, UTC
+from logging import getLogger
+
+from apps.settle.conf import init_settings
+from internal.repository.receipt_settlement.storage.postgres.repository import Repository as SettlementStorage
+from internal.repository.receipt_settlement.storage.sharded.repository import Repository as ShardedSettlementStorage
+from internal.repository.shard.directory import Directory
+from internal.usecase.adapters.receipt.settlement import IRepairer
+from pkg.log import init_logging
+from pkg.postgres import Pool, HashRing
+
+settings = init_settings()
+
+init_logging()
+
+logger = getLogger("settle")
+
+logger.info("init app")
+
+postgresql_pool = Pool(
+    conninfo=settings.postgresql_url.unicode_string(),
+    min_size=1,
+    max_size=1,
+)
+settlement_storage = SettlementStorage(
+    pool=postgresql_pool
+)
+# the settlements of the shards are repaired shard by shard
+shard_pools = {
+    shard: Pool(
+        conninfo=url.unicode_string(),
+        min_size=1,
+        max_size=1,
+        name=shard,
+    )
+    for shard, url in settings.postgresql_shard_urls.items()
+}
+if shard_pools:
+    settlement_storage = ShardedSettlementStorage(
+        directory=Directory(
+            pool=postgresql_pool,
+            ring=HashRing(shard_pools),
+        ),
+        repos={shard: SettlementStorage(pool=pool) for shard, pool in shard_pools.items()},
+    )
+
+
+class App:
+    def __init__(self, settlement_repairer: IRepairer):
+        self.settlement_repairer = settlement_repairer
+
+    def start(self):
+        since = None
+        if settings.settlement_repair_days is not None:
+            since = datetime.now(UTC) - timedelta(days=settings.settlement_repair_days)
+
+        repaired = self.settlement_repairer.repair(since)
+        logger.info("receipt settlements are up to date: since=%s, repaired=%d" % (since, repaired))
+
+
+if __name__ == "__main__":
+    settle_app = App(settlement_repairer=settlement_storage)
+
+    logger.info("start settle")
+
+    settle_app.start()
+
+    for pool in shard_pools.values():
+        pool.close()
+    postgresql_pool.close()
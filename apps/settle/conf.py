@@ -0,0 +1,38 @@
+import typing as t
+
+from dotenv import load_dotenv
+from pydantic import (
+    Field,
+    PostgresDsn,
+)
+from pydantic_settings import (
+    BaseSettings,
+    SettingsConfigDict,
+)
+
+load_dotenv()
+
+
+class Settings(BaseSettings, case_sensitive=False):
+    model_config = SettingsConfigDict(
+        env_nested_delimiter='__',
+        env_file='.env',
+        env_file_encoding='utf-8'
+    )
+    logging_level: str = Field(
+        default="INFO"
+    )
+    postgresql_url: PostgresDsn
+    # postgres shards of the receipts and users by name, e.g. {"s1": "postgresql://..."},
+    # the directory of the users staying on the database above; unsharded when empty
+    postgresql_shard_urls: t.Dict[str, PostgresDsn] = Field(
+        default={}
+    )
+    # days of receipts whose settlements are checked; all of them when unset
+    settlement_repair_days: t.Optional[int] = Field(
+        default=31
+    )
+
+
+def init_settings() -> Settings:
+    return Settings()
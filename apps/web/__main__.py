@@ -1,22 +1,26 @@
+import typing as t
 from logging import getLogger
+from uuid import UUID
 
 from flask import Flask
-from psycopg import connect
 
 from apps.web.conf import init_settings
 from internal.delivery.http.delivery import Delivery
 from internal.delivery.http.handler.login import LoginHandler
 from internal.delivery.http.handler.show import ShowHandler
 from internal.delivery.http.handler.split import SplitHandler
-from internal.repository.receipt.storage.postgres.repository import Repository as ReceiptStorage
-from internal.repository.receipt_item.storage.postgres.repository import Repository as ReceiptItemStorage
-from internal.repository.user.storage.postgres.repository import Repository as UserStorage
+from internal.repository.factory import new_storages
+from internal.repository.receipt.storage.archive.repository import Repository as ReceiptArchive
+from internal.repository.receipt.storage.cache.repository import Repository as ReceiptCache
+from internal.repository.receipt_item.storage.postgres.repository import RECEIPT_CHANGED_CHANNEL
 from internal.usecase.receipt.read import ReceiptReadUseCase
 from internal.usecase.receipt.split import ReceiptSplitUseCase
 from internal.usecase.user.read import UserReadUseCase
 from internal.usecase.user.session import UserSessionUseCase
 from pkg.auth.telegram import TelegramAuth
 from pkg.log import init_logging
+from pkg.cache import LRUCache
+from pkg.postgres import Listener
 
 app = Flask(__name__, template_folder="../../internal/delivery/http/handler/templates")
 
@@ -30,26 +34,49 @@ logger = getLogger("web_api")
 
 logger.info("init app")
 
-postgresql_conn = connect(
-    conninfo=settings.postgresql_url.unicode_string()
-)
-receipt_item_storage = ReceiptItemStorage(
-    conn=postgresql_conn
-)
-receipt_storage = ReceiptStorage(
-    conn=postgresql_conn,
-    item_repo=receipt_item_storage,
-)
+storages = new_storages(settings)
+receipt_reader = storages.receipts
+if settings.receipt_archive_path is not None:
+    receipt_reader = ReceiptArchive(
+        reader=storages.receipts,
+        path=settings.receipt_archive_path,
+    )
+receipt_cached_reader = receipt_reader
+receipt_listener = None
+# cached receipts are evicted on the notifications of postgres, sqlite has none and
+# those of the shards are not listened to
+if (
+        settings.receipt_cache_max_bytes > 0
+        and settings.database_url.scheme != "sqlite"
+        and not settings.postgresql_shard_urls
+):
+    receipt_cached_reader = ReceiptCache(
+        reader=receipt_reader,
+        cache=LRUCache(
+            max_bytes=settings.receipt_cache_max_bytes,
+            ttl=settings.receipt_cache_ttl,
+        ),
+    )
+
+    def receipt_changed(payload: str):
+        receipt_cached_reader.evict(payload)
+        # the reads filling the cache again must not get the receipt from a lagging replica
+        storages.pool.written(UUID(payload))
+
+    receipt_listener = Listener(
+        conninfo=settings.database_url.unicode_string(),
+        channel=RECEIPT_CHANGED_CHANNEL,
+        on_notify=receipt_changed,
+        on_reset=receipt_cached_reader.clear,
+    )
 
-user_storage = UserStorage(
-    conn=postgresql_conn
-)
 user_uc = UserReadUseCase(
-    reader=user_storage,
-    creator=user_storage
+    reader=storages.users,
+    upserter=storages.users
 )
 receipt_reader_uc = ReceiptReadUseCase(
-    reader=receipt_storage,
+    reader=receipt_cached_reader,
+    settlement_reader=storages.settlements,
 )
 user_session_uc = UserSessionUseCase(
     user_uc=user_uc
@@ -68,13 +95,16 @@ delivery = Delivery(
         receipt_read_us=receipt_reader_uc,
         receipt_split_uc=ReceiptSplitUseCase(
             user_uc=user_uc,
-            receipt_item_updater=receipt_item_storage,
+            # retries read the receipt as it is after a conflict, not a cached one
+            receipt_reader=receipt_reader,
+            receipt_item_updater=storages.receipt_items,
         ),
     ),
     receipt_show_handler=ShowHandler(
         user_session_uc=user_session_uc,
         receipt_reader_uc=ReceiptReadUseCase(
-            reader=receipt_storage,
+            reader=receipt_cached_reader,
+            settlement_reader=storages.settlements,
         ),
     ),
     flask_app=app,
@@ -84,16 +114,19 @@ delivery = Delivery(
 
 
 class App:
-    def __init__(self, http_listener: Delivery):
+    def __init__(self, http_listener: Delivery, receipt_listener: t.Optional[Listener] = None):
         self.http_listener = http_listener
+        self.receipt_listener = receipt_listener
 
     def start(self):
+        if self.receipt_listener is not None:
+            self.receipt_listener.start()
         self.http_listener.start()
 
 
 if __name__ == "__main__":
 
-    web_app = App(http_listener=delivery)
+    web_app = App(http_listener=delivery, receipt_listener=receipt_listener)
 
     logger.info("start web web")
 
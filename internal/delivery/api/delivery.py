@@ -6,13 +6,17 @@ from flask import Flask, request, jsonify
 from flask_restful import Api, Resource
 from pydantic import UUID4
 
-from internal.domain.receipt import ReceiptRecognizeError
+from internal.domain.receipt import ReceiptRecognizeError, ReceiptReadError, ReceiptSearchError
+from internal.domain.receipt.cursor import SearchCursor
 from internal.domain.user.id import UserId
-from internal.usecase.interface import IReceiptReadUC, IReceiptRecognizeUC
+from internal.usecase.interface import IReceiptReadUC, IReceiptRecognizeUC, IReceiptSearchUC
 from .convert import convert
 
 default_user_id = UserId(0)
 
+default_search_limit = 20
+max_search_limit = 100
+
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
 
@@ -33,6 +37,7 @@ class Delivery:
             self,
             receipt_reader_uc: IReceiptReadUC,
             receipt_recognizer_uc: IReceiptRecognizeUC,
+            receipt_searcher_uc: IReceiptSearchUC,
             # flask attrs
             flask_app: Flask,
             flask_api: Api,
@@ -41,6 +46,7 @@ class Delivery:
     ):
         self.receipt_reader_uc = receipt_reader_uc
         self.receipt_recognizer_uc = receipt_recognizer_uc
+        self.receipt_searcher_uc = receipt_searcher_uc
 
         self.flask = flask_app
         self.api = flask_api
@@ -194,5 +200,121 @@ class Delivery:
 
                 return jsonify({"message": "not found"}), 404
 
+        class ReceiptResultsResource(Resource):
+
+            receipt_reader_uc = self.receipt_reader_uc
+
+            def get(self, receipt_id: str):
+                """
+                Receipt settlement API: what each user owes
+                ---
+                parameters:
+                  - in: path
+                    name: receipt_id
+                    type: string
+                    required: true
+                definitions:
+                  Result:
+                    type: object
+                    properties:
+                      username:
+                        type: string
+                      amount:
+                        type: number
+                      tips:
+                        type: number
+                responses:
+                  200:
+                    description: results
+                    schema:
+                      type: array
+                      items:
+                        $ref: '#/definitions/Result'
+                """
+
+                try:
+                    uuid = UUID4(receipt_id)
+                except pydantic.ValidationError as err:
+                    return {'error': "input receipt_uuid is not valid: %s" % str(err)}, 400
+
+                try:
+                    results = self.receipt_reader_uc.read_results(uuid)
+                except ReceiptReadError as err:
+                    return {'error': str(err)}, 500
+
+                return [result.model_dump() for result in results], 200
+
+        class ReceiptSearchResource(Resource):
+
+            receipt_searcher_uc = self.receipt_searcher_uc
+
+            def get(self):
+                """
+                Receipt search API: receipts of the user by store or product
+                ---
+                parameters:
+                  - in: query
+                    name: q
+                    type: string
+                    required: true
+                    description: store or product name, or a word of it
+                  - in: query
+                    name: limit
+                    type: integer
+                    required: false
+                  - in: query
+                    name: cursor
+                    type: string
+                    required: false
+                    description: next_cursor of the previous page
+                definitions:
+                  ReceiptMatch:
+                    type: object
+                    properties:
+                      score:
+                        type: number
+                      receipt:
+                        $ref: '#/definitions/Receipt'
+                responses:
+                  200:
+                    description: matches, best first
+                    schema:
+                      type: object
+                      properties:
+                        matches:
+                          type: array
+                          items:
+                            $ref: '#/definitions/ReceiptMatch'
+                        next_cursor:
+                          type: string
+                """
+
+                query = request.args.get('q', '')
+                try:
+                    limit = max(1, min(int(request.args.get('limit', default_search_limit)), max_search_limit))
+                except ValueError as err:
+                    return {'error': "input limit is not valid: %s" % str(err)}, 400
+
+                cursor = None
+                if request.args.get('cursor'):
+                    try:
+                        cursor = SearchCursor.from_string(request.args['cursor'])
+                    except (ValueError, pydantic.ValidationError) as err:
+                        return {'error': "input cursor is not valid: %s" % str(err)}, 400
+
+                try:
+                    matches = self.receipt_searcher_uc.search(default_user_id, query, limit, cursor)
+                except ReceiptSearchError as err:
+                    return {'error': str(err)}, 400
+                except ReceiptReadError as err:
+                    return {'error': str(err)}, 500
+
+                return {
+                    'matches': [match.model_dump() for match in matches],
+                    'next_cursor': matches[-1].cursor().string() if len(matches) == limit else None,
+                }, 200
+
         self.api.add_resource(ReceiptsResource, "/receipts")
+        self.api.add_resource(ReceiptSearchResource, "/receipts/search")
         self.api.add_resource(ReceiptResource, "/receipts/<string:receipt_id>")
+        self.api.add_resource(ReceiptResultsResource, "/receipts/<string:receipt_id>/results")
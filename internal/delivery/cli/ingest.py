@@ -0,0 +1,29 @@
+import typing as t
+from argparse import ArgumentParser
+from logging import getLogger
+
+from internal.domain.receipt import Receipt
+from internal.usecase.interface import IReceiptIngestUC
+
+logger = getLogger("cli.ingest")
+
+
+class IngestDelivery:
+    # loads receipts from JSON Lines files, one `Receipt` json document per line
+    def __init__(self, receipt_ingest_uc: IReceiptIngestUC):
+        self.receipt_ingest_uc = receipt_ingest_uc
+        self.parser = ArgumentParser(description="bulk load receipts from JSON Lines files")
+        self.parser.add_argument("paths", nargs="+", help="JSON Lines files with receipts")
+
+    def start(self, argv: t.Optional[t.List[str]] = None):
+        args = self.parser.parse_args(argv)
+        for path in args.paths:
+            created = self.receipt_ingest_uc.ingest(read_receipts(path))
+            logger.info("receipts ingested: path=%s, created=%d" % (path, created))
+
+
+def read_receipts(path: str) -> t.Iterator[Receipt]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield Receipt.model_validate_json(line)
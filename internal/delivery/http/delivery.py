@@ -1,3 +1,5 @@
+import typing as t
+
 from flask import Flask, request
 from pydantic import BaseModel, Field
 
@@ -10,8 +12,8 @@ class QueryParams(BaseModel):
     limit: int = Field(
         default=100
     )
-    offset: int = Field(
-        default=0
+    cursor: t.Optional[str] = Field(
+        default=None
     )
 
 
@@ -4,7 +4,7 @@ from flask import Request, render_template, redirect, url_for
 from pydantic import UUID4, ValidationError
 
 from internal.domain.receipt import ReceiptReadError
-from internal.domain.receipt.item import ReceiptItemSplitError, Choice
+from internal.domain.receipt.item import ReceiptItemSplitError, ReceiptItemConflictError, Choice
 from internal.domain.user import User
 from internal.usecase.interface import IReceiptReadUC, IReceiptSplitUC, IUserSessionUC
 
@@ -50,19 +50,27 @@ class SplitHandler:
                     **{"receipt": receipt, "user": user, "err": err}
                 )
             try:
-                self.receipt_split_uc.split(
+                receipt = self.receipt_split_uc.split(
                     receipt,
                     choices=choices,
                 )
-            except ReceiptItemSplitError as err:
+            except (ReceiptItemSplitError, ReceiptItemConflictError, ReceiptReadError) as err:
                 return render_template(
                     "receipt-split.html",
                     **{"receipt": receipt, "user": user, "error": err}
                 )
 
+        try:
+            results = self.receipt_read_us.read_results(UUID4(receipt_uuid))
+        except ReceiptReadError as err:
+            return render_template(
+                "receipt-split.html",
+                **{"receipt": receipt, "user": user, "error": err}
+            )
+
         return render_template(
             "receipt-split.html",
-            **{"receipt": receipt, "user": user, "error": None}
+            **{"receipt": receipt, "results": results, "user": user, "error": None}
         )
 
 
@@ -73,5 +81,5 @@ def validate(request: Request, user: User) -> t.List[Choice]:
             quantity=int(quantity),
             username=user.username.string(),
         )
-        for uuid, quantity in request.form.items() if int(quantity) > 0
+        for uuid, quantity in request.form.items() if int(quantity) >= 0
     ]
@@ -3,17 +3,22 @@ from .error import (
     ReceiptRecognizeError,
     ReceiptCreateError,
     ReceiptUpdateError,
+    ReceiptSearchError,
     ReceiptItemsAlreadySplited,
 )
-from .entity import Receipt, ReceiptItem, new
+from .entity import Receipt, ReceiptItem, ReceiptMatch, Result, new, settle
 
 __all__ = (
     'new',
+    'settle',
     'ReceiptItem',
     'Receipt',
+    'Result',
+    'ReceiptMatch',
     'ReceiptRecognizeError',
     'ReceiptReadError',
     'ReceiptCreateError',
     'ReceiptUpdateError',
+    'ReceiptSearchError',
     'ReceiptItemsAlreadySplited',
 )
@@ -0,0 +1,3 @@
+from .value_object import Cursor, SearchCursor
+
+__all__ = ('Cursor', 'SearchCursor')
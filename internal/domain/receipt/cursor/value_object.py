@@ -0,0 +1,27 @@
+import base64
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict, UUID4
+
+
+class Cursor(BaseModel):
+    # keyset position of a receipt in the (created_at, uuid) ordering of a user's receipts
+    created_at: datetime
+    uuid: UUID4
+
+    model_config = ConfigDict(frozen=True)
+
+    def __str__(self):
+        return self.string()
+
+    def string(self) -> str:
+        return base64.urlsafe_b64encode(self.model_dump_json().encode('utf-8')).decode('utf-8')
+
+    @classmethod
+    def from_string(cls, value: str) -> 'Cursor':
+        return cls.model_validate_json(base64.urlsafe_b64decode(value.encode('utf-8')))
+
+
+class SearchCursor(Cursor):
+    # keyset position of a receipt in the (score, created_at, uuid) ordering of search results
+    score: float
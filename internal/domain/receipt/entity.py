@@ -3,11 +3,13 @@ import uuid
 from collections import defaultdict
 from datetime import datetime
 
-from pydantic import BaseModel, Field, UUID4, field_serializer
+from pydantic import BaseModel, Field, PrivateAttr, UUID4, field_serializer
 
+from internal.domain.receipt.cursor import Cursor, SearchCursor
 from internal.domain.receipt.item import ReceiptItem, Choice
 from internal.domain.user.id import UserId
 from pkg.datetime import now
+from pkg.money import allocate, from_minor, to_minor
 
 
 class Result(BaseModel):
@@ -52,6 +54,10 @@ class Receipt(BaseModel):
     created_at: datetime = Field(
         default_factory=now
     )
+    # the positions of the items by uuid
+    _item_index: t.Dict[UUID4, int] = PrivateAttr(
+        default_factory=dict
+    )
 
     @field_serializer('uuid')
     def serialize_uuid(self, uuid: UUID4) -> str:
@@ -61,6 +67,20 @@ class Receipt(BaseModel):
     def serialize_timestamp(self, dt: datetime) -> str:
         return dt.isoformat()
 
+    def item(self, item_uuid: UUID4) -> t.Optional[ReceiptItem]:
+        # the indexed position is checked on each lookup, the items are indexed again
+        # when it's stale (the items were replaced, added to or removed from)
+        position = self._item_index.get(item_uuid)
+        if position is None or position >= len(self.items) or self.items[position].uuid != item_uuid:
+            self._item_index = {item.uuid: position for position, item in enumerate(self.items)}
+            position = self._item_index.get(item_uuid)
+            if position is None:
+                return None
+        return self.items[position]
+
+    def cursor(self) -> Cursor:
+        return Cursor(created_at=self.created_at, uuid=self.uuid)
+
     def set_user_id(self, user_id: UserId):
         self.user_id = user_id
 
@@ -73,29 +93,77 @@ class Receipt(BaseModel):
 
     @property
     def results(self) -> t.List[Result]:
-
-        results = defaultdict(Result)
-
+        # what each user owes, summed in minor units over the shares of the items and
+        # settled along with the tips and the other amounts of the receipt
+        amounts = defaultdict(int)
+        items_total = 0
         for item in self.items:
-            for split in item.splits:
-                if split.username not in results:
-                    results[split.username] = Result(
-                        username=split.username,
-                        amount=item.price_per_user(split.username)
-                    )
-                else:
-                    results[split.username].amount += item.price_per_user(split.username)
-
-        return [v for v in results.values()]
+            items_total += to_minor(item.price) or 0
+            for username, amount in item.shares().items():
+                amounts[username] += amount
+
+        return settle(
+            amounts,
+            items_total,
+            to_minor(self.subtotal) or 0,
+            to_minor(self.tips) or 0,
+            to_minor(self.total) or 0,
+            self.uuid.int,
+        )
 
     def split(self, choices: t.List[Choice]) -> t.List[ReceiptItem]:
-        hs = {choice.uuid: choice for choice in choices}
-        splitted = []
-        for item in self.items:
-            if item.uuid in hs:
-                item.split(hs[item.uuid])
-                splitted.append(item)
-        return splitted
+        # the items to save: those the choices changed or failed to split
+        splitted = {}
+        for choice in choices:
+            item = self.item(choice.uuid)
+            if item is None:
+                continue
+            taken = item.splits.quantity(choice.username)
+            if not item.split(choice) or taken != choice.quantity:
+                splitted[item.uuid] = item
+        return list(splitted.values())
+
+
+class ReceiptMatch(BaseModel):
+    # a receipt found by a search, the higher the score (up to 1) the better
+    receipt: Receipt
+    score: float
+
+    def cursor(self) -> SearchCursor:
+        return SearchCursor(score=self.score, created_at=self.receipt.created_at, uuid=self.receipt.uuid)
+
+
+def settle(
+        shares: t.Mapping[str, int],
+        items_total: int,
+        subtotal: int,
+        tips: int,
+        total: int,
+        seed: int = 0,
+) -> t.List[Result]:
+    # Results of the users owing the given shares of the items of a receipt, all in
+    # minor units: the tips, and the rest of the total over the subtotal (tax, service
+    # charge, discounts), are allocated in proportion to the shares of the items total
+    # by the largest remainder method, the part of the items nobody took keeping its
+    # part. The total is the amount charged, tips included (as the recognizers are
+    # asked for). A subtotal of 0 is taken to be the items total, a total of 0 to
+    # leave nothing over it. The units left on ties go to the users from a position
+    # given by the seed (the receipt uuid), not always to the first usernames.
+    usernames = sorted(shares)
+    weights = [max(shares[username], 0) for username in usernames]
+    weights.append(max(items_total - sum(weights), 0))
+
+    adjustment = total - (subtotal or items_total) - tips if total else 0
+    start = seed % len(weights)
+    tips_parts = allocate(tips, weights, start)
+    adjustment_parts = allocate(adjustment, weights, start)
+
+    results = []
+    for i, username in enumerate(usernames):
+        amount = shares[username] + adjustment_parts[i]
+        if amount != 0 or tips_parts[i] != 0:
+            results.append(Result(username=username, amount=from_minor(amount), tips=from_minor(tips_parts[i])))
+    return results
 
 
 def new(
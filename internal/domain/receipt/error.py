@@ -14,6 +14,10 @@ class ReceiptReadError(Exception):
     pass
 
 
+class ReceiptSearchError(Exception):
+    pass
+
+
 class ReceiptSplitErr(Exception):
     pass
 
@@ -1,14 +1,23 @@
-from .error import ReceiptItemReadError, ReceiptItemUpdateError, ReceiptItemCreateError, ReceiptItemSplitError
-from .model import ReceiptItem, Choice, Split, convert_to_uuid, empty_items
+from .error import (
+    ReceiptItemReadError,
+    ReceiptItemUpdateError,
+    ReceiptItemCreateError,
+    ReceiptItemSplitError,
+    ReceiptItemConflictError,
+)
+from .model import ReceiptItem, Choice, Split, SplitLedger, convert_to_uuid, empty_items, split_shares
 
 __all__ = (
     'empty_items',
     'convert_to_uuid',
+    'split_shares',
     'ReceiptItem',
     'Choice',
     'Split',
+    'SplitLedger',
     'ReceiptItemReadError',
     'ReceiptItemUpdateError',
     'ReceiptItemCreateError',
     'ReceiptItemSplitError',
+    'ReceiptItemConflictError',
 )
@@ -6,6 +6,11 @@ class ReceiptItemUpdateError(Exception):
     pass
 
 
+class ReceiptItemConflictError(ReceiptItemUpdateError):
+    # the item was changed by someone else since it was read
+    pass
+
+
 class ReceiptItemReadError(Exception):
     pass
 
@@ -1,10 +1,14 @@
 import typing as t
 import uuid
+from collections import abc
 from datetime import datetime
 
 from pydantic import BaseModel, Field, UUID4, field_serializer
+from pydantic_core import core_schema
 
 from pkg.datetime import now
+from pkg.model import construct
+from pkg.money import allocate, share, to_minor
 
 
 class Choice(BaseModel):
@@ -43,6 +47,65 @@ class Split(BaseModel):
         return str(self) == str(other)
 
 
+class SplitLedger(abc.Set):
+    # The splits of an item as the quantity each user took, by username, with their
+    # total kept along, so adding, changing or removing the split of a user is O(1): a
+    # user splitting again replaces their split, a quantity of 0 removes it. Iterates
+    # as Split and, like a set of them, contains (and equals sets of) usernames.
+    def __init__(self, splits: t.Iterable[t.Union[Split, t.Dict[str, t.Any]]] = ()):
+        self._quantities: t.Dict[str, int] = {}
+        self._allocated = 0
+        for split in splits:
+            self.add(split if isinstance(split, Split) else Split.model_validate(split))
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, _source: t.Any, _handler: t.Any) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            lambda splits: splits if isinstance(splits, cls) else cls(splits)
+        )
+
+    @property
+    def allocated(self) -> int:
+        return self._allocated
+
+    def quantity(self, username: str) -> int:
+        return self._quantities.get(username, 0)
+
+    def assign(self, username: str, quantity: int):
+        self._allocated += quantity - self._quantities.get(username, 0)
+        if quantity:
+            self._quantities[username] = quantity
+        else:
+            self._quantities.pop(username, None)
+
+    def add(self, split: Split):
+        self.assign(split.username, split.quantity)
+
+    def discard(self, split: t.Union[Split, str]):
+        self.assign(str(split), 0)
+
+    def items(self) -> t.ItemsView[str, int]:
+        return self._quantities.items()
+
+    def __contains__(self, split: t.Any) -> bool:
+        return str(split) in self._quantities
+
+    def __iter__(self) -> t.Iterator[Split]:
+        for username, quantity in self._quantities.items():
+            yield construct(Split, username=username, quantity=quantity)
+
+    def __len__(self) -> int:
+        return len(self._quantities)
+
+    def __eq__(self, other: t.Any) -> bool:
+        if isinstance(other, SplitLedger):
+            return self._quantities == other._quantities
+        return super().__eq__(other)
+
+    def __repr__(self) -> str:
+        return "SplitLedger(%s)" % self._quantities
+
+
 class ReceiptItem(BaseModel):
     uuid: UUID4 = Field(
         default_factory=uuid.uuid4
@@ -59,14 +122,19 @@ class ReceiptItem(BaseModel):
     created_at: datetime = Field(
         default_factory=now
     )
-    splits: t.Set[Split] = Field(
-        default_factory=set,
+    splits: SplitLedger = Field(
+        default_factory=SplitLedger,
         exclude=True,
     )
     split_error_message: str = Field(
         default="",
         exclude=True,
     )
+    # storage version the item was read with, see ReceiptItemConflictError
+    version: int = Field(
+        default=0,
+        exclude=True,
+    )
 
     @field_serializer('uuid')
     def serialize_uuid(self, uuid: UUID4) -> str:
@@ -83,40 +151,39 @@ class ReceiptItem(BaseModel):
         return self.price / self.quantity
 
     def price_per_user(self, username: str) -> float:
-        return self.price / self.quantity * self._user_quantity(username)
+        return self.price / self.quantity * self.splits.quantity(username)
 
-    def _user_quantity(self, username: str) -> int:
-        return sum([split.quantity for split in self.splits if split.username == username])
+    def shares(self) -> t.Dict[str, int]:
+        # what each user owes for the item, in minor units (see pkg.money)
+        return split_shares(to_minor(self.price) or 0, self.quantity, self.splits.items())
 
     def split(self, choice: Choice) -> bool:
+        # sets the quantity the user takes, 0 withdrawing them from the item
+        if choice.quantity < 0:
+            self.split_error_message = "choice quantity is < 0"
+            return False
+
         if choice.quantity > self.quantity:
             self.split_error_message = "choice quantity is > itme quantity"
             return False
 
-        if len(self.splits) == self.quantity:
+        taken = self.splits.quantity(choice.username)
+        if choice.quantity == taken:
+            return True
+
+        if not taken and self.splits.allocated >= self.quantity:
             self.split_error_message = "item has already splitted"
             return False
 
-        if (sum([s.quantity for s in self.splits]) + choice.quantity) > self.quantity:
+        if self.splits.allocated - taken + choice.quantity > self.quantity:
             self.split_error_message = "item can't be splitted"
             return False
 
-        self.splits.add(
-            Split(
-                username=choice.username,
-                quantity=choice.quantity
-            )
-        )
+        self.splits.assign(choice.username, choice.quantity)
         return True
 
     def is_splittable(self) -> bool:
-        if len(self.splits) == self.quantity:
-            return False
-
-        if sum([split.quantity for split in self.splits]) >= self.quantity:
-            return False
-
-        return True
+        return self.splits.allocated < self.quantity
 
 
 def new(product: str, quantity: int, price: float) -> ReceiptItem:
@@ -127,6 +194,21 @@ def new(product: str, quantity: int, price: float) -> ReceiptItem:
     )
 
 
+def split_shares(price: int, quantity: int, splits: t.Iterable[t.Tuple[str, int]]) -> t.Dict[str, int]:
+    # Shares of an item of `price` minor units among the (username, quantity) splits:
+    # the split part of the price, rounded half up, is allocated in proportion to the
+    # quantities by the largest remainder method (ties to the first usernames), so
+    # the shares of an entirely split item sum up to its price. The postgres
+    # `receipt_item_shares` function computes the same.
+    if not quantity or quantity <= 0:
+        return {}
+
+    splits = sorted((username, units) for username, units in splits if units > 0)
+    units = sum(units for _, units in splits)
+    amounts = allocate(share(price, units, quantity), [units for _, units in splits])
+    return {username: amount for (username, _), amount in zip(splits, amounts)}
+
+
 def convert_to_uuid(values: t.List[str]) -> t.List[UUID4]:
     return [
         UUID4(v) for v in values
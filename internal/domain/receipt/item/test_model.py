@@ -2,7 +2,7 @@ import uuid
 
 import pytest
 
-from .model import ReceiptItem, Choice
+from .model import ReceiptItem, Choice, Split, SplitLedger
 
 
 @pytest.fixture()
@@ -77,3 +77,53 @@ def test_price_per_user(receipt_item_uuid, choice1, choice2):
     choice1.quantity = 2
     item.split(choice1)
     assert item.price_per_user(choice1.username) == 1000
+
+
+def test_shares(receipt_item_uuid, choice1, choice2):
+    item = ReceiptItem(uuid=receipt_item_uuid, quantity=3, price=10)
+    assert item.shares() == {}
+
+    item.split(choice2)
+    assert item.shares() == {"user2": 333}
+
+    item.split(choice1)
+    assert item.shares() == {"user1": 334, "user2": 333}
+
+
+def test_split_ledger(receipt_item_uuid, choice1, choice2):
+    item = ReceiptItem(uuid=receipt_item_uuid, quantity=3)
+    item.split(choice1)
+    item.split(choice2)
+    assert item.splits.allocated == 2
+
+    # the user's quantity is changed, not added to
+    choice1.quantity = 2
+    assert item.split(choice1) is True
+    assert item.splits.quantity("user1") == 2
+    assert item.splits.allocated == 3
+    assert item.is_splittable() is False
+
+    choice1.quantity = 3
+    assert item.split(choice1) is False
+    assert item.split_error_message == "item can't be splitted"
+
+    choice1.quantity = 0
+    assert item.split(choice1) is True
+    assert item.splits == {"user2"}
+    assert item.splits.allocated == 1
+
+
+def test_split_ledger_validation(receipt_item_uuid):
+    item = ReceiptItem(uuid=receipt_item_uuid, quantity=3, splits=[{"username": "user1", "quantity": 2}])
+    assert isinstance(item.splits, SplitLedger)
+    assert item.splits == SplitLedger([Split(username="user1", quantity=2)])
+    assert item.splits != SplitLedger([Split(username="user1", quantity=1)])
+
+
+def test_split_negative_quantity(receipt_item_uuid, choice1):
+    item = ReceiptItem(uuid=receipt_item_uuid, quantity=3)
+
+    choice1.quantity = -1
+    assert item.split(choice1) is False
+    assert item.split_error_message == "choice quantity is < 0"
+    assert item.splits.allocated == 0
@@ -2,7 +2,7 @@ import uuid
 
 import pytest
 
-from internal.domain.receipt import Receipt
+from internal.domain.receipt import Receipt, settle
 from internal.domain.receipt.item import ReceiptItem, Choice
 
 
@@ -141,15 +141,95 @@ def test_result(receipt, receipt_item_choice_1, receipt_item_choice_2, receipt_i
             ),
         ]
     )
-    splits = receipt.results()
+    splits = receipt.results
     assert len(splits) == 2
     assert splits[0].username == "user1"
-    assert splits[0].amount == 1000 + 500 + 1000 / 3 + 1000
+    assert splits[0].amount == 2833.34
     assert splits[1].username == "user2"
-    assert splits[1].amount == 500 + 1000 / 3
+    assert splits[1].amount == 833.33
+
+
+def test_result_sums_to_price(receipt_uuid):
+    item = ReceiptItem(product="Product", quantity=3, price=100)
+    receipt = Receipt(user_id=1, uuid=receipt_uuid, items=[item])
+    receipt.split([Choice(uuid=item.uuid, username=username, quantity=1) for username in ("c", "b", "a")])
+
+    assert [(r.username, r.amount) for r in receipt.results] == [("a", 33.34), ("b", 33.33), ("c", 33.33)]
 
 
 def test_dump(receipt):
 
     resp = receipt.model_dump_json()
     assert resp
+
+
+def test_split_changes(receipt, receipt_item_choice_2):
+    item = receipt.items[1]
+    assert receipt.split([receipt_item_choice_2]) == [item]
+    # nothing to save when the choices change nothing
+    assert receipt.split([receipt_item_choice_2, Choice(uuid=uuid.uuid4(), username="user1")]) == []
+
+    receipt.split([Choice(uuid=item.uuid, username="user1", quantity=2)])
+    assert item.splits.quantity("user1") == 2
+
+    # an item added to the receipt is found by its uuid
+    added = ReceiptItem(product="Product 5", quantity=1, price=10)
+    receipt.items.append(added)
+    assert receipt.split([Choice(uuid=added.uuid, username="user1")]) == [added]
+
+    assert receipt.split([Choice(uuid=item.uuid, username="user1", quantity=0)]) == [item]
+    assert "user1" not in item.splits
+
+
+def test_item_after_replacement(receipt):
+    first = receipt.items[0]
+    assert receipt.item(first.uuid) is first
+
+    # an item replaced in place is found, the one it replaced isn't
+    replaced = ReceiptItem(product="Product 5", quantity=1, price=10)
+    receipt.items[0] = replaced
+    assert receipt.item(replaced.uuid) is replaced
+    assert receipt.item(first.uuid) is None
+
+    receipt.items.remove(replaced)
+    assert receipt.item(replaced.uuid) is None
+    assert receipt.item(receipt.items[0].uuid) is receipt.items[0]
+
+
+def test_result_tips_and_adjustments():
+    # tax of 5.00 and tips of 10.00 over a subtotal of 100.00, split in three
+    item = ReceiptItem(product="Product", quantity=3, price=100)
+    receipt = Receipt(user_id=1, uuid=uuid.UUID(int=4, version=4), items=[item], subtotal=100, tips=10, total=115)
+    receipt.split([Choice(uuid=item.uuid, username=username, quantity=1) for username in ("a", "b", "c")])
+
+    results = [(r.username, r.amount, r.tips) for r in receipt.results]
+    assert results == [("a", 35.01, 3.34), ("b", 35.0, 3.33), ("c", 34.99, 3.33)]
+    assert round(sum(amount + tips for _, amount, tips in results), 2) == 115
+
+
+def test_settle():
+    # the part of the items nobody took keeps its part of the tips and the discount
+    assert settle({"a": 3000}, 4000, 0, 400, 3800) == settle({"a": 3000}, 4000, 4000, 400, 3800)
+    results = settle({"a": 3000}, 4000, 4000, 400, 3800)
+    assert [(r.username, r.amount, r.tips) for r in results] == [("a", 25.5, 3.0)]
+
+    # the total includes the tips: over the subtotal by the tax and the tips, or
+    # below it by a discount
+    results = settle({"a": 3000, "b": 1000}, 4000, 4000, 400, 4800)
+    assert [(r.username, r.amount, r.tips) for r in results] == [("a", 33.0, 3.0), ("b", 11.0, 1.0)]
+    results = settle({"a": 3000, "b": 1000}, 4000, 4000, 400, 4000)
+    assert [(r.username, r.amount, r.tips) for r in results] == [("a", 27.0, 3.0), ("b", 9.0, 1.0)]
+
+    # no total, no adjustment
+    results = settle({"a": 3000, "b": 0}, 3000, 3000, 0, 0)
+    assert [(r.username, r.amount, r.tips) for r in results] == [("a", 30.0, 0.0)]
+
+
+def test_settle_seed():
+    # the unit left on a tie goes to the user the seed gives, the first one by default
+    def tips(seed):
+        return [r.tips for r in settle({"a": 100, "b": 100, "c": 100}, 300, 300, 100, 400, seed)]
+
+    assert tips(0) == [0.34, 0.33, 0.33]
+    assert tips(1) == [0.33, 0.34, 0.33]
+    assert tips(2) == [0.33, 0.33, 0.34]
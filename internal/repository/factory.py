@@ -0,0 +1,208 @@
+import typing as t
+
+from pydantic import (
+    AliasChoices,
+    Field,
+    PostgresDsn,
+)
+from pydantic_settings import BaseSettings
+
+from internal.repository.receipt.storage.postgres.repository import Repository as ReceiptStorage
+from internal.repository.receipt.storage.sharded.repository import Repository as ShardedReceiptStorage
+from internal.repository.receipt.storage.sqlite.repository import Repository as SqliteReceiptStorage
+from internal.repository.receipt_item.storage.postgres.repository import Repository as ReceiptItemStorage
+from internal.repository.receipt_item.storage.sharded.repository import Repository as ShardedReceiptItemStorage
+from internal.repository.receipt_item.storage.sqlite.repository import Repository as SqliteReceiptItemStorage
+from internal.repository.receipt_settlement.storage.postgres.repository import Repository as SettlementStorage
+from internal.repository.receipt_settlement.storage.sharded.repository import Repository as ShardedSettlementStorage
+from internal.repository.receipt_settlement.storage.sqlite.repository import Repository as SqliteSettlementStorage
+from internal.repository.shard.directory import Directory
+from internal.repository.user.storage.postgres.repository import Repository as UserStorage
+from internal.repository.user.storage.sharded.repository import Repository as ShardedUserStorage
+from internal.repository.user.storage.sqlite.repository import Repository as SqliteUserStorage
+from pkg.postgres import Pool, Router, HashRing, StatementTimer
+from pkg.sqlite import Database, SqliteDsn, database_path
+
+
+class StorageSettings(BaseSettings, case_sensitive=False):
+    # postgresql://... or sqlite:///path/to/receipts.db for single node deployments,
+    # also read from POSTGRESQL_URL
+    database_url: t.Union[PostgresDsn, SqliteDsn] = Field(
+        validation_alias=AliasChoices("database_url", "postgresql_url")
+    )
+    # postgres shards of the receipts and users by name, e.g. {"s1": "postgresql://..."},
+    # the directory of the users staying on the database above; unsharded when empty
+    postgresql_shard_urls: t.Dict[str, PostgresDsn] = Field(
+        default={}
+    )
+    postgresql_pool_min_size: int = Field(
+        default=1
+    )
+    postgresql_pool_max_size: int = Field(
+        default=10
+    )
+    postgresql_pool_timeout: float = Field(
+        default=30.0
+    )
+    # connections to the sqlite database and the seconds to wait for one
+    sqlite_pool_max_size: int = Field(
+        default=10
+    )
+    sqlite_pool_timeout: float = Field(
+        default=30.0
+    )
+    # postgres statements slower than that (milliseconds) are logged, a share of them
+    # with their plan (EXPLAIN ANALYZE for the reads, EXPLAIN for the writes)
+    postgresql_slow_statement_ms: float = Field(
+        default=200.0
+    )
+    postgresql_explain_sample_rate: float = Field(
+        default=0.0
+    )
+    # seconds between the summaries of the statement timings in the log
+    postgresql_statement_report_every: t.Optional[float] = Field(
+        default=300.0
+    )
+    # hot standby serving the receipt and user reads, the primary serves them when unset;
+    # not used with the shards
+    postgresql_replica_url: t.Optional[PostgresDsn] = Field(
+        default=None
+    )
+    postgresql_replica_sticky_for: float = Field(
+        default=5.0
+    )
+
+
+class Storages(t.NamedTuple):
+    receipts: t.Any
+    receipt_items: t.Any
+    settlements: t.Any
+    users: t.Any
+    # the pool (or database) of DATABASE_URL, a Router when there is a replica
+    pool: t.Any
+    shard_pools: t.Dict[str, Pool]
+    timer: StatementTimer
+
+    def close(self):
+        for pool in self.shard_pools.values():
+            pool.close()
+        self.pool.close()
+
+
+def new_storages(settings: StorageSettings) -> Storages:
+    timer = StatementTimer(
+        slow_ms=settings.postgresql_slow_statement_ms,
+        explain_sample_rate=settings.postgresql_explain_sample_rate,
+        report_every=settings.postgresql_statement_report_every,
+    )
+    if settings.database_url.scheme == "sqlite":
+        return _sqlite_storages(settings, timer)
+    if settings.postgresql_shard_urls:
+        return _sharded_storages(settings, timer)
+    return _postgres_storages(settings, timer)
+
+
+def _pool(settings: StorageSettings, url: PostgresDsn, timer: StatementTimer, name: t.Optional[str] = None) -> Pool:
+    return Pool(
+        conninfo=url.unicode_string(),
+        min_size=settings.postgresql_pool_min_size,
+        max_size=settings.postgresql_pool_max_size,
+        timeout=settings.postgresql_pool_timeout,
+        timer=timer,
+        name=name,
+    )
+
+
+def _sqlite_storages(settings: StorageSettings, timer: StatementTimer) -> Storages:
+    database = Database(
+        path=database_path(settings.database_url),
+        max_size=settings.sqlite_pool_max_size,
+        timeout=settings.sqlite_pool_timeout,
+    )
+    receipt_items = SqliteReceiptItemStorage(
+        db=database
+    )
+    return Storages(
+        receipts=SqliteReceiptStorage(
+            db=database,
+            item_repo=receipt_items,
+        ),
+        receipt_items=receipt_items,
+        settlements=SqliteSettlementStorage(
+            db=database
+        ),
+        users=SqliteUserStorage(
+            db=database
+        ),
+        pool=database,
+        shard_pools={},
+        timer=timer,
+    )
+
+
+def _sharded_storages(settings: StorageSettings, timer: StatementTimer) -> Storages:
+    # the receipts and users are spread over the shards by user, the directory saying
+    # which user is on which shard stays on DATABASE_URL
+    pool = _pool(settings, settings.database_url, timer)
+    shard_pools = {
+        shard: _pool(settings, url, timer, name=shard)
+        for shard, url in settings.postgresql_shard_urls.items()
+    }
+    directory = Directory(
+        pool=pool,
+        ring=HashRing(shard_pools),
+    )
+    item_repos = {shard: ReceiptItemStorage(pool=shard_pool) for shard, shard_pool in shard_pools.items()}
+    return Storages(
+        receipts=ShardedReceiptStorage(
+            directory=directory,
+            repos={
+                shard: ReceiptStorage(pool=shard_pool, item_repo=item_repos[shard])
+                for shard, shard_pool in shard_pools.items()
+            },
+        ),
+        receipt_items=ShardedReceiptItemStorage(
+            directory=directory,
+            repos=item_repos,
+        ),
+        settlements=ShardedSettlementStorage(
+            directory=directory,
+            repos={shard: SettlementStorage(pool=shard_pool) for shard, shard_pool in shard_pools.items()},
+        ),
+        users=ShardedUserStorage(
+            directory=directory,
+            repos={shard: UserStorage(pool=shard_pool) for shard, shard_pool in shard_pools.items()},
+        ),
+        pool=pool,
+        shard_pools=shard_pools,
+        timer=timer,
+    )
+
+
+def _postgres_storages(settings: StorageSettings, timer: StatementTimer) -> Storages:
+    pool = _pool(settings, settings.database_url, timer)
+    if settings.postgresql_replica_url is not None:
+        pool = Router(
+            writer=pool,
+            reader=_pool(settings, settings.postgresql_replica_url, timer),
+            sticky_for=settings.postgresql_replica_sticky_for,
+        )
+    receipt_items = ReceiptItemStorage(
+        pool=pool
+    )
+    return Storages(
+        receipts=ReceiptStorage(
+            pool=pool,
+            item_repo=receipt_items,
+        ),
+        receipt_items=receipt_items,
+        settlements=SettlementStorage(
+            pool=pool
+        ),
+        users=UserStorage(
+            pool=pool
+        ),
+        pool=pool,
+        shard_pools={},
+        timer=timer,
+    )
@@ -0,0 +1,16 @@
+-- money columns hold integer amounts of minor currency units, see pkg.money
+CREATE TABLE IF NOT EXISTS tbl_receipt (
+    user_id    bigint NOT NULL,
+    uuid       uuid PRIMARY KEY,
+    store_name text,
+    store_addr text,
+    date       text,
+    time       text,
+    subtotal   bigint,
+    tips       bigint,
+    total      bigint,
+    created_at timestamp with time zone
+);
+
+CREATE INDEX IF NOT EXISTS idx_receipt_user_id_created_at_uuid
+    ON tbl_receipt (user_id, created_at, uuid);
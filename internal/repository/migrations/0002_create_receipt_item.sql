@@ -0,0 +1,20 @@
+-- price holds an integer amount of minor currency units, see pkg.money;
+-- UNIQUE(receipt_uuid, product) also serves as the receipt_uuid index
+CREATE TABLE IF NOT EXISTS tbl_receipt_item (
+    receipt_uuid        uuid NOT NULL,
+    uuid                uuid PRIMARY KEY,
+    product             text,
+    quantity            integer,
+    price               bigint,
+    split_error_message text,
+    created_at          timestamp with time zone,
+    UNIQUE(receipt_uuid, product)
+);
+
+-- UNIQUE(uuid, username) also serves as the uuid index
+CREATE TABLE IF NOT EXISTS tbl_receipt_item_split (
+    uuid           uuid,
+    username       text,
+    quantity       integer,
+    UNIQUE(uuid, username)
+);
@@ -0,0 +1,5 @@
+CREATE TABLE IF NOT EXISTS tbl_user (
+    user_id    bigint PRIMARY KEY,
+    username   text UNIQUE,
+    created_at timestamp with time zone
+);
@@ -0,0 +1,66 @@
+-- Databases created before the versioned migrations have an untyped schema
+-- (varchar uuids, floating point money, timestamps without time zone), which the
+-- `CREATE TABLE IF NOT EXISTS` scripts above left as is. It is converted in place,
+-- keeping the data: money is scaled to minor units and timestamps, which were
+-- written in the server time zone (UTC), get a zone. On new databases this is a no-op.
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND table_name = 'tbl_receipt'
+          AND column_name = 'uuid'
+          AND data_type <> 'uuid'
+    ) THEN
+        ALTER TABLE tbl_receipt
+            ALTER COLUMN user_id TYPE bigint,
+            ALTER COLUMN uuid TYPE uuid USING uuid::uuid,
+            ALTER COLUMN store_name TYPE text,
+            ALTER COLUMN store_addr TYPE text,
+            ALTER COLUMN date TYPE text,
+            ALTER COLUMN time TYPE text,
+            ALTER COLUMN subtotal TYPE bigint USING round(subtotal * 100),
+            ALTER COLUMN tips TYPE bigint USING round(tips * 100),
+            ALTER COLUMN total TYPE bigint USING round(total * 100),
+            ALTER COLUMN created_at TYPE timestamp with time zone USING created_at AT TIME ZONE 'UTC';
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND table_name = 'tbl_receipt_item'
+          AND column_name = 'uuid'
+          AND data_type <> 'uuid'
+    ) THEN
+        ALTER TABLE tbl_receipt_item
+            ALTER COLUMN receipt_uuid TYPE uuid USING receipt_uuid::uuid,
+            ALTER COLUMN uuid TYPE uuid USING uuid::uuid,
+            ALTER COLUMN price TYPE bigint USING round(price * 100),
+            ALTER COLUMN created_at TYPE timestamp with time zone USING created_at AT TIME ZONE 'UTC';
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND table_name = 'tbl_receipt_item_split'
+          AND column_name = 'uuid'
+          AND data_type <> 'uuid'
+    ) THEN
+        ALTER TABLE tbl_receipt_item_split
+            ALTER COLUMN uuid TYPE uuid USING uuid::uuid;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND table_name = 'tbl_user'
+          AND column_name = 'user_id'
+          AND data_type <> 'bigint'
+    ) THEN
+        ALTER TABLE tbl_user
+            ALTER COLUMN user_id TYPE bigint,
+            ALTER COLUMN username TYPE text,
+            ALTER COLUMN created_at TYPE timestamp with time zone USING created_at AT TIME ZONE 'UTC';
+    END IF;
+END
+$$;
@@ -0,0 +1,45 @@
+-- Prepares the receipt tables for range partitioning by the receipt creation time
+-- (see apps.partition): the items and splits of a receipt carry its created_at as
+-- receipt_created_at, so all the rows of a receipt fall into partitions of the same
+-- month, and every primary key and unique constraint includes the partition key, as
+-- postgres requires of partitioned tables. Rows without a receipt get the current time.
+-- The uuids of receipts and items are thus no longer unique by constraint (they are
+-- generated, uuid4); reads by receipt uuid alone look into every partition, the item
+-- reads of receipts pass their created_at to be pruned to the partitions of a month.
+UPDATE tbl_receipt SET created_at = now() WHERE created_at IS NULL;
+
+ALTER TABLE tbl_receipt
+    ALTER COLUMN created_at SET DEFAULT now(),
+    ALTER COLUMN created_at SET NOT NULL,
+    DROP CONSTRAINT IF EXISTS tbl_receipt_pkey,
+    ADD PRIMARY KEY (uuid, created_at);
+
+ALTER TABLE tbl_receipt_item ADD COLUMN IF NOT EXISTS receipt_created_at timestamp with time zone;
+
+UPDATE tbl_receipt_item as i
+SET receipt_created_at = coalesce(
+    (SELECT r.created_at FROM tbl_receipt as r WHERE r.uuid = i.receipt_uuid),
+    now()
+)
+WHERE i.receipt_created_at IS NULL;
+
+ALTER TABLE tbl_receipt_item
+    ALTER COLUMN receipt_created_at SET NOT NULL,
+    DROP CONSTRAINT IF EXISTS tbl_receipt_item_pkey,
+    DROP CONSTRAINT IF EXISTS tbl_receipt_item_receipt_uuid_product_key,
+    ADD PRIMARY KEY (uuid, receipt_created_at),
+    ADD UNIQUE (receipt_uuid, product, receipt_created_at);
+
+ALTER TABLE tbl_receipt_item_split ADD COLUMN IF NOT EXISTS receipt_created_at timestamp with time zone;
+
+UPDATE tbl_receipt_item_split as s
+SET receipt_created_at = coalesce(
+    (SELECT i.receipt_created_at FROM tbl_receipt_item as i WHERE i.uuid = s.uuid),
+    now()
+)
+WHERE s.receipt_created_at IS NULL;
+
+ALTER TABLE tbl_receipt_item_split
+    ALTER COLUMN receipt_created_at SET NOT NULL,
+    DROP CONSTRAINT IF EXISTS tbl_receipt_item_split_uuid_username_key,
+    ADD UNIQUE (uuid, username, receipt_created_at);
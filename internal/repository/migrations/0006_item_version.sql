@@ -0,0 +1,4 @@
+-- Items carry a version, incremented by every update, which the concurrent splits of
+-- a receipt compare and swap (see `update_many` of the item repository) instead of
+-- holding row locks while the user chooses.
+ALTER TABLE tbl_receipt_item ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 0;
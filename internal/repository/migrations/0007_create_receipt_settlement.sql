@@ -0,0 +1,38 @@
+-- Amounts each user owes per receipt, in minor units, kept up to date by the split
+-- writes (see internal.repository.receipt_settlement) so they are read without
+-- joining the items and splits. The tips of a user depend on the shares of all the
+-- users of the receipt, so they are settled on read along with the other receipt
+-- amounts (see `settle` of internal.domain.receipt) and not kept here. Partitioned
+-- along with the receipt tables.
+CREATE TABLE IF NOT EXISTS tbl_receipt_settlement (
+    receipt_uuid       uuid                     NOT NULL,
+    receipt_created_at timestamp with time zone NOT NULL,
+    username           text                     NOT NULL,
+    amount             bigint                   NOT NULL DEFAULT 0,
+    PRIMARY KEY (receipt_uuid, username, receipt_created_at)
+);
+
+-- the share of an item, in minor units, of a user who took `split_quantity` of it
+CREATE OR REPLACE FUNCTION receipt_item_share(price bigint, quantity integer, split_quantity integer)
+RETURNS bigint
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT CASE
+        WHEN quantity > 0 THEN round(coalesce(price, 0) * split_quantity::numeric / quantity)::bigint
+        ELSE 0
+    END
+$$;
+
+-- settlements of the receipts split before the table existed
+INSERT INTO tbl_receipt_settlement (receipt_uuid, receipt_created_at, username, amount)
+SELECT
+    i.receipt_uuid,
+    i.receipt_created_at,
+    s.username,
+    sum(receipt_item_share(i.price, i.quantity, s.quantity))
+FROM tbl_receipt_item as i
+JOIN tbl_receipt_item_split as s
+ON (s.uuid = i.uuid AND s.receipt_created_at = i.receipt_created_at)
+GROUP BY i.receipt_uuid, i.receipt_created_at, s.username
+ON CONFLICT DO NOTHING;
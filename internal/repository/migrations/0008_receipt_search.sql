@@ -0,0 +1,11 @@
+-- Trigram indexes serving the product and store searches of the receipts (the `<%`
+-- operator of pg_trgm, see SEARCH_USER_RECEIPTS_SQL), which can't use btree indexes.
+-- pg_trgm ships with the postgres contrib modules, the searches need it: the
+-- migration fails on a server without them.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_receipt_item_product_trgm
+    ON tbl_receipt_item USING gin (product gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_receipt_store_name_trgm
+    ON tbl_receipt USING gin (store_name gin_trgm_ops);
@@ -0,0 +1,16 @@
+-- Directory of the sharded storage (see internal.repository.shard), read on the
+-- database of DATABASE_URL: the shard each user is placed on, chosen by the hash ring
+-- on the first write and changed only by apps.reshard, and the user of each receipt,
+-- so receipts read by uuid are found on the shard of their user.
+CREATE TABLE IF NOT EXISTS tbl_shard_user (
+    user_id    bigint                   PRIMARY KEY,
+    shard      text                     NOT NULL,
+    -- the shard the user is being moved to, their writes are refused meanwhile
+    moving_to  text,
+    created_at timestamp with time zone NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS tbl_shard_receipt (
+    receipt_uuid uuid   PRIMARY KEY,
+    user_id      bigint NOT NULL
+);
@@ -0,0 +1,67 @@
+-- Shares of an item among its splits (usernames and quantities alike ordered), in
+-- minor units: the split part of the price, rounded half up, is allocated in
+-- proportion to the quantities by the largest remainder method, ties going to the
+-- first usernames, so the shares of an entirely split item sum up to its price. The
+-- same as `split_shares` of internal.domain.receipt.item, which replaces the
+-- per-split rounding of receipt_item_share.
+CREATE OR REPLACE FUNCTION receipt_item_shares(
+    price bigint,
+    quantity integer,
+    usernames text[],
+    split_quantities integer[]
+)
+RETURNS TABLE (username text, amount bigint)
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    WITH splits as (
+        SELECT u.name, u.units
+        FROM unnest(usernames, split_quantities) as u(name, units)
+        WHERE quantity > 0 AND u.units > 0
+    ), allocated as (
+        SELECT
+            round(coalesce(price, 0) * sum(units)::numeric / quantity)::bigint as total,
+            sum(units) as units
+        FROM splits
+    ), parts as (
+        SELECT
+            s.name,
+            floor(a.total * s.units::numeric / a.units)::bigint as part,
+            a.total * s.units - floor(a.total * s.units::numeric / a.units)::bigint * a.units as remainder,
+            a.total
+        FROM splits as s, allocated as a
+    ), ranked as (
+        SELECT
+            name,
+            part,
+            total - sum(part) OVER () as left_over,
+            row_number() OVER (ORDER BY remainder DESC, name COLLATE "C") as rank
+        FROM parts
+    )
+    SELECT name, part + (rank <= left_over)::integer
+    FROM ranked
+$$;
+
+-- settlements of the receipts split before
+WITH expected as (
+    SELECT
+        i.receipt_uuid,
+        i.receipt_created_at,
+        sh.username,
+        sum(sh.amount) as amount
+    FROM tbl_receipt_item as i
+    JOIN LATERAL (
+        SELECT array_agg(s.username) as usernames, array_agg(s.quantity) as quantities
+        FROM tbl_receipt_item_split as s
+        WHERE s.uuid = i.uuid AND s.receipt_created_at = i.receipt_created_at
+    ) as s ON true
+    CROSS JOIN LATERAL receipt_item_shares(i.price, i.quantity, s.usernames, s.quantities) as sh
+    GROUP BY i.receipt_uuid, i.receipt_created_at, sh.username
+)
+INSERT INTO tbl_receipt_settlement (receipt_uuid, receipt_created_at, username, amount)
+SELECT receipt_uuid, receipt_created_at, username, amount
+FROM expected
+ON CONFLICT (receipt_uuid, username, receipt_created_at)
+DO UPDATE SET
+    amount = EXCLUDED.amount
+WHERE tbl_receipt_settlement.amount IS DISTINCT FROM EXCLUDED.amount;
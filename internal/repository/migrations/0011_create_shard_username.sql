@@ -0,0 +1,8 @@
+-- The user of each username in the directory of the sharded storage (see
+-- internal.repository.shard), so users read by username are found on the shard of
+-- their user. Written with the users, the users written before are named on their
+-- next login.
+CREATE TABLE IF NOT EXISTS tbl_shard_username (
+    username text   PRIMARY KEY,
+    user_id  bigint NOT NULL
+);
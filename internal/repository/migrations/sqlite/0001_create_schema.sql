@@ -0,0 +1,45 @@
+-- Schema of the sqlite storage, the tables of the postgres one without partitioning:
+-- uuids are text, money columns integer amounts of minor currency units (see
+-- pkg.money) and timestamps integer microseconds since the epoch (see pkg.sqlite).
+-- Settlements are computed from the splits when read.
+CREATE TABLE IF NOT EXISTS tbl_receipt (
+    user_id    integer NOT NULL,
+    uuid       text PRIMARY KEY,
+    store_name text,
+    store_addr text,
+    date       text,
+    time       text,
+    subtotal   integer,
+    tips       integer,
+    total      integer,
+    created_at integer NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_receipt_user_id_created_at_uuid
+    ON tbl_receipt (user_id, created_at, uuid);
+
+-- UNIQUE(receipt_uuid, product) also serves as the receipt_uuid index
+CREATE TABLE IF NOT EXISTS tbl_receipt_item (
+    receipt_uuid        text NOT NULL,
+    uuid                text PRIMARY KEY,
+    product             text,
+    quantity            integer,
+    price               integer,
+    split_error_message text,
+    created_at          integer,
+    version             integer NOT NULL DEFAULT 0,
+    UNIQUE (receipt_uuid, product)
+);
+
+CREATE TABLE IF NOT EXISTS tbl_receipt_item_split (
+    uuid     text NOT NULL,
+    username text NOT NULL,
+    quantity integer,
+    PRIMARY KEY (uuid, username)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS tbl_user (
+    user_id    integer PRIMARY KEY,
+    username   text UNIQUE,
+    created_at integer
+);
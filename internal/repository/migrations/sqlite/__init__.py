@@ -0,0 +1,9 @@
+import os
+import typing as t
+
+from pkg.postgres import Migration, load_migrations
+
+
+def migrations() -> t.List[Migration]:
+    # versioned schema scripts of the sqlite storage, applied by `apps.migrate`
+    return load_migrations(os.path.dirname(__file__))
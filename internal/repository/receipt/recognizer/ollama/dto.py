@@ -35,10 +35,12 @@ class ReceiptDTO(BaseModel):
         default=0
     )
     tips: t.Optional[float] = Field(
-        default=0
+        default=0,
+        description="tips (gratuity) added to the bill",
     )
     total: t.Optional[float] = Field(
-        default=0
+        default=0,
+        description="total amount charged, tips included",
     )
 
 
@@ -0,0 +1,181 @@
+import csv
+import gzip
+import io
+import os
+import threading
+import typing as t
+from datetime import datetime
+from logging import getLogger
+
+from pydantic import UUID4
+
+from internal.domain.receipt import Receipt, ReceiptReadError
+from internal.domain.receipt.cursor import Cursor
+from internal.domain.receipt.item import ReceiptItem, SplitLedger
+from internal.domain.user.id import UserId
+from internal.usecase.adapters.receipt import IReader
+from pkg.money import from_minor
+
+logger = getLogger("receipt.storage.archive")
+
+RECEIPT_TABLE = "tbl_receipt"
+RECEIPT_ITEM_TABLE = "tbl_receipt_item"
+RECEIPT_ITEM_SPLIT_TABLE = "tbl_receipt_item_split"
+
+
+class Repository(IReader):
+    # Reads receipts from the storage and, when they are not there, from the archive
+    # the partitioning exports the receipts older than the retention to (see
+    # pkg.postgres.Partitioner): one gzipped csv file per table and month under
+    # `<path>/<table>/`, the files of the items and splits of a month sharing the
+    # name suffix of the receipts file. The archive is scanned on the reads of pages,
+    # which suits the rare reads of old receipts; reads by uuid, also made for the
+    # receipts not stored at all, look up the month of the receipt in an index of the
+    # archived uuids, built again when the receipts files change.
+    def __init__(self, reader: IReader, path: str):
+        self._reader = reader
+        self._path = path
+        self._lock = threading.Lock()
+        self._index: t.Dict[str, str] = {}
+        self._indexed: t.Dict[str, float] = {}
+
+    def read_by_uuid(self, uuid: UUID4) -> t.Optional[Receipt]:
+        receipt = self._reader.read_by_uuid(uuid)
+        if receipt is not None:
+            return receipt
+
+        try:
+            suffix = self._suffix_of(uuid)
+            if suffix is None:
+                return None
+
+            for row in self._rows(RECEIPT_TABLE, suffix):
+                if row["uuid"] == str(uuid):
+                    receipt = parse_receipt(row)
+                    self._read_items(suffix, [receipt])
+                    return receipt
+        except (OSError, ValueError) as e:
+            raise ReceiptReadError("read archived receipt err: %s" % e)
+
+        return None
+
+    def read_many(self, user_id: UserId, limit: int, cursor: t.Optional[Cursor] = None) -> t.List[Receipt]:
+        # archived receipts are older than the stored ones, so a page the storage can't
+        # fill continues in the archive
+        receipts = self._reader.read_many(user_id, limit, cursor)
+        if len(receipts) == limit:
+            return receipts
+
+        if receipts:
+            cursor = receipts[-1].cursor()
+
+        try:
+            return receipts + self._read_many(user_id, limit - len(receipts), cursor)
+        except (OSError, ValueError) as e:
+            raise ReceiptReadError("read archived receipts err: %s" % e)
+
+    def _read_many(self, user_id: UserId, limit: int, cursor: t.Optional[Cursor]) -> t.List[Receipt]:
+        found = []
+        for suffix in self._suffixes():
+            for row in self._rows(RECEIPT_TABLE, suffix):
+                if int(row["user_id"]) != user_id.int():
+                    continue
+
+                receipt = parse_receipt(row)
+                if cursor is None or (receipt.created_at, str(receipt.uuid)) < (cursor.created_at, str(cursor.uuid)):
+                    found.append((suffix, receipt))
+
+        found.sort(key=lambda f: (f[1].created_at, str(f[1].uuid)), reverse=True)
+        found = found[:limit]
+
+        by_suffix: t.Dict[str, t.List[Receipt]] = {}
+        for suffix, receipt in found:
+            by_suffix.setdefault(suffix, []).append(receipt)
+        for suffix, receipts in by_suffix.items():
+            self._read_items(suffix, receipts)
+
+        return [receipt for _, receipt in found]
+
+    def _read_items(self, suffix: str, receipts: t.List[Receipt]):
+        items: t.Dict[str, t.List[ReceiptItem]] = {str(receipt.uuid): [] for receipt in receipts}
+        splits: t.Dict[str, SplitLedger] = {}
+        for row in self._rows(RECEIPT_ITEM_TABLE, suffix):
+            if row["receipt_uuid"] in items:
+                item = parse_item(row)
+                items[row["receipt_uuid"]].append(item)
+                splits[str(item.uuid)] = item.splits
+
+        for row in self._rows(RECEIPT_ITEM_SPLIT_TABLE, suffix):
+            if row["uuid"] in splits and row["username"] and row["quantity"]:
+                splits[row["uuid"]].assign(row["username"], int(row["quantity"]))
+
+        for receipt in receipts:
+            receipt.items = sorted(items[str(receipt.uuid)], key=lambda i: (i.created_at, str(i.uuid)))
+
+    def _suffix_of(self, uuid: UUID4) -> t.Optional[str]:
+        with self._lock:
+            files = self._files()
+            if files != self._indexed:
+                index = {}
+                for suffix in files:
+                    for row in self._rows(RECEIPT_TABLE, suffix):
+                        index[row["uuid"]] = suffix
+                self._index, self._indexed = index, files
+                logger.info("archive indexed: files=%d, receipts=%d" % (len(files), len(index)))
+
+            return self._index.get(str(uuid))
+
+    def _suffixes(self) -> t.List[str]:
+        # newest first, e.g. "_p2024_05" of "tbl_receipt_p2024_05.csv.gz"
+        return sorted(self._files(), reverse=True)
+
+    def _files(self) -> t.Dict[str, float]:
+        # the modification times of the receipts files by their name suffix
+        directory = os.path.join(self._path, RECEIPT_TABLE)
+        if not os.path.isdir(directory):
+            return {}
+
+        return {
+            entry.name[len(RECEIPT_TABLE):-len(".csv.gz")]: entry.stat().st_mtime
+            for entry in os.scandir(directory) if entry.name.endswith(".csv.gz")
+        }
+
+    def _rows(self, table: str, suffix: str) -> t.Iterator[t.Dict[str, str]]:
+        path = os.path.join(self._path, table, "%s%s.csv.gz" % (table, suffix))
+        if not os.path.exists(path):
+            logger.warning("archive file not found: path=%s" % path)
+            return
+
+        with gzip.open(path, "rb") as f:
+            yield from csv.DictReader(io.TextIOWrapper(f, encoding="utf-8", newline=""))
+
+
+def parse_receipt(row: t.Dict[str, str]) -> Receipt:
+    # csv holds NULL as an empty unquoted value
+    return Receipt(
+        user_id=int(row["user_id"]),
+        uuid=row["uuid"],
+        store_name=row["store_name"],
+        store_addr=row["store_addr"],
+        date=row["date"],
+        time=row["time"],
+        subtotal=from_minor(parse_int(row["subtotal"])),
+        tips=from_minor(parse_int(row["tips"])),
+        total=from_minor(parse_int(row["total"])),
+        created_at=datetime.fromisoformat(row["created_at"]),
+    )
+
+
+def parse_item(row: t.Dict[str, str]) -> ReceiptItem:
+    return ReceiptItem(
+        uuid=row["uuid"],
+        product=row["product"],
+        quantity=parse_int(row["quantity"]),
+        price=from_minor(parse_int(row["price"])),
+        created_at=datetime.fromisoformat(row["created_at"] or row["receipt_created_at"]),
+        split_error_message=row["split_error_message"],
+    )
+
+
+def parse_int(value: str) -> t.Optional[int]:
+    return int(value) if value else None
@@ -0,0 +1,70 @@
+import csv
+import gzip
+import os
+import uuid
+
+import pytest
+
+from internal.repository.receipt.storage.archive.repository import Repository
+from internal.repository.receipt.storage.memory.repository import Repository as Storage
+from internal.repository.receipt_item.storage.memory.repository import Repository as ItemStorage
+
+RECEIPT_COLUMNS = ["uuid", "user_id", "store_name", "store_addr", "date", "time", "subtotal", "tips", "total", "created_at"]
+ITEM_COLUMNS = ["uuid", "receipt_uuid", "product", "quantity", "price", "created_at", "receipt_created_at",
+                "split_error_message"]
+SPLIT_COLUMNS = ["uuid", "username", "quantity"]
+
+
+def write(path, table, suffix, columns, rows):
+    os.makedirs(os.path.join(path, table), exist_ok=True)
+    with gzip.open(os.path.join(path, table, "%s%s.csv.gz" % (table, suffix)), "wt", newline="") as f:
+        writer = csv.DictWriter(f, columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def archive(path, suffix, receipt_uuid, created_at):
+    item_uuid = str(uuid.uuid4())
+    write(path, "tbl_receipt", suffix, RECEIPT_COLUMNS, [{
+        "uuid": receipt_uuid, "user_id": "3", "store_name": "magnum", "store_addr": "", "date": "", "time": "",
+        "subtotal": "", "tips": "", "total": "2000", "created_at": created_at,
+    }])
+    write(path, "tbl_receipt_item", suffix, ITEM_COLUMNS, [{
+        "uuid": item_uuid, "receipt_uuid": receipt_uuid, "product": "fanta", "quantity": "2", "price": "2000",
+        "created_at": created_at, "receipt_created_at": created_at, "split_error_message": "",
+    }])
+    write(path, "tbl_receipt_item_split", suffix, SPLIT_COLUMNS, [{
+        "uuid": item_uuid, "username": "alice", "quantity": "1",
+    }])
+
+
+@pytest.fixture(scope="function")
+def repo(tmp_path) -> Repository:
+    return Repository(Storage(ItemStorage()), str(tmp_path))
+
+
+def test_read_by_uuid(repo, tmp_path):
+    receipt_uuid = str(uuid.uuid4())
+    archive(str(tmp_path), "_p2024_04", receipt_uuid, "2024-04-10 12:00:00+00:00")
+
+    receipt = repo.read_by_uuid(uuid.UUID(receipt_uuid))
+    assert receipt is not None
+    assert receipt.store_name == "magnum"
+    assert [item.product for item in receipt.items] == ["fanta"]
+    assert receipt.items[0].splits.quantity("alice") == 1
+
+
+def test_read_by_uuid_misses_without_scanning(repo, tmp_path, monkeypatch):
+    archive(str(tmp_path), "_p2024_04", str(uuid.uuid4()), "2024-04-10 12:00:00+00:00")
+    assert repo.read_by_uuid(uuid.uuid4()) is None
+
+    scanned = []
+    rows = repo._rows
+    monkeypatch.setattr(repo, "_rows", lambda table, suffix: scanned.append(table) or rows(table, suffix))
+    assert repo.read_by_uuid(uuid.uuid4()) is None
+    assert scanned == []
+
+    # a month archived later is indexed on the next read
+    receipt_uuid = str(uuid.uuid4())
+    archive(str(tmp_path), "_p2024_05", receipt_uuid, "2024-05-10 12:00:00+00:00")
+    assert repo.read_by_uuid(uuid.UUID(receipt_uuid)) is not None
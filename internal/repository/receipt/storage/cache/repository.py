@@ -0,0 +1,61 @@
+import pickle
+import threading
+import typing as t
+from logging import getLogger
+
+from pydantic import UUID4
+
+from internal.domain.receipt import Receipt
+from internal.domain.receipt.cursor import Cursor
+from internal.domain.user.id import UserId
+from internal.usecase.adapters.receipt import IReader
+from pkg.cache import LRUCache
+
+logger = getLogger("receipt.storage.cache")
+
+
+class Repository(IReader):
+    # Read-through cache of the receipts read by uuid, e.g. the shared links of the
+    # split and show pages. The receipts are kept serialized: the cache size is
+    # their exact size in bytes, and every read gets its own copy to change (as the
+    # split does). The changed receipts are evicted by `evict`, called on the
+    # notifications of their writers (see RECEIPT_CHANGED_CHANNEL). The pages of
+    # `read_many` aren't cached.
+    def __init__(self, reader: IReader, cache: LRUCache):
+        self._reader = reader
+        self._cache = cache
+        # incremented by the evictions, a receipt read while one happened may be
+        # stale and isn't cached; the check and the set are made under the lock of
+        # the evictions, so none comes in between
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def read_by_uuid(self, uuid: UUID4) -> t.Optional[Receipt]:
+        key = str(uuid)
+        data = self._cache.get(key)
+        if data is not None:
+            return pickle.loads(data)
+
+        evictions = self._evictions
+        receipt = self._reader.read_by_uuid(uuid)
+        if receipt is not None:
+            data = pickle.dumps(receipt, protocol=pickle.HIGHEST_PROTOCOL)
+            with self._lock:
+                if evictions == self._evictions:
+                    self._cache.set(key, data)
+
+        return receipt
+
+    def read_many(self, user_id: UserId, limit: int, cursor: t.Optional[Cursor] = None) -> t.List[Receipt]:
+        return self._reader.read_many(user_id, limit, cursor)
+
+    def evict(self, uuid: t.Union[UUID4, str]):
+        with self._lock:
+            self._evictions += 1
+            self._cache.delete(str(uuid))
+
+    def clear(self):
+        with self._lock:
+            self._evictions += 1
+            self._cache.clear()
+        logger.info("receipt cache cleared")
@@ -0,0 +1,222 @@
+import bisect
+import threading
+import typing as t
+from collections import defaultdict
+from datetime import datetime
+from logging import getLogger
+
+from pydantic import UUID4
+
+from internal.domain.receipt import (
+    Receipt,
+    ReceiptMatch,
+    ReceiptCreateError,
+    ReceiptUpdateError,
+)
+from internal.domain.receipt.cursor import Cursor, SearchCursor
+from internal.domain.receipt.item import (
+    ReceiptItemCreateError,
+    ReceiptItemUpdateError,
+)
+from internal.domain.user.id import UserId
+from internal.repository.receipt_item.storage.memory.repository import Repository as ItemRepository
+from internal.usecase.adapters.receipt import (
+    ICreator,
+    IBulkCreator,
+    IUpdater,
+    IReader,
+    IStreamer,
+    ISearcher,
+)
+from pkg.model import construct
+from pkg.money import to_minor, from_minor
+from pkg import trgm
+
+logger = getLogger("receipt.storage.memory")
+
+default_itersize = 100
+
+
+class Row(t.NamedTuple):
+    user_id: int
+    uuid: UUID4
+    store_name: str
+    store_addr: str
+    date: str
+    time: str
+    subtotal: t.Optional[int]
+    tips: t.Optional[int]
+    total: t.Optional[int]
+    created_at: datetime
+
+
+class Repository(ICreator, IBulkCreator, IUpdater, IReader, IStreamer, ISearcher):
+    # Receipts held in process for tests and benchmarks, with the semantics of the
+    # postgres storage (see the item repository). The receipts are indexed by uuid and
+    # in (created_at, uuid) order overall and per user, so pages and streams are read
+    # by bisection like the postgres index is scanned. The items are written under the
+    # lock of the receipts, before them, so a receipt is written with its items or not.
+    def __init__(self, item_repo: ItemRepository):
+        self._item_repo = item_repo
+        self._lock = threading.RLock()
+        self._receipts: t.Dict[UUID4, Row] = {}
+        self._by_created_at: t.List[t.Tuple[datetime, str, UUID4]] = []
+        self._by_user: t.Dict[int, t.List[t.Tuple[datetime, str, UUID4]]] = defaultdict(list)
+
+    def clean(self):
+        with self._lock:
+            self._receipts.clear()
+            self._by_created_at.clear()
+            self._by_user.clear()
+        logger.info("receipt schema cleaned")
+
+    def create(self, receipt: Receipt):
+        with self._lock:
+            try:
+                self._item_repo.create_many(receipt.uuid, receipt.created_at, receipt.items)
+            except ReceiptItemCreateError as err:
+                raise ReceiptCreateError("receipt items create err: %s" % err)
+
+            self._insert(receipt_row(receipt))
+
+        logger.info("receipt created: receipt_uuid=%s" % receipt.uuid)
+        return None
+
+    def create_many(self, receipts: t.List[Receipt]) -> int:
+        created = 0
+        with self._lock:
+            for receipt in receipts:
+                try:
+                    self._item_repo.create_many(receipt.uuid, receipt.created_at, receipt.items)
+                except ReceiptItemCreateError as err:
+                    raise ReceiptCreateError("receipt items create err: %s" % err)
+
+                created += self._insert(receipt_row(receipt))
+
+        logger.info("receipts created: receipts_count=%d, created=%d" % (len(receipts), created))
+        return created
+
+    def update(self, receipt: Receipt):
+        with self._lock:
+            try:
+                self._item_repo.update_many(receipt.uuid, receipt.created_at, receipt.items)
+            except ReceiptItemUpdateError as err:
+                raise ReceiptUpdateError("receipt items update err: %s" % err)
+
+            stored = self._receipts.get(receipt.uuid)
+            if stored is None:
+                self._insert(receipt_row(receipt))
+            else:
+                # the owner and creation time are not updated
+                self._receipts[receipt.uuid] = receipt_row(receipt)._replace(
+                    user_id=stored.user_id,
+                    created_at=stored.created_at,
+                )
+
+        logger.info("receipt updated: receipt_uuid=%s" % receipt.uuid)
+        return None
+
+    def read_by_uuid(self, uuid: UUID4) -> t.Optional[Receipt]:
+        with self._lock:
+            row = self._receipts.get(uuid)
+            if row is None:
+                return None
+            return self._parse(row)
+
+    def read_many(self, user_id: UserId, limit: int, cursor: t.Optional[Cursor] = None) -> t.List[Receipt]:
+        with self._lock:
+            index = self._by_user.get(user_id.int(), [])
+            end = len(index) if cursor is None else bisect.bisect_left(index, (cursor.created_at, str(cursor.uuid)))
+            return [self._parse(self._receipts[key[2]]) for key in reversed(index[max(0, end - limit):end])]
+
+    def stream(
+            self,
+            user_id: t.Optional[UserId] = None,
+            since: t.Optional[datetime] = None,
+            until: t.Optional[datetime] = None,
+            itersize: int = default_itersize,
+    ) -> t.Iterator[Receipt]:
+        # the keys are read at once, the receipts by `itersize` under the lock
+        with self._lock:
+            index = self._by_created_at if user_id is None else self._by_user.get(user_id.int(), [])
+            start = 0 if since is None else bisect.bisect_left(index, (since,))
+            end = len(index) if until is None else bisect.bisect_left(index, (until,))
+            keys = index[start:end]
+
+        for i in range(0, len(keys), itersize):
+            with self._lock:
+                receipts = [
+                    self._parse(self._receipts[key[2]]) for key in keys[i:i + itersize] if key[2] in self._receipts
+                ]
+            yield from receipts
+
+    def search(
+            self,
+            user_id: UserId,
+            query: str,
+            limit: int,
+            cursor: t.Optional[SearchCursor] = None,
+    ) -> t.List[ReceiptMatch]:
+        # scores as SEARCH_USER_RECEIPTS_SQL of the postgres storage, over the receipts of the user
+        with self._lock:
+            matches = []
+            for key in self._by_user.get(user_id.int(), []):
+                receipt = self._parse(self._receipts[key[2]])
+                scores = [score(receipt.store_name, query)] + [score(item.product, query) for item in receipt.items]
+                scores = [s for s in scores if s is not None]
+                if scores:
+                    matches.append(construct(ReceiptMatch, receipt=receipt, score=max(scores)))
+
+        matches.sort(key=lambda m: (m.score, m.receipt.created_at, str(m.receipt.uuid)), reverse=True)
+        if cursor is not None:
+            after = (cursor.score, cursor.created_at, str(cursor.uuid))
+            matches = [m for m in matches if (m.score, m.receipt.created_at, str(m.receipt.uuid)) < after]
+        return matches[:limit]
+
+    def _insert(self, row: Row) -> int:
+        if row.uuid in self._receipts:
+            return 0
+
+        key = (row.created_at, str(row.uuid), row.uuid)
+        self._receipts[row.uuid] = row
+        bisect.insort(self._by_created_at, key)
+        bisect.insort(self._by_user[row.user_id], key)
+        return 1
+
+    def _parse(self, row: Row) -> Receipt:
+        return construct(
+            Receipt,
+            user_id=construct(UserId, root=row.user_id),
+            uuid=row.uuid,
+            store_name=row.store_name,
+            store_addr=row.store_addr,
+            date=row.date,
+            time=row.time,
+            items=self._item_repo.read_by_receipt_uuid(row.uuid),
+            subtotal=from_minor(row.subtotal),
+            tips=from_minor(row.tips),
+            total=from_minor(row.total),
+            created_at=row.created_at,
+        )
+
+
+def score(value: t.Optional[str], query: str) -> t.Optional[float]:
+    # None when the value doesn't match the query
+    if value is None or trgm.word_similarity(query, value) < trgm.word_similarity_threshold:
+        return None
+    return trgm.score(query, value)
+
+
+def receipt_row(receipt: Receipt) -> Row:
+    return Row(
+        user_id=receipt.user_id.int(),
+        uuid=receipt.uuid,
+        store_name=receipt.store_name,
+        store_addr=receipt.store_addr,
+        date=receipt.date,
+        time=receipt.time,
+        subtotal=to_minor(receipt.subtotal),
+        tips=to_minor(receipt.tips),
+        total=to_minor(receipt.total),
+        created_at=receipt.created_at,
+    )
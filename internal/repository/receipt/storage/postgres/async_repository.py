@@ -0,0 +1,137 @@
+import typing as t
+from logging import getLogger
+
+import psycopg
+from pydantic import UUID4
+
+from internal.domain.receipt import (
+    Receipt,
+    ReceiptReadError,
+    ReceiptCreateError,
+    ReceiptUpdateError,
+)
+from internal.domain.receipt.cursor import Cursor
+from internal.domain.receipt.item import (
+    ReceiptItemCreateError,
+    ReceiptItemReadError,
+    ReceiptItemUpdateError,
+)
+from internal.domain.user.id import UserId
+from internal.repository.receipt_item.storage.postgres.async_repository import (
+    AsyncRepository as AsyncItemRepository
+)
+from internal.usecase.adapters.receipt import (
+    IAsyncCreator,
+    IAsyncUpdater,
+    IAsyncReader,
+)
+from pkg.postgres import AsyncPool
+from .repository import (
+    INSERT_RECEIPT_SQL,
+    UPSERT_RECEIPT_SQL,
+    SELECT_RECEIPT_SQL,
+    receipt_params,
+    read_many_query,
+    receipt_row,
+    receipt_with_items_row,
+)
+
+logger = getLogger("receipt.storage.postgres.async")
+
+
+class AsyncRepository(IAsyncCreator, IAsyncUpdater, IAsyncReader):
+    def __init__(self, pool: AsyncPool, item_repo: AsyncItemRepository):
+        self._pool = pool
+        self._item_repo = item_repo
+
+    async def create(self, receipt: Receipt):
+        # the receipt and its items are written in one transaction
+        try:
+            async with self._pool.transaction() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        query=INSERT_RECEIPT_SQL,
+                        params=receipt_params(receipt)
+                    )
+
+                await self._item_repo.create_many(receipt.uuid, receipt.created_at, receipt.items)
+
+        except ReceiptItemCreateError as err:
+
+            raise ReceiptCreateError("receipt items create err: %s" % err)
+
+        except psycopg.errors.DatabaseError as e:
+
+            raise ReceiptCreateError("insert receipt err: %s" % e)
+
+        else:
+            logger.info("receipt created: receipt_uuid=%s" % receipt.uuid)
+
+        return None
+
+    async def update(self, receipt: Receipt):
+        # the receipt and its items are written in one transaction
+        try:
+            async with self._pool.transaction() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        query=UPSERT_RECEIPT_SQL,
+                        params=receipt_params(receipt)
+                    )
+
+                await self._item_repo.update_many(receipt.uuid, receipt.created_at, receipt.items)
+
+        except ReceiptItemUpdateError as err:
+
+            raise ReceiptUpdateError("receipt items update err: %s" % err)
+
+        except psycopg.errors.DatabaseError as e:
+
+            raise ReceiptUpdateError("upsert receipt err: %s" % e)
+
+        else:
+            logger.info("receipt updated: receipt_uuid=%s" % receipt.uuid)
+
+        return None
+
+    async def read_by_uuid(self, uuid: UUID4) -> t.Optional[Receipt]:
+        try:
+            async with self._pool.connection() as conn:
+                async with conn.cursor(binary=True, row_factory=receipt_with_items_row) as cur:
+                    await cur.execute(
+                        SELECT_RECEIPT_SQL,
+                        params={
+                            "uuid": uuid
+                        },
+                        prepare=True,
+                    )
+
+                    receipt = await cur.fetchone()
+        except psycopg.errors.DatabaseError as e:
+            raise ReceiptReadError("select receipt err: %s" % e)
+
+        return receipt
+
+    async def read_many(self, user_id: UserId, limit: int, cursor: t.Optional[Cursor] = None) -> t.List[Receipt]:
+        query, params = read_many_query(user_id, limit, cursor)
+
+        try:
+            async with self._pool.connection() as conn:
+                async with conn.cursor(binary=True, row_factory=receipt_row) as cur:
+                    await cur.execute(query, params=params, prepare=True)
+                    receipts = await cur.fetchall()
+        except psycopg.errors.DatabaseError as e:
+            raise ReceiptReadError("select receipts err: %s" % e)
+
+        try:
+            items = await self._item_repo.read_by_receipt_uuids(
+                [receipt.uuid for receipt in receipts],
+                [receipt.created_at for receipt in receipts],
+            )
+        except ReceiptItemReadError as err:
+            raise ReceiptReadError("read receipts items err: %s" % err)
+
+        for receipt in receipts:
+            receipt.items = items[receipt.uuid]
+
+        return receipts
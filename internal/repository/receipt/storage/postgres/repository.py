@@ -1,46 +1,55 @@
 import typing as t
+from datetime import datetime
 from logging import getLogger
+from uuid import uuid4
 from pydantic import UUID4
 
 import psycopg
+from psycopg.rows import RowMaker
 
 from internal.domain.receipt import (
     Receipt,
+    ReceiptMatch,
     ReceiptReadError,
     ReceiptCreateError,
     ReceiptUpdateError,
 )
+from internal.domain.receipt.cursor import Cursor, SearchCursor
 from internal.domain.user.id import UserId
 from internal.domain.receipt.item import (
+    ReceiptItem,
     ReceiptItemCreateError,
     ReceiptItemReadError,
     ReceiptItemUpdateError,
 )
 from internal.repository.receipt_item.storage.postgres.repository import (
-    Repository as ItemRepository
+    Repository as ItemRepository,
+    parse_items,
 )
 from internal.usecase.adapters.receipt import (
     ICreator,
+    IBulkCreator,
     IUpdater,
     IReader,
+    IStreamer,
+    ISearcher,
 )
+from internal.repository.receipt_settlement.storage.postgres.repository import refresh_receipts
+from pkg.model import construct
+from pkg.money import to_minor, from_minor
+from pkg.postgres import ConnectionProvider, name_statements
 
 logger = getLogger("receipt.storge.postgres")
 
-CREATE_SCHEMA_SQL = b"""
-    CREATE TABLE IF NOT EXISTS tbl_receipt (
-        user_id    integer NOT NULL,
-        uuid       varchar(255) PRIMARY KEY,
-        store_name varchar(300),
-        store_addr varchar(300),
-        date       varchar(100),
-        time       varchar(100),
-        subtotal   double precision,
-        tips       double precision,
-        total      double precision,
-        created_at timestamp without time zone
-    );
-"""
+default_itersize = 100
+
+# receipt tables with the columns they are partitioned by, see apps.partition
+PARTITIONED_TABLES = (
+    ("tbl_receipt", "created_at"),
+    ("tbl_receipt_item", "receipt_created_at"),
+    ("tbl_receipt_item_split", "receipt_created_at"),
+    ("tbl_receipt_settlement", "receipt_created_at"),
+)
 
 CLEAN_SCHEMA_SQL = b"""
     truncate table tbl_receipt;
@@ -70,7 +79,7 @@ INSERT_RECEIPT_SQL = b"""
         %(tips)s,
         %(total)s,
         %(created_at)s
-    ) ON CONFLICT (uuid) DO NOTHING;
+    ) ON CONFLICT (uuid, created_at) DO NOTHING;
 """
 
 UPSERT_RECEIPT_SQL = b"""
@@ -83,7 +92,8 @@ UPSERT_RECEIPT_SQL = b"""
         time, 
         subtotal, 
         tips, 
-        total
+        total,
+        created_at
     )
     VALUES (
         %(user_id)s, 
@@ -94,9 +104,10 @@ UPSERT_RECEIPT_SQL = b"""
         %(time)s,
         %(subtotal)s,
         %(tips)s,
-        %(total)s
+        %(total)s,
+        %(created_at)s
     )
-    ON CONFLICT(uuid)
+    ON CONFLICT(uuid, created_at)
     DO UPDATE SET
         store_name = EXCLUDED.store_name, 
         store_addr = EXCLUDED.store_addr,
@@ -107,7 +118,68 @@ UPSERT_RECEIPT_SQL = b"""
         total = EXCLUDED.total;
 """
 
-SELECT_RECEIPT_SQL = b"""
+# receipt headers with their items and splits aggregated by lateral subqueries into
+# parallel arrays of plain types, which psycopg decodes natively in the binary format,
+# decoded by `parse_receipt_with_items`
+SELECT_RECEIPTS_WITH_ITEMS_SQL = b"""
+    SELECT
+        r.user_id, 
+        r.uuid,
+        r.store_name, 
+        r.store_addr, 
+        r.date, 
+        r.time, 
+        r.subtotal, 
+        r.tips, 
+        r.total, 
+        r.created_at,
+        i.uuids,
+        i.products,
+        i.quantities,
+        i.prices,
+        i.created_ats,
+        i.split_error_messages,
+        i.versions,
+        s.uuids,
+        s.usernames,
+        s.quantities
+    FROM tbl_receipt as r
+    LEFT JOIN LATERAL (
+        SELECT
+            array_agg(i.uuid ORDER BY i.created_at, i.uuid) as uuids,
+            array_agg(i.product ORDER BY i.created_at, i.uuid) as products,
+            array_agg(i.quantity ORDER BY i.created_at, i.uuid) as quantities,
+            array_agg(i.price ORDER BY i.created_at, i.uuid) as prices,
+            array_agg(i.created_at ORDER BY i.created_at, i.uuid) as created_ats,
+            array_agg(i.split_error_message ORDER BY i.created_at, i.uuid) as split_error_messages,
+            array_agg(i.version ORDER BY i.created_at, i.uuid) as versions
+        FROM tbl_receipt_item as i
+        WHERE i.receipt_uuid = r.uuid AND i.receipt_created_at = r.created_at
+    ) as i ON true
+    LEFT JOIN LATERAL (
+        SELECT
+            array_agg(s.uuid) as uuids,
+            array_agg(s.username) as usernames,
+            array_agg(s.quantity) as quantities
+        FROM tbl_receipt_item as i
+        JOIN tbl_receipt_item_split as s
+        ON (s.uuid = i.uuid AND s.receipt_created_at = i.receipt_created_at)
+        WHERE i.receipt_uuid = r.uuid AND i.receipt_created_at = r.created_at
+    ) as s ON true
+"""
+
+SELECT_RECEIPT_SQL = SELECT_RECEIPTS_WITH_ITEMS_SQL + b"""
+    WHERE r.uuid = %(uuid)s;
+"""
+
+SELECT_STREAM_RECEIPTS_SQL = SELECT_RECEIPTS_WITH_ITEMS_SQL + b"""
+    WHERE (%(user_id)s::bigint IS NULL OR r.user_id = %(user_id)s)
+      AND (%(since)s::timestamptz IS NULL OR r.created_at >= %(since)s)
+      AND (%(until)s::timestamptz IS NULL OR r.created_at < %(until)s)
+    ORDER BY r.created_at, r.uuid;
+"""
+
+SELECT_USER_RECEIPTS_SQL = b"""
     SELECT
         user_id, 
         uuid,
@@ -120,131 +192,504 @@ SELECT_RECEIPT_SQL = b"""
         total, 
         created_at
     FROM tbl_receipt 
-    WHERE uuid = %(uuid)s;
+    WHERE user_id = %(user_id)s
+    ORDER BY created_at DESC, uuid DESC
+    LIMIT %(limit)s;
 """
 
+SELECT_USER_RECEIPTS_AFTER_CURSOR_SQL = b"""
+    SELECT
+        user_id, 
+        uuid,
+        store_name, 
+        store_addr, 
+        date, 
+        time, 
+        subtotal, 
+        tips, 
+        total, 
+        created_at
+    FROM tbl_receipt 
+    WHERE user_id = %(user_id)s
+      AND (created_at, uuid) < (%(created_at)s, %(uuid)s)
+    ORDER BY created_at DESC, uuid DESC
+    LIMIT %(limit)s;
+"""
 
-class Repository(ICreator, IUpdater, IReader):
-    def __init__(self, conn: psycopg.Connection, item_repo: ItemRepository):
-        self._conn = conn
-        self._item_repo = item_repo
-        self.init_schema()
+# Receipts of the user whose store or some product has the query as a word, near
+# enough: `<%` of pg_trgm (word_similarity() over pg_trgm.word_similarity_threshold,
+# 0.6 by default), served by the trigram indexes of migration 0008. The matches of the
+# items and of the stores are joined to the receipts of the user so the planner can
+# start from either side. A receipt is scored by its best match, the mean of the
+# word_similarity() and the similarity() of the value (see pkg.trgm.score), and the
+# receipts are read best first then newest first; the cursor is the (score,
+# created_at, uuid) of the last one read.
+SEARCH_USER_RECEIPTS_SQL = b"""
+    WITH matches as (
+        SELECT
+            r.uuid,
+            r.created_at,
+            max((word_similarity(%(query)s, i.product) + similarity(%(query)s, i.product)) / 2) as score
+        FROM tbl_receipt as r
+        JOIN tbl_receipt_item as i
+        ON (i.receipt_uuid = r.uuid AND i.receipt_created_at = r.created_at)
+        WHERE r.user_id = %(user_id)s
+          AND %(query)s <%% i.product
+        GROUP BY r.uuid, r.created_at
+        UNION ALL
+        SELECT
+            r.uuid,
+            r.created_at,
+            (word_similarity(%(query)s, r.store_name) + similarity(%(query)s, r.store_name)) / 2
+        FROM tbl_receipt as r
+        WHERE r.user_id = %(user_id)s
+          AND %(query)s <%% r.store_name
+    ), scored as (
+        SELECT uuid, created_at, max(score) as score
+        FROM matches
+        GROUP BY uuid, created_at
+    )
+    SELECT
+        r.user_id,
+        r.uuid,
+        r.store_name,
+        r.store_addr,
+        r.date,
+        r.time,
+        r.subtotal,
+        r.tips,
+        r.total,
+        r.created_at,
+        m.score
+    FROM scored as m
+    JOIN tbl_receipt as r
+    ON (r.uuid = m.uuid AND r.created_at = m.created_at)
+    WHERE %(score)s::real IS NULL
+       OR m.score < %(score)s::real
+       OR (m.score = %(score)s::real AND (r.created_at, r.uuid) < (%(created_at)s, %(uuid)s))
+    ORDER BY m.score DESC, r.created_at DESC, r.uuid DESC
+    LIMIT %(limit)s;
+"""
+
+# bulk ingestion: receipts are streamed with binary COPY into temporary staging tables
+# and merged into the target tables with one statement per table
 
-    def init_schema(self):
-        with self._conn.cursor() as cur:
-            cur.execute(query=CREATE_SCHEMA_SQL)
-        self._conn.commit()
-        logger.info("receipt schema is ready")
+CREATE_STAGING_SQL = b"""
+    CREATE TEMPORARY TABLE tmp_receipt (
+        user_id    bigint,
+        uuid       uuid,
+        store_name text,
+        store_addr text,
+        date       text,
+        time       text,
+        subtotal   bigint,
+        tips       bigint,
+        total      bigint,
+        created_at timestamp with time zone
+    ) ON COMMIT DROP;
+    CREATE TEMPORARY TABLE tmp_receipt_item (
+        receipt_uuid        uuid,
+        receipt_created_at  timestamp with time zone,
+        uuid                uuid,
+        product             text,
+        quantity            integer,
+        price               bigint,
+        split_error_message text,
+        created_at          timestamp with time zone
+    ) ON COMMIT DROP;
+    CREATE TEMPORARY TABLE tmp_receipt_item_split (
+        uuid               uuid,
+        receipt_created_at timestamp with time zone,
+        username           text,
+        quantity           integer
+    ) ON COMMIT DROP;
+"""
+
+COPY_RECEIPT_SQL = b"""
+    COPY tmp_receipt (
+        user_id, uuid, store_name, store_addr, date, time, subtotal, tips, total, created_at
+    ) FROM STDIN (FORMAT BINARY)
+"""
+
+COPY_RECEIPT_TYPES = (
+    "int8", "uuid", "text", "text", "text", "text", "int8", "int8", "int8", "timestamptz"
+)
+
+COPY_RECEIPT_ITEM_SQL = b"""
+    COPY tmp_receipt_item (
+        receipt_uuid, receipt_created_at, uuid, product, quantity, price, split_error_message, created_at
+    ) FROM STDIN (FORMAT BINARY)
+"""
+
+COPY_RECEIPT_ITEM_TYPES = (
+    "uuid", "timestamptz", "uuid", "text", "int4", "int8", "text", "timestamptz"
+)
+
+COPY_RECEIPT_ITEM_SPLIT_SQL = b"""
+    COPY tmp_receipt_item_split (
+        uuid, receipt_created_at, username, quantity
+    ) FROM STDIN (FORMAT BINARY)
+"""
+
+COPY_RECEIPT_ITEM_SPLIT_TYPES = (
+    "uuid", "timestamptz", "text", "int4"
+)
+
+MERGE_RECEIPT_SQL = b"""
+    INSERT INTO tbl_receipt (
+        user_id, uuid, store_name, store_addr, date, time, subtotal, tips, total, created_at
+    )
+    SELECT
+        user_id, uuid, store_name, store_addr, date, time, subtotal, tips, total, created_at
+    FROM tmp_receipt
+    ON CONFLICT DO NOTHING;
+"""
+
+MERGE_RECEIPT_ITEM_SQL = b"""
+    INSERT INTO tbl_receipt_item (
+        receipt_uuid, receipt_created_at, uuid, product, quantity, price, split_error_message, created_at
+    )
+    SELECT
+        receipt_uuid, receipt_created_at, uuid, product, quantity, price, split_error_message, created_at
+    FROM tmp_receipt_item
+    ON CONFLICT DO NOTHING;
+"""
+
+MERGE_RECEIPT_ITEM_SPLIT_SQL = b"""
+    INSERT INTO tbl_receipt_item_split (
+        uuid, receipt_created_at, username, quantity
+    )
+    SELECT
+        uuid, receipt_created_at, username, quantity
+    FROM tmp_receipt_item_split
+    ON CONFLICT DO NOTHING;
+"""
+
+
+class Repository(ICreator, IBulkCreator, IUpdater, IReader, IStreamer, ISearcher):
+    def __init__(self, pool: ConnectionProvider, item_repo: ItemRepository):
+        self._pool = pool
+        self._item_repo = item_repo
 
     def clean(self):
-        with self._conn.cursor() as cur:
-            cur.execute(query=CLEAN_SCHEMA_SQL)
-        self._conn.commit()
+        with self._pool.connection() as conn:
+            conn.execute(query=CLEAN_SCHEMA_SQL)
         logger.info("receipt schema cleaned")
 
     def create(self, receipt: Receipt):
+        # the receipt and its items are written in one transaction
         try:
-            self._item_repo.create_many(receipt.uuid, receipt.items)
+            with self._pool.transaction() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        query=INSERT_RECEIPT_SQL,
+                        params=receipt_params(receipt)
+                    )
+
+                self._item_repo.create_many(receipt.uuid, receipt.created_at, receipt.items)
+
         except ReceiptItemCreateError as err:
-            raise ReceiptCreateError("receipt items create err: %s" % err)
 
-        try:
-            with self._conn.cursor() as cur:
-                cur.execute(
-                    query=INSERT_RECEIPT_SQL,
-                    params={
-                        'user_id': receipt.user_id.int(),
-                        'uuid': str(receipt.uuid),
-                        'store_name': receipt.store_name,
-                        'store_addr': receipt.store_addr,
-                        'date': receipt.date,
-                        'time': receipt.time,
-                        'subtotal': receipt.subtotal,
-                        'tips': receipt.tips,
-                        'total': receipt.total,
-                        'created_at': receipt.created_at
-                    }
-                )
+            raise ReceiptCreateError("receipt items create err: %s" % err)
 
         except psycopg.errors.DatabaseError as e:
 
-            self._conn.rollback()
-
             raise ReceiptCreateError("insert receipt err: %s" % e)
 
         else:
-            self._conn.commit()
+            self._pool.written(receipt.uuid, receipt.user_id.int())
             logger.info("receipt created: receipt_uuid=%s" % receipt.uuid)
 
         return None
 
+    def create_many(self, receipts: t.List[Receipt]) -> int:
+        # COPY is not available in pipeline mode, so the batch runs in its own
+        # transaction rather than joining a unit of work
+        try:
+            with self._pool.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query=CREATE_STAGING_SQL)
+
+                    with cur.copy(COPY_RECEIPT_SQL) as copy:
+                        copy.set_types(COPY_RECEIPT_TYPES)
+                        for receipt in receipts:
+                            copy.write_row(
+                                (
+                                    receipt.user_id.int(),
+                                    receipt.uuid,
+                                    receipt.store_name,
+                                    receipt.store_addr,
+                                    receipt.date,
+                                    receipt.time,
+                                    to_minor(receipt.subtotal),
+                                    to_minor(receipt.tips),
+                                    to_minor(receipt.total),
+                                    receipt.created_at,
+                                )
+                            )
+
+                    with cur.copy(COPY_RECEIPT_ITEM_SQL) as copy:
+                        copy.set_types(COPY_RECEIPT_ITEM_TYPES)
+                        for receipt in receipts:
+                            for item in receipt.items:
+                                copy.write_row(
+                                    (
+                                        receipt.uuid,
+                                        receipt.created_at,
+                                        item.uuid,
+                                        item.product,
+                                        item.quantity,
+                                        to_minor(item.price),
+                                        item.split_error_message,
+                                        item.created_at,
+                                    )
+                                )
+
+                    with cur.copy(COPY_RECEIPT_ITEM_SPLIT_SQL) as copy:
+                        copy.set_types(COPY_RECEIPT_ITEM_SPLIT_TYPES)
+                        for receipt in receipts:
+                            for item in receipt.items:
+                                for username, quantity in item.splits.items():
+                                    copy.write_row(
+                                        (
+                                            item.uuid,
+                                            receipt.created_at,
+                                            username,
+                                            quantity,
+                                        )
+                                    )
+
+                    cur.execute(query=MERGE_RECEIPT_SQL)
+                    created = cur.rowcount
+                    cur.execute(query=MERGE_RECEIPT_ITEM_SQL)
+                    cur.execute(query=MERGE_RECEIPT_ITEM_SPLIT_SQL)
+                    refresh_receipts(conn, receipts)
+
+        except psycopg.errors.DatabaseError as e:
+
+            raise ReceiptCreateError("copy receipts err: %s" % e)
+
+        else:
+            logger.info("receipts created: receipts_count=%d, created=%d" % (len(receipts), created))
+
+        return created
+
     def update(self, receipt: Receipt):
+        # the receipt and its items are written in one transaction
         try:
-            self._item_repo.update_many(receipt.uuid, receipt.items)
+            with self._pool.transaction() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        query=UPSERT_RECEIPT_SQL,
+                        params=receipt_params(receipt)
+                    )
+
+                self._item_repo.update_many(receipt.uuid, receipt.created_at, receipt.items)
+
         except ReceiptItemUpdateError as err:
+
             raise ReceiptUpdateError("receipt items update err: %s" % err)
 
-        try:
-            with self._conn.cursor() as cur:
-                cur.execute(
-                    query=UPSERT_RECEIPT_SQL,
-                    params={
-                        'user_id': receipt.user_id.int(),
-                        'uuid': str(receipt.uuid),
-                        'store_name': receipt.store_name,
-                        'store_addr': receipt.store_addr,
-                        'date': receipt.date,
-                        'time': receipt.time,
-                        'subtotal': receipt.subtotal,
-                        'tips': receipt.tips,
-                        'total': receipt.total
-                    }
-                )
         except psycopg.errors.DatabaseError as e:
 
-            self._conn.rollback()
-
-            raise ReceiptUpdateError("insert receipt err: %s" % e)
+            raise ReceiptUpdateError("upsert receipt err: %s" % e)
 
         else:
-            self._conn.commit()
+            self._pool.written(receipt.uuid, receipt.user_id.int())
             logger.info("receipt updated: receipt_uuid=%s" % receipt.uuid)
 
         return None
 
     def read_by_uuid(self, uuid: UUID4) -> t.Optional[Receipt]:
+        # header, items and splits are fetched in a single round trip
+        try:
+            with self._pool.replica(uuid) as conn:
+                with conn.cursor(binary=True, row_factory=receipt_with_items_row) as cur:
+                    cur.execute(
+                        SELECT_RECEIPT_SQL,
+                        params={
+                            "uuid": uuid
+                        },
+                        prepare=True,
+                    )
+
+                    receipt = cur.fetchone()
+        except psycopg.errors.DatabaseError as e:
+            raise ReceiptReadError("select receipt err: %s" % e)
+
+        return receipt
+
+    def stream(
+            self,
+            user_id: t.Optional[UserId] = None,
+            since: t.Optional[datetime] = None,
+            until: t.Optional[datetime] = None,
+            itersize: int = default_itersize,
+    ) -> t.Iterator[Receipt]:
+        # Yields the receipts of the user and/or created in [since, until) ordered by
+        # creation time. A named (server-side) cursor fetches `itersize` assembled
+        # receipts per round trip, so memory stays constant however many there are.
+        # The pooled connection is held until the generator is exhausted or closed.
+        try:
+            with self._pool.replica() as conn:
+                with conn.cursor(
+                        name="receipt_stream_%s" % uuid4().hex,
+                        binary=True,
+                        row_factory=receipt_with_items_row,
+                ) as cur:
+                    cur.itersize = itersize
+                    cur.execute(
+                        SELECT_STREAM_RECEIPTS_SQL,
+                        params={
+                            "user_id": user_id.int() if user_id is not None else None,
+                            "since": since,
+                            "until": until,
+                        }
+                    )
+                    yield from cur
+        except psycopg.errors.DatabaseError as e:
+            raise ReceiptReadError("stream receipts err: %s" % e)
+
+    def read_many(self, user_id: UserId, limit: int, cursor: t.Optional[Cursor] = None) -> t.List[Receipt]:
+        # keyset pagination over (user_id, created_at, uuid): the cost of a page does not
+        # depend on how deep it is, unlike OFFSET which scans all the skipped rows
+        query, params = read_many_query(user_id, limit, cursor)
+
         try:
-            items = self._item_repo.read_by_receipt_uuid(uuid)
+            with self._pool.replica(user_id.int()) as conn:
+                with conn.cursor(binary=True, row_factory=receipt_row) as cur:
+                    cur.execute(query, params=params, prepare=True)
+                    receipts = cur.fetchall()
+        except psycopg.errors.DatabaseError as e:
+            raise ReceiptReadError("select receipts err: %s" % e)
+
+        try:
+            items = self._item_repo.read_by_receipt_uuids(
+                [receipt.uuid for receipt in receipts],
+                [receipt.created_at for receipt in receipts],
+            )
         except ReceiptItemReadError as err:
-            raise ReceiptReadError("read receipt items err: %s" % err)
+            raise ReceiptReadError("read receipts items err: %s" % err)
+
+        for receipt in receipts:
+            receipt.items = items[receipt.uuid]
 
+        return receipts
+
+    def search(
+            self,
+            user_id: UserId,
+            query: str,
+            limit: int,
+            cursor: t.Optional[SearchCursor] = None,
+    ) -> t.List[ReceiptMatch]:
         try:
-            with self._conn.cursor() as cur:
-                cur.execute(
-                    SELECT_RECEIPT_SQL,
-                    params={
-                        "uuid": str(uuid)
-                    }
-                )
-
-                row = cur.fetchone()
+            with self._pool.replica(user_id.int()) as conn:
+                with conn.cursor(binary=True) as cur:
+                    cur.execute(
+                        SEARCH_USER_RECEIPTS_SQL,
+                        params=search_params(user_id, query, limit, cursor),
+                        prepare=True,
+                    )
+                    rows = cur.fetchall()
         except psycopg.errors.DatabaseError as e:
-            raise ReceiptReadError("select receipt err: %s" % e)
+            raise ReceiptReadError("search receipts err: %s" % e)
+
+        matches = [construct(ReceiptMatch, receipt=parse_receipt(row), score=row[10]) for row in rows]
+
+        try:
+            items = self._item_repo.read_by_receipt_uuids(
+                [match.receipt.uuid for match in matches],
+                [match.receipt.created_at for match in matches],
+            )
+        except ReceiptItemReadError as err:
+            raise ReceiptReadError("read searched receipts items err: %s" % err)
+
+        for match in matches:
+            match.receipt.items = items[match.receipt.uuid]
+
+        return matches
+
+
+def receipt_params(receipt: Receipt) -> t.Dict[str, t.Any]:
+    return {
+        'user_id': receipt.user_id.int(),
+        'uuid': receipt.uuid,
+        'store_name': receipt.store_name,
+        'store_addr': receipt.store_addr,
+        'date': receipt.date,
+        'time': receipt.time,
+        'subtotal': to_minor(receipt.subtotal),
+        'tips': to_minor(receipt.tips),
+        'total': to_minor(receipt.total),
+        'created_at': receipt.created_at
+    }
+
+
+def read_many_query(user_id: UserId, limit: int, cursor: t.Optional[Cursor]) -> t.Tuple[bytes, t.Dict[str, t.Any]]:
+    if cursor is None:
+        return SELECT_USER_RECEIPTS_SQL, {
+            "user_id": user_id.int(),
+            "limit": limit,
+        }
+
+    return SELECT_USER_RECEIPTS_AFTER_CURSOR_SQL, {
+        "user_id": user_id.int(),
+        "created_at": cursor.created_at,
+        "uuid": cursor.uuid,
+        "limit": limit,
+    }
+
+
+def search_params(
+        user_id: UserId,
+        query: str,
+        limit: int,
+        cursor: t.Optional[SearchCursor],
+) -> t.Dict[str, t.Any]:
+    return {
+        "user_id": user_id.int(),
+        "query": query,
+        "score": cursor.score if cursor is not None else None,
+        "created_at": cursor.created_at if cursor is not None else None,
+        "uuid": cursor.uuid if cursor is not None else None,
+        "limit": limit,
+    }
+
+
+def receipt_row(_cursor) -> RowMaker[Receipt]:
+    return parse_receipt
+
+
+def receipt_with_items_row(_cursor) -> RowMaker[Receipt]:
+    return parse_receipt_with_items
+
+
+def parse_receipt_with_items(row) -> Receipt:
+    return new_receipt(row, parse_items(*row[10:20]))
+
+
+def parse_receipt(row) -> Receipt:
+    return new_receipt(row, [])
+
+
+def new_receipt(row, items: t.List[ReceiptItem]) -> Receipt:
+    # Rows are read in the binary format from our own typed schema, so the values
+    # already have the field types and the receipt is built without validation.
+    return construct(
+        Receipt,
+        user_id=construct(UserId, root=row[0]),
+        uuid=row[1],
+        store_name=row[2],
+        store_addr=row[3],
+        date=row[4],
+        time=row[5],
+        items=items,
+        subtotal=from_minor(row[6]),
+        tips=from_minor(row[7]),
+        total=from_minor(row[8]),
+        created_at=row[9]
+    )
+
 
-        ret = Receipt(
-            user_id=row[0],
-            uuid=row[1],
-            store_name=row[2],
-            store_addr=row[3],
-            date=row[4],
-            time=row[5],
-            subtotal=row[6],
-            tips=row[7],
-            total=row[8],
-            created_at=row[9]
-        )
-        ret.items = items
-        return ret
-
-    def read_many(self, user_id: UserId, limit: int, offset: int) -> t.List[Receipt]:
-        return []
+name_statements("receipt", globals())
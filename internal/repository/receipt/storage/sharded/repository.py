@@ -0,0 +1,120 @@
+import heapq
+import typing as t
+from collections import defaultdict
+from datetime import datetime
+from logging import getLogger
+
+from pydantic import UUID4
+
+from internal.domain.receipt import (
+    Receipt,
+    ReceiptMatch,
+    ReceiptCreateError,
+    ReceiptUpdateError,
+    ReceiptReadError,
+)
+from internal.domain.receipt.cursor import Cursor, SearchCursor
+from internal.domain.user.id import UserId
+from internal.repository.receipt.storage.postgres.repository import Repository as ReceiptRepository
+from internal.repository.shard.directory import Directory, DirectoryError
+from internal.usecase.adapters.receipt import (
+    ICreator,
+    IBulkCreator,
+    IUpdater,
+    IReader,
+    IStreamer,
+    ISearcher,
+)
+
+logger = getLogger("receipt.storage.sharded")
+
+default_itersize = 100
+
+
+class Repository(ICreator, IBulkCreator, IUpdater, IReader, IStreamer, ISearcher):
+    # Receipts spread over the postgres shards by user: the receipts of a user, with
+    # their items, are written to and read from the shard the directory places the
+    # user on, and are registered in the directory first, so reads by uuid find them.
+    # The writes hold the placements of their users (see Directory.writing). The
+    # repositories of the shards are keyed by the names of the ring.
+    def __init__(self, directory: Directory, repos: t.Dict[str, ReceiptRepository]):
+        self._directory = directory
+        self._repos = repos
+
+    def create(self, receipt: Receipt):
+        user_id = receipt.user_id.int()
+        try:
+            with self._directory.writing([user_id]) as shards:
+                self._directory.register([(receipt.uuid, user_id)])
+                return self._repos[shards[user_id]].create(receipt)
+        except DirectoryError as e:
+            raise ReceiptCreateError("place receipt err: %s" % e)
+
+    def create_many(self, receipts: t.List[Receipt]) -> int:
+        try:
+            with self._directory.writing([receipt.user_id.int() for receipt in receipts]) as shards:
+                self._directory.register([(receipt.uuid, receipt.user_id.int()) for receipt in receipts])
+                by_shard = defaultdict(list)
+                for receipt in receipts:
+                    by_shard[shards[receipt.user_id.int()]].append(receipt)
+
+                return sum(
+                    self._repos[shard].create_many(shard_receipts) for shard, shard_receipts in by_shard.items()
+                )
+        except DirectoryError as e:
+            raise ReceiptCreateError("place receipts err: %s" % e)
+
+    def update(self, receipt: Receipt):
+        user_id = receipt.user_id.int()
+        try:
+            with self._directory.writing([user_id]) as shards:
+                self._directory.register([(receipt.uuid, user_id)])
+                return self._repos[shards[user_id]].update(receipt)
+        except DirectoryError as e:
+            raise ReceiptUpdateError("place receipt err: %s" % e)
+
+    def read_by_uuid(self, uuid: UUID4) -> t.Optional[Receipt]:
+        try:
+            shard = self._directory.receipt_read_shard(uuid)
+        except DirectoryError as e:
+            raise ReceiptReadError("find receipt err: %s" % e)
+
+        if shard is None:
+            return None
+
+        return self._repos[shard].read_by_uuid(uuid)
+
+    def read_many(self, user_id: UserId, limit: int, cursor: t.Optional[Cursor] = None) -> t.List[Receipt]:
+        return self._repos[self._read_shard(user_id)].read_many(user_id, limit, cursor)
+
+    def search(
+            self,
+            user_id: UserId,
+            query: str,
+            limit: int,
+            cursor: t.Optional[SearchCursor] = None,
+    ) -> t.List[ReceiptMatch]:
+        return self._repos[self._read_shard(user_id)].search(user_id, query, limit, cursor)
+
+    def stream(
+            self,
+            user_id: t.Optional[UserId] = None,
+            since: t.Optional[datetime] = None,
+            until: t.Optional[datetime] = None,
+            itersize: int = default_itersize,
+    ) -> t.Iterator[Receipt]:
+        if user_id is not None:
+            yield from self._repos[self._read_shard(user_id)].stream(user_id, since, until, itersize)
+            return
+
+        # the streams of the shards are merged in creation order
+        yield from heapq.merge(
+            *(repo.stream(None, since, until, itersize) for repo in self._repos.values()),
+            key=lambda receipt: (receipt.created_at, str(receipt.uuid)),
+        )
+
+    def _read_shard(self, user_id: UserId) -> str:
+        try:
+            return self._directory.read_shard(user_id.int())
+        except DirectoryError as e:
+            raise ReceiptReadError("find user receipts err: %s" % e)
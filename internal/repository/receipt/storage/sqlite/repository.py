@@ -0,0 +1,380 @@
+import sqlite3
+import typing as t
+from logging import getLogger
+from uuid import UUID
+
+from pydantic import UUID4
+
+from internal.domain.receipt import (
+    Receipt,
+    ReceiptMatch,
+    ReceiptReadError,
+    ReceiptCreateError,
+    ReceiptUpdateError,
+)
+from internal.domain.receipt.cursor import Cursor, SearchCursor
+from internal.domain.receipt.item import (
+    ReceiptItemCreateError,
+    ReceiptItemReadError,
+    ReceiptItemUpdateError,
+)
+from internal.domain.user.id import UserId
+from internal.repository.receipt_item.storage.sqlite.repository import (
+    Repository as ItemRepository,
+    insert_items,
+    upsert_splits,
+)
+from internal.usecase.adapters.receipt import (
+    ICreator,
+    IBulkCreator,
+    IUpdater,
+    IReader,
+    ISearcher,
+)
+from pkg.model import construct
+from pkg.money import to_minor, from_minor
+from pkg import trgm
+from pkg.sqlite import Database, to_micros, from_micros
+
+logger = getLogger("receipt.storage.sqlite")
+
+CLEAN_SCHEMA_SQL = """
+    DELETE FROM tbl_receipt;
+"""
+
+INSERT_RECEIPT_SQL = """
+    INSERT INTO tbl_receipt (
+        user_id,
+        uuid,
+        store_name,
+        store_addr,
+        date,
+        time,
+        subtotal,
+        tips,
+        total,
+        created_at
+    )
+    VALUES (
+        :user_id,
+        :uuid,
+        :store_name,
+        :store_addr,
+        :date,
+        :time,
+        :subtotal,
+        :tips,
+        :total,
+        :created_at
+    ) ON CONFLICT (uuid) DO NOTHING;
+"""
+
+UPSERT_RECEIPT_SQL = """
+    INSERT INTO tbl_receipt (
+        user_id,
+        uuid,
+        store_name,
+        store_addr,
+        date,
+        time,
+        subtotal,
+        tips,
+        total,
+        created_at
+    )
+    VALUES (
+        :user_id,
+        :uuid,
+        :store_name,
+        :store_addr,
+        :date,
+        :time,
+        :subtotal,
+        :tips,
+        :total,
+        :created_at
+    )
+    ON CONFLICT (uuid)
+    DO UPDATE SET
+        store_name = excluded.store_name,
+        store_addr = excluded.store_addr,
+        date = excluded.date,
+        time = excluded.time,
+        subtotal = excluded.subtotal,
+        tips = excluded.tips,
+        total = excluded.total;
+"""
+
+SELECT_RECEIPT_SQL = """
+    SELECT
+        user_id,
+        uuid,
+        store_name,
+        store_addr,
+        date,
+        time,
+        subtotal,
+        tips,
+        total,
+        created_at
+    FROM tbl_receipt
+    WHERE uuid = :uuid;
+"""
+
+# keyset pagination over (user_id, created_at, uuid), a NULL cursor reads the first page
+SELECT_USER_RECEIPTS_SQL = """
+    SELECT
+        user_id,
+        uuid,
+        store_name,
+        store_addr,
+        date,
+        time,
+        subtotal,
+        tips,
+        total,
+        created_at
+    FROM tbl_receipt
+    WHERE user_id = :user_id
+      AND (:created_at IS NULL OR (created_at, uuid) < (:created_at, :uuid))
+    ORDER BY created_at DESC, uuid DESC
+    LIMIT :limit;
+"""
+
+# SEARCH_USER_RECEIPTS_SQL of the postgres storage, with the pg_trgm functions of
+# pkg.sqlite.Database: the receipts of the user are few enough on a single node to be
+# scanned
+SEARCH_USER_RECEIPTS_SQL = """
+    WITH matches as (
+        SELECT
+            r.uuid,
+            r.created_at,
+            max((word_similarity(:query, i.product) + similarity(:query, i.product)) / 2) as score
+        FROM tbl_receipt as r
+        JOIN tbl_receipt_item as i ON i.receipt_uuid = r.uuid
+        WHERE r.user_id = :user_id
+          AND word_similarity(:query, i.product) >= :threshold
+        GROUP BY r.uuid, r.created_at
+        UNION ALL
+        SELECT
+            r.uuid,
+            r.created_at,
+            (word_similarity(:query, r.store_name) + similarity(:query, r.store_name)) / 2
+        FROM tbl_receipt as r
+        WHERE r.user_id = :user_id
+          AND word_similarity(:query, r.store_name) >= :threshold
+    ), scored as (
+        SELECT uuid, created_at, max(score) as score
+        FROM matches
+        GROUP BY uuid, created_at
+    )
+    SELECT
+        r.user_id,
+        r.uuid,
+        r.store_name,
+        r.store_addr,
+        r.date,
+        r.time,
+        r.subtotal,
+        r.tips,
+        r.total,
+        r.created_at,
+        m.score
+    FROM scored as m
+    JOIN tbl_receipt as r ON r.uuid = m.uuid
+    WHERE :score IS NULL
+       OR m.score < :score
+       OR (m.score = :score AND (r.created_at, r.uuid) < (:created_at, :uuid))
+    ORDER BY m.score DESC, r.created_at DESC, r.uuid DESC
+    LIMIT :limit;
+"""
+
+
+class Repository(ICreator, IBulkCreator, IUpdater, IReader, ISearcher):
+    # Receipts storage in an embedded sqlite database, for single node deployments
+    # and benchmarks. Statements run in process, so a receipt is read with separate
+    # statements for the header, items and splits in one snapshot, where the postgres
+    # storage aggregates them to save round trips.
+    def __init__(self, db: Database, item_repo: ItemRepository):
+        self._db = db
+        self._item_repo = item_repo
+
+    def clean(self):
+        with self._db.connection() as conn:
+            conn.execute(CLEAN_SCHEMA_SQL)
+        logger.info("receipt schema cleaned")
+
+    def create(self, receipt: Receipt):
+        # the receipt and its items are written in one transaction
+        try:
+            with self._db.connection() as conn:
+                conn.execute(INSERT_RECEIPT_SQL, receipt_params(receipt))
+
+                self._item_repo.create_many(receipt.uuid, receipt.created_at, receipt.items)
+
+        except ReceiptItemCreateError as err:
+
+            raise ReceiptCreateError("receipt items create err: %s" % err)
+
+        except sqlite3.Error as e:
+
+            raise ReceiptCreateError("insert receipt err: %s" % e)
+
+        else:
+            logger.info("receipt created: receipt_uuid=%s" % receipt.uuid)
+
+        return None
+
+    def create_many(self, receipts: t.List[Receipt]) -> int:
+        # the batch is written in one transaction, a prepared statement per table;
+        # the items of the receipts which already exist are skipped like them
+        try:
+            with self._db.connection() as conn:
+                cur = conn.executemany(
+                    INSERT_RECEIPT_SQL,
+                    [receipt_params(receipt) for receipt in receipts],
+                )
+                created = cur.rowcount
+                for receipt in receipts:
+                    insert_items(conn, receipt.uuid, receipt.items)
+                upsert_splits(conn, [item for receipt in receipts for item in receipt.items])
+
+        except sqlite3.Error as e:
+
+            raise ReceiptCreateError("insert receipts err: %s" % e)
+
+        else:
+            logger.info("receipts created: receipts_count=%d, created=%d" % (len(receipts), created))
+
+        return created
+
+    def update(self, receipt: Receipt):
+        # the receipt and its items are written in one transaction
+        try:
+            with self._db.connection() as conn:
+                conn.execute(UPSERT_RECEIPT_SQL, receipt_params(receipt))
+
+                self._item_repo.update_many(receipt.uuid, receipt.created_at, receipt.items)
+
+        except ReceiptItemUpdateError as err:
+
+            raise ReceiptUpdateError("receipt items update err: %s" % err)
+
+        except sqlite3.Error as e:
+
+            raise ReceiptUpdateError("upsert receipt err: %s" % e)
+
+        else:
+            logger.info("receipt updated: receipt_uuid=%s" % receipt.uuid)
+
+        return None
+
+    def read_by_uuid(self, uuid: UUID4) -> t.Optional[Receipt]:
+        try:
+            with self._db.reader() as conn:
+                row = conn.execute(SELECT_RECEIPT_SQL, {"uuid": str(uuid)}).fetchone()
+                if row is None:
+                    return None
+
+                receipt = parse_receipt(row)
+                receipt.items = self._item_repo.read_by_receipt_uuid(receipt.uuid)
+        except sqlite3.Error as e:
+            raise ReceiptReadError("select receipt err: %s" % e)
+        except ReceiptItemReadError as err:
+            raise ReceiptReadError("read receipt items err: %s" % err)
+
+        return receipt
+
+    def read_many(self, user_id: UserId, limit: int, cursor: t.Optional[Cursor] = None) -> t.List[Receipt]:
+        try:
+            with self._db.reader() as conn:
+                receipts = [
+                    parse_receipt(row)
+                    for row in conn.execute(
+                        SELECT_USER_RECEIPTS_SQL,
+                        {
+                            "user_id": user_id.int(),
+                            "created_at": to_micros(cursor.created_at) if cursor is not None else None,
+                            "uuid": str(cursor.uuid) if cursor is not None else None,
+                            "limit": limit,
+                        },
+                    )
+                ]
+                items = self._item_repo.read_by_receipt_uuids([receipt.uuid for receipt in receipts])
+        except sqlite3.Error as e:
+            raise ReceiptReadError("select receipts err: %s" % e)
+        except ReceiptItemReadError as err:
+            raise ReceiptReadError("read receipts items err: %s" % err)
+
+        for receipt in receipts:
+            receipt.items = items[receipt.uuid]
+
+        return receipts
+
+    def search(
+            self,
+            user_id: UserId,
+            query: str,
+            limit: int,
+            cursor: t.Optional[SearchCursor] = None,
+    ) -> t.List[ReceiptMatch]:
+        try:
+            with self._db.reader() as conn:
+                matches = [
+                    construct(ReceiptMatch, receipt=parse_receipt(row), score=row[10])
+                    for row in conn.execute(
+                        SEARCH_USER_RECEIPTS_SQL,
+                        {
+                            "user_id": user_id.int(),
+                            "query": query,
+                            "threshold": trgm.word_similarity_threshold,
+                            "score": cursor.score if cursor is not None else None,
+                            "created_at": to_micros(cursor.created_at) if cursor is not None else None,
+                            "uuid": str(cursor.uuid) if cursor is not None else None,
+                            "limit": limit,
+                        },
+                    )
+                ]
+                items = self._item_repo.read_by_receipt_uuids([match.receipt.uuid for match in matches])
+        except sqlite3.Error as e:
+            raise ReceiptReadError("search receipts err: %s" % e)
+        except ReceiptItemReadError as err:
+            raise ReceiptReadError("read searched receipts items err: %s" % err)
+
+        for match in matches:
+            match.receipt.items = items[match.receipt.uuid]
+
+        return matches
+
+
+def receipt_params(receipt: Receipt) -> t.Dict[str, t.Any]:
+    return {
+        'user_id': receipt.user_id.int(),
+        'uuid': str(receipt.uuid),
+        'store_name': receipt.store_name,
+        'store_addr': receipt.store_addr,
+        'date': receipt.date,
+        'time': receipt.time,
+        'subtotal': to_minor(receipt.subtotal),
+        'tips': to_minor(receipt.tips),
+        'total': to_minor(receipt.total),
+        'created_at': to_micros(receipt.created_at),
+    }
+
+
+def parse_receipt(row) -> Receipt:
+    # rows of our own schema, the receipt is built without validation
+    return construct(
+        Receipt,
+        user_id=construct(UserId, root=row[0]),
+        uuid=UUID(row[1]),
+        store_name=row[2],
+        store_addr=row[3],
+        date=row[4],
+        time=row[5],
+        items=[],
+        subtotal=from_minor(row[6]),
+        tips=from_minor(row[7]),
+        total=from_minor(row[8]),
+        created_at=from_micros(row[9]),
+    )
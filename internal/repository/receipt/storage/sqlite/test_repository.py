@@ -0,0 +1,190 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+
+from internal.domain.receipt import Receipt, ReceiptItem
+from internal.domain.receipt.item import Choice
+from internal.domain.user.id import UserId
+from internal.repository.receipt.storage.sqlite.repository import Repository
+from internal.repository.receipt_item.storage.sqlite.repository import Repository as ItemRepository
+from internal.repository.migrations.sqlite import migrations
+from pkg.sqlite import Database, Migrator
+from pkg.trgm import score
+
+
+@pytest.fixture(scope="session")
+def db(tmp_path_factory) -> Database:
+    db = Database(str(tmp_path_factory.mktemp("sqlite") / "receipts.db"))
+    Migrator(db, migrations()).migrate()
+    yield db
+    db.close()
+
+
+@pytest.fixture(scope="function")
+def item_repo(db) -> ItemRepository:
+    repo = ItemRepository(db)
+
+    yield repo
+
+    repo.clean()
+
+
+@pytest.fixture(scope="function")
+def repo(db, item_repo) -> Repository:
+    repo = Repository(db, item_repo)
+
+    yield repo
+
+    repo.clean()
+
+
+@pytest.fixture(scope="function")
+def receipt() -> Receipt:
+    return Receipt(
+        user_id=3,
+        store_name="magnum",
+        store_addr="dostyk avenue 46",
+        items=[
+            ReceiptItem(
+                product="fanta",
+                quantity=2,
+                price=1000
+            ),
+            ReceiptItem(
+                product="coco col 1",
+                quantity=1,
+                price=1000
+            ),
+            ReceiptItem(
+                product="coco col 3",
+                quantity=1,
+                price=1000
+            )
+        ],
+        subtotal=1234.35,
+        tips=123.0,
+        total=1234.35 + 123.0
+    )
+
+
+def test_create(repo, receipt):
+    repo.create(receipt)
+
+    created_receipt = repo.read_by_uuid(receipt.uuid)
+
+    assert created_receipt == receipt
+
+
+def test_update(repo, receipt):
+    repo.create(receipt)
+
+    receipt.total = 2999.99
+    receipt.subtotal = 1999.88
+    receipt.items[1].quantity = 5
+
+    repo.update(receipt)
+
+    updated_receipt = repo.read_by_uuid(receipt.uuid)
+
+    assert receipt.total == updated_receipt.total
+    assert receipt.subtotal == updated_receipt.subtotal
+    assert updated_receipt.items[1].quantity == 5
+    assert updated_receipt.items[1].version == 1
+
+
+def test_read_many(repo, receipt):
+    receipts = [receipt] + [
+        Receipt(
+            user_id=receipt.user_id,
+            created_at=receipt.created_at - timedelta(days=i),
+            items=[ReceiptItem(product="product %d" % i, quantity=1, price=100)],
+        )
+        for i in range(1, 5)
+    ]
+    for r in receipts:
+        repo.create(r)
+
+    page = repo.read_many(receipt.user_id, limit=3)
+    assert [r.uuid for r in page] == [r.uuid for r in receipts[:3]]
+    assert len(page[0].items) == len(receipt.items)
+
+    page = repo.read_many(receipt.user_id, limit=3, cursor=page[-1].cursor())
+    assert [r.uuid for r in page] == [r.uuid for r in receipts[3:]]
+
+    page = repo.read_many(receipt.user_id, limit=3, cursor=page[-1].cursor())
+    assert page == []
+
+    assert repo.read_many(UserId(receipt.user_id.int() + 1), limit=3) == []
+
+
+def test_search(repo, receipt):
+    receipts = [receipt] + [
+        Receipt(
+            user_id=receipt.user_id,
+            store_name=store_name,
+            created_at=receipt.created_at - timedelta(days=i),
+            items=[ReceiptItem(product=product, quantity=1, price=100)],
+        )
+        for i, (store_name, product) in enumerate(
+            [
+                ("small", "Fanta orange"),
+                ("ФАНТА shop", "water"),
+                ("small", "orange fanta"),
+            ],
+            start=1,
+        )
+    ]
+    for r in receipts:
+        repo.create(r)
+    repo.create(Receipt(user_id=receipt.user_id.int() + 1, items=[ReceiptItem(product="fanta", quantity=1, price=1)]))
+
+    page = repo.search(receipt.user_id, "FANTA", limit=2)
+    assert [m.receipt.uuid for m in page] == [r.uuid for r in receipts[:2]]
+    assert [m.score for m in page] == [1.0, score("FANTA", "Fanta orange")]
+
+    page = repo.search(receipt.user_id, "FANTA", limit=2, cursor=page[-1].cursor())
+    assert [(m.receipt.uuid, m.score) for m in page] == [(receipts[3].uuid, score("FANTA", "orange fanta"))]
+    assert len(page[0].receipt.items) == 1
+
+    # case is folded beyond ascii
+    assert [m.receipt.uuid for m in repo.search(receipt.user_id, "фанта", limit=2)] == [receipts[2].uuid]
+
+
+def test_read_by_uuid(repo, receipt):
+    receipt.items[0].split(
+        Choice(uuid=receipt.items[0].uuid, username="user1", quantity=1)
+    )
+    receipt.items[0].split(
+        Choice(uuid=receipt.items[0].uuid, username="user2", quantity=1)
+    )
+    repo.create(receipt)
+
+    got = repo.read_by_uuid(receipt.uuid)
+
+    assert [item.uuid for item in got.items] == [item.uuid for item in receipt.items]
+    assert got.items[0].splits == {"user1", "user2"}
+    assert got.items[1].splits == set()
+
+    assert repo.read_by_uuid(uuid.uuid4()) is None
+
+
+def test_create_many(repo, receipt):
+    receipt.items[0].split(
+        Choice(uuid=receipt.items[0].uuid, username="user1", quantity=2)
+    )
+    receipts = [receipt] + [
+        Receipt(
+            user_id=receipt.user_id,
+            items=[ReceiptItem(product="product %d" % i, quantity=1, price=100)],
+        )
+        for i in range(1, 5)
+    ]
+
+    assert repo.create_many(receipts) == len(receipts)
+    # already stored receipts are skipped
+    assert repo.create_many(receipts) == 0
+
+    got = repo.read_by_uuid(receipt.uuid)
+    assert len(got.items) == len(receipt.items)
+    assert got.items[0].splits == {"user1"}
@@ -0,0 +1,145 @@
+from datetime import timedelta
+
+import pytest
+
+from internal.domain.receipt import Receipt, ReceiptItem
+from internal.domain.receipt.item import Choice
+from internal.domain.user.id import UserId
+from internal.usecase.adapters.receipt import IStreamer
+from pkg.trgm import score
+
+# the contract of the receipt storages, run against each backend by the `storage` fixture
+
+
+@pytest.fixture(scope="function")
+def receipt() -> Receipt:
+    return Receipt(
+        user_id=3,
+        store_name="magnum",
+        store_addr="dostyk avenue 46",
+        items=[
+            ReceiptItem(
+                product="fanta",
+                quantity=2,
+                price=1000
+            ),
+            ReceiptItem(
+                product="coco col 1",
+                quantity=1,
+                price=1000
+            ),
+        ],
+        subtotal=1234.35,
+        tips=123.0,
+        total=1234.35 + 123.0
+    )
+
+
+def history(receipt: Receipt, count: int):
+    # receipts of the user of the given one, one a day before it
+    return [receipt] + [
+        Receipt(
+            user_id=receipt.user_id,
+            created_at=receipt.created_at - timedelta(days=i),
+            items=[ReceiptItem(product="product %d" % i, quantity=1, price=100)],
+        )
+        for i in range(1, count)
+    ]
+
+
+def test_create(storage, receipt):
+    receipt.items[0].split(
+        Choice(uuid=receipt.items[0].uuid, username="user1", quantity=1)
+    )
+    storage.receipts.create(receipt)
+
+    assert storage.receipts.read_by_uuid(receipt.uuid) == receipt
+
+
+def test_update(storage, receipt):
+    storage.receipts.create(receipt)
+
+    receipt.total = 2999.99
+    receipt.items[1].quantity = 5
+    storage.receipts.update(receipt)
+
+    updated = storage.receipts.read_by_uuid(receipt.uuid)
+    assert updated.total == receipt.total
+    assert updated.items[1].quantity == 5
+    assert updated.items[1].version == 1
+
+
+def test_read_many(storage, receipt):
+    receipts = history(receipt, 5)
+    for r in reversed(receipts):
+        storage.receipts.create(r)
+
+    page = storage.receipts.read_many(receipt.user_id, limit=3)
+    assert [r.uuid for r in page] == [r.uuid for r in receipts[:3]]
+
+    page = storage.receipts.read_many(receipt.user_id, limit=3, cursor=page[-1].cursor())
+    assert [r.uuid for r in page] == [r.uuid for r in receipts[3:]]
+
+    assert storage.receipts.read_many(receipt.user_id, limit=3, cursor=page[-1].cursor()) == []
+    assert storage.receipts.read_many(UserId(receipt.user_id.int() + 1), limit=3) == []
+
+
+def test_create_many(storage, receipt):
+    receipts = history(receipt, 4)
+
+    assert storage.receipts.create_many(receipts) == len(receipts)
+    # already stored receipts are skipped
+    assert storage.receipts.create_many(receipts) == 0
+    assert len(storage.receipts.read_many(receipt.user_id, limit=10)) == len(receipts)
+
+
+def test_search(storage, receipt):
+    receipts = [receipt] + [
+        Receipt(
+            user_id=receipt.user_id,
+            store_name=store_name,
+            created_at=receipt.created_at - timedelta(days=i),
+            items=[ReceiptItem(product=product, quantity=1, price=100)],
+        )
+        for i, (store_name, product) in enumerate(
+            [
+                ("small", "Fanta orange"),
+                ("big", "water"),
+                ("small", "orange fanta"),
+            ],
+            start=1,
+        )
+    ]
+    for r in receipts:
+        storage.receipts.create(r)
+    storage.receipts.create(
+        Receipt(user_id=receipt.user_id.int() + 1, items=[ReceiptItem(product="fanta", quantity=1, price=1)])
+    )
+
+    # the equal product, then the products having it as a word newest first
+    page = storage.receipts.search(receipt.user_id, "FANTA", limit=2)
+    assert [(m.receipt.uuid, m.score) for m in page] == [
+        (receipts[0].uuid, 1.0),
+        (receipts[1].uuid, pytest.approx(score("FANTA", "Fanta orange"))),
+    ]
+
+    page = storage.receipts.search(receipt.user_id, "FANTA", limit=2, cursor=page[-1].cursor())
+    assert [(m.receipt.uuid, m.score) for m in page] == [
+        (receipts[3].uuid, pytest.approx(score("FANTA", "orange fanta"))),
+    ]
+
+
+def test_stream(storage, receipt):
+    if not isinstance(storage.receipts, IStreamer):
+        pytest.skip("%s storage doesn't stream receipts" % storage.backend)
+
+    receipts = history(receipt, 5)
+    storage.receipts.create_many(receipts)
+
+    streamed = storage.receipts.stream(
+        user_id=receipt.user_id,
+        since=receipts[3].created_at,
+        until=receipt.created_at,
+        itersize=1,
+    )
+    assert [r.uuid for r in streamed] == [receipts[3].uuid, receipts[2].uuid, receipts[1].uuid]
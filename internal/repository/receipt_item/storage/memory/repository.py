@@ -0,0 +1,188 @@
+import bisect
+import threading
+import typing as t
+from collections import defaultdict
+from datetime import datetime
+from logging import getLogger
+
+from pydantic import UUID4
+
+from internal.domain.receipt.item import ReceiptItem, SplitLedger
+from internal.domain.receipt.item import (
+    ReceiptItemCreateError,
+    ReceiptItemUpdateError,
+    ReceiptItemConflictError,
+)
+from internal.usecase.adapters.receipt.item import (
+    ICreator,
+    IUpdater,
+    IReader,
+)
+from pkg.model import construct
+from pkg.money import to_minor, from_minor
+
+logger = getLogger("receipt_item.storage.memory")
+
+
+class Row(t.NamedTuple):
+    receipt_uuid: UUID4
+    uuid: UUID4
+    product: str
+    quantity: int
+    price: int
+    created_at: datetime
+    split_error_message: str
+    version: int
+
+
+class Repository(ICreator, IUpdater, IReader):
+    # Receipt items held in process for tests and benchmarks, with the semantics of the
+    # postgres storage: items are kept as rows (money in minor units) and read as new
+    # objects, indexed by uuid, by receipt in (created_at, uuid) order and by (receipt,
+    # product), which is unique. A lock serializes the operations, which validate their
+    # whole batch before changing anything, so a failed one changes nothing.
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._items: t.Dict[UUID4, Row] = {}
+        self._splits: t.Dict[UUID4, t.Dict[str, int]] = {}
+        self._by_receipt: t.Dict[UUID4, t.List[t.Tuple[datetime, str, UUID4]]] = defaultdict(list)
+        self._by_product: t.Dict[t.Tuple[UUID4, str], UUID4] = {}
+
+    def clean(self):
+        with self._lock:
+            self._items.clear()
+            self._splits.clear()
+            self._by_receipt.clear()
+            self._by_product.clear()
+
+    def create_many(
+            self,
+            receipt_uuid: UUID4,
+            receipt_created_at: datetime,
+            receipt_items: t.List[ReceiptItem],
+    ):
+        with self._lock:
+            # an item whose product the receipt already has is skipped
+            products = set()
+            created = []
+            for item in receipt_items:
+                if (receipt_uuid, item.product) in self._by_product or item.product in products:
+                    continue
+                if item.uuid in self._items:
+                    raise ReceiptItemCreateError("insert receipt_items err: duplicate uuid=%s" % item.uuid)
+                products.add(item.product)
+                created.append(item)
+
+            for item in created:
+                self._insert(item_row(receipt_uuid, item, item.version))
+                self._splits[item.uuid] = dict(item.splits.items())
+
+        logger.info(
+            "receipt receipt_items created: receipt_uuid=%s, items_count=%d" % (receipt_uuid, len(receipt_items))
+        )
+        return None
+
+    def update_many(
+            self,
+            receipt_uuid: UUID4,
+            receipt_created_at: datetime,
+            receipt_items: t.List[ReceiptItem],
+    ):
+        with self._lock:
+            conflicts = [
+                item for item in receipt_items
+                if item.uuid in self._items and self._items[item.uuid].version != item.version
+            ]
+            if conflicts:
+                raise ReceiptItemConflictError(
+                    "receipt_items changed concurrently: uuids=%s" % [str(item.uuid) for item in conflicts]
+                )
+
+            for item in receipt_items:
+                owner = self._by_product.get((receipt_uuid, item.product))
+                if owner is not None and owner != item.uuid:
+                    raise ReceiptItemUpdateError(
+                        "upsert receipt_items err: duplicate product=%s" % item.product
+                    )
+
+            versions = {}
+            for item in receipt_items:
+                stored = self._items.get(item.uuid)
+                if stored is not None:
+                    self._delete(stored)
+                    versions[item.uuid] = stored.version + 1
+                    self._insert(item_row(receipt_uuid, item, versions[item.uuid])._replace(created_at=stored.created_at))
+                else:
+                    versions[item.uuid] = item.version
+                    self._insert(item_row(receipt_uuid, item, item.version))
+                self._splits[item.uuid] = dict(item.splits.items())
+
+        for item in receipt_items:
+            item.version = versions[item.uuid]
+        logger.info(
+            "receipt receipt_items updated: receipt_uuid=%s, items_count=%d" % (receipt_uuid, len(receipt_items))
+        )
+        return None
+
+    def read_by_uuid(self, uuid: UUID4) -> t.Optional[ReceiptItem]:
+        with self._lock:
+            row = self._items.get(uuid)
+            if row is None:
+                return None
+            return self._parse(row)
+
+    def read_by_receipt_uuid(self, receipt_uuid: UUID4) -> t.List[ReceiptItem]:
+        with self._lock:
+            return [self._parse(self._items[key[2]]) for key in self._by_receipt.get(receipt_uuid, [])]
+
+    def read_by_receipt_uuids(
+            self,
+            receipt_uuids: t.List[UUID4],
+            receipt_created_ats: t.Optional[t.List[datetime]] = None,
+    ) -> t.Dict[UUID4, t.List[ReceiptItem]]:
+        with self._lock:
+            return {receipt_uuid: self.read_by_receipt_uuid(receipt_uuid) for receipt_uuid in receipt_uuids}
+
+    def _insert(self, row: Row):
+        self._items[row.uuid] = row
+        bisect.insort(self._by_receipt[row.receipt_uuid], (row.created_at, str(row.uuid), row.uuid))
+        self._by_product[(row.receipt_uuid, row.product)] = row.uuid
+
+    def _delete(self, row: Row):
+        del self._items[row.uuid]
+        self._by_receipt[row.receipt_uuid].remove((row.created_at, str(row.uuid), row.uuid))
+        del self._by_product[(row.receipt_uuid, row.product)]
+
+    def _parse(self, row: Row) -> ReceiptItem:
+        return construct(
+            ReceiptItem,
+            uuid=row.uuid,
+            product=row.product,
+            quantity=row.quantity,
+            price=from_minor(row.price),
+            created_at=row.created_at,
+            splits=parse_splits(self._splits.get(row.uuid, {})),
+            split_error_message=row.split_error_message if row.split_error_message else "",
+            version=row.version,
+        )
+
+
+def item_row(receipt_uuid: UUID4, item: ReceiptItem, version: int) -> Row:
+    return Row(
+        receipt_uuid=receipt_uuid,
+        uuid=item.uuid,
+        product=item.product,
+        quantity=item.quantity,
+        price=to_minor(item.price),
+        created_at=item.created_at,
+        split_error_message=item.split_error_message,
+        version=version,
+    )
+
+
+def parse_splits(quantities: t.Dict[str, int]) -> SplitLedger:
+    ret = SplitLedger()
+    for username, quantity in quantities.items():
+        if username and quantity:
+            ret.assign(username, quantity)
+    return ret
@@ -0,0 +1,166 @@
+import typing as t
+from datetime import datetime
+from logging import getLogger
+
+import psycopg
+from pydantic import UUID4
+
+from internal.domain.receipt.item import (
+    ReceiptItem,
+    ReceiptItemCreateError,
+    ReceiptItemUpdateError,
+    ReceiptItemConflictError,
+    ReceiptItemReadError,
+)
+from internal.usecase.adapters.receipt.item import (
+    IAsyncCreator,
+    IAsyncUpdater,
+    IAsyncReader,
+)
+from internal.repository.receipt_settlement.storage.postgres.repository import (
+    APPLY_SETTLEMENT_DELTA_SQL,
+    REFRESH_SETTLEMENTS_SQL,
+    delta_params,
+)
+from pkg.postgres import AsyncPool
+from .repository import (
+    INSERT_RECEIPT_ITEMS_SQL,
+    UPSERT_RECEIPT_ITEMS_SQL,
+    UPSERT_RECEIPT_ITEM_SPLITS_SQL,
+    REPLACE_RECEIPT_ITEM_SPLITS_SQL,
+    NOTIFY_RECEIPT_CHANGED_SQL,
+    SELECT_RECEIPT_ITEMS_SQL,
+    receipts_items_query,
+    items_params,
+    splits_params,
+    item_row,
+    parse_item,
+)
+
+logger = getLogger("receipt_item.storage.postgres.async")
+
+
+class AsyncRepository(IAsyncCreator, IAsyncUpdater, IAsyncReader):
+    def __init__(self, pool: AsyncPool):
+        self._pool = pool
+
+    async def create_many(
+            self,
+            receipt_uuid: UUID4,
+            receipt_created_at: datetime,
+            receipt_items: t.List[ReceiptItem],
+    ):
+        try:
+            async with self._pool.transaction() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        query=INSERT_RECEIPT_ITEMS_SQL,
+                        params=items_params(receipt_uuid, receipt_created_at, receipt_items)
+                    )
+                    await cur.execute(
+                        query=UPSERT_RECEIPT_ITEM_SPLITS_SQL,
+                        params=splits_params(receipt_created_at, receipt_items)
+                    )
+                    if any(item.splits for item in receipt_items):
+                        await cur.execute(
+                            query=REFRESH_SETTLEMENTS_SQL,
+                            params={
+                                "receipt_uuids": [receipt_uuid],
+                                "receipt_created_ats": [receipt_created_at],
+                            }
+                        )
+                    await cur.execute(
+                        query=NOTIFY_RECEIPT_CHANGED_SQL,
+                        params={"receipt_uuid": receipt_uuid}
+                    )
+        except psycopg.errors.DatabaseError as e:
+            raise ReceiptItemCreateError("insert receipt_items err: %s" % e)
+        else:
+            logger.info(
+                "receipt receipt_items created: receipt_uuid=%s, items_count=%d" % (receipt_uuid, len(receipt_items))
+            )
+        return None
+
+    async def update_many(
+            self,
+            receipt_uuid: UUID4,
+            receipt_created_at: datetime,
+            receipt_items: t.List[ReceiptItem],
+    ):
+        try:
+            async with self._pool.transaction() as conn:
+                # the settlement is updated first, from the splits the items had
+                await conn.execute(
+                    query=APPLY_SETTLEMENT_DELTA_SQL,
+                    params=delta_params(receipt_uuid, receipt_created_at, receipt_items)
+                )
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        query=UPSERT_RECEIPT_ITEMS_SQL,
+                        params=items_params(receipt_uuid, receipt_created_at, receipt_items)
+                    )
+                    versions = dict(await cur.fetchall())
+                    conflicts = [item for item in receipt_items if item.uuid not in versions]
+                    if conflicts:
+                        raise ReceiptItemConflictError(
+                            "receipt_items changed concurrently: uuids=%s" % [str(item.uuid) for item in conflicts]
+                        )
+                    await cur.execute(
+                        query=REPLACE_RECEIPT_ITEM_SPLITS_SQL,
+                        params=splits_params(receipt_created_at, receipt_items)
+                    )
+                    await cur.execute(
+                        query=NOTIFY_RECEIPT_CHANGED_SQL,
+                        params={"receipt_uuid": receipt_uuid}
+                    )
+        except psycopg.errors.DatabaseError as e:
+            raise ReceiptItemUpdateError("upsert receipt_items err: %s" % e)
+        else:
+            for item in receipt_items:
+                item.version = versions[item.uuid]
+            logger.info(
+                "receipt receipt_items updated: receipt_uuid=%s, items_count=%d" % (receipt_uuid, len(receipt_items))
+            )
+        return None
+
+    async def read_by_receipt_uuid(self, receipt_uuid: UUID4) -> t.List[ReceiptItem]:
+        try:
+            async with self._pool.connection() as conn:
+                async with conn.cursor(binary=True, row_factory=item_row) as cur:
+                    await cur.execute(
+                        SELECT_RECEIPT_ITEMS_SQL,
+                        params={
+                            "receipt_uuid": receipt_uuid,
+                        },
+                        prepare=True,
+                    )
+                    receipt_items = await cur.fetchall()
+        except psycopg.errors.DatabaseError as e:
+            raise ReceiptItemReadError("select receipt_items err: %s" % e)
+
+        return receipt_items
+
+    async def read_by_receipt_uuids(
+            self,
+            receipt_uuids: t.List[UUID4],
+            receipt_created_ats: t.Optional[t.List[datetime]] = None,
+    ) -> t.Dict[UUID4, t.List[ReceiptItem]]:
+        receipt_items = {receipt_uuid: [] for receipt_uuid in receipt_uuids}
+        if not receipt_uuids:
+            return receipt_items
+
+        try:
+            async with self._pool.connection() as conn:
+                async with conn.cursor(binary=True) as cur:
+                    await cur.execute(
+                        *receipts_items_query(receipt_uuids, receipt_created_ats),
+                        prepare=True,
+                    )
+                    async for row in cur:
+                        receipt_items[row[0]].append(
+                            parse_item(row[1:])
+                        )
+        except psycopg.errors.DatabaseError as e:
+            raise ReceiptItemReadError("select receipts receipt_items err: %s" % e)
+
+        return receipt_items
@@ -1,13 +1,17 @@
 import typing as t
+from collections import defaultdict
+from datetime import datetime
 from logging import getLogger
 
 import psycopg
+from psycopg.rows import RowMaker
 from pydantic import UUID4
 
-from internal.domain.receipt.item import ReceiptItem, Split
+from internal.domain.receipt.item import ReceiptItem, SplitLedger
 from internal.domain.receipt.item import (
     ReceiptItemCreateError,
     ReceiptItemUpdateError,
+    ReceiptItemConflictError,
     ReceiptItemReadError,
 )
 from internal.usecase.adapters.receipt.item import (
@@ -15,29 +19,35 @@ from internal.usecase.adapters.receipt.item import (
     IUpdater,
     IReader,
 )
+from internal.repository.receipt_settlement.storage.postgres.repository import apply_delta, refresh
+from pkg.model import construct
+from pkg.money import to_minor, from_minor
+from pkg.postgres import ConnectionProvider, name_statements
 
 logger = getLogger("receipt_item.storage.postgres")
 
-CREATE_RECEIPT_ITEM_SQL = b"""
-    CREATE TABLE IF NOT EXISTS tbl_receipt_item (
-        receipt_uuid        text NOT NULL,
-        uuid                varchar(255) PRIMARY KEY,
-        product             text,
-        quantity            integer,
-        price               numeric(6),
-        split_error_message text,
-        created_at          timestamp without time zone,
-        UNIQUE(receipt_uuid, product)
-    );
+# Readers cache the receipts (see internal.repository.receipt.storage.cache) and
+# evict them on the notifications the writers send on this channel, delivered on
+# commit. Receipts are always written along with their items, so the item writes
+# send them.
+RECEIPT_CHANGED_CHANNEL = "receipt_changed"
+
+NOTIFY_RECEIPT_CHANGED_SQL = b"""
+    SELECT pg_notify('receipt_changed', %(receipt_uuid)s::text);
 """
 
 CLEAN_RECEIPT_ITEM_SQL = b"""
     truncate table tbl_receipt_item;
 """
 
-INSERT_RECEIPT_ITEM_SQL = b"""
+# the items and splits of a receipt are written with a fixed number of statements
+# whatever their count: their fields are sent as parallel arrays, see `items_params`
+# and `splits_params`, and unnested into rows by the server
+
+INSERT_RECEIPT_ITEMS_SQL = b"""
     INSERT INTO tbl_receipt_item (
         receipt_uuid,
+        receipt_created_at,
         uuid, 
         product, 
         quantity, 
@@ -45,27 +55,67 @@ INSERT_RECEIPT_ITEM_SQL = b"""
         created_at,
         split_error_message
     )
-    VALUES (%s, %s, %s, %s, %s, %s, %s) 
-    ON CONFLICT (receipt_uuid, product) 
+    SELECT
+        %(receipt_uuid)s,
+        %(receipt_created_at)s,
+        i.uuid,
+        i.product,
+        i.quantity,
+        i.price,
+        i.created_at,
+        i.split_error_message
+    FROM unnest(
+        %(uuids)s::uuid[],
+        %(products)s::text[],
+        %(quantities)s::integer[],
+        %(prices)s::bigint[],
+        %(created_ats)s::timestamptz[],
+        %(split_error_messages)s::text[]
+    ) as i(uuid, product, quantity, price, created_at, split_error_message)
+    ON CONFLICT (receipt_uuid, product, receipt_created_at) 
     DO NOTHING;
 """
 
-UPSERT_RECEIPT_ITEM_SQL = b"""
+# Compare and swap: an existing item is updated only if its version is still the one
+# it was read with, and gets the next version. The statement returns the uuids of the
+# inserted and updated items, an item missing from them was changed concurrently.
+UPSERT_RECEIPT_ITEMS_SQL = b"""
     INSERT INTO tbl_receipt_item (
         receipt_uuid,
+        receipt_created_at,
         uuid,
         product,
         quantity,
         price,
-        split_error_message
+        split_error_message,
+        version
     )
-    VALUES (%s, %s, %s, %s, %s, %s)
-    ON CONFLICT(uuid)
+    SELECT
+        %(receipt_uuid)s,
+        %(receipt_created_at)s,
+        i.uuid,
+        i.product,
+        i.quantity,
+        i.price,
+        i.split_error_message,
+        i.version
+    FROM unnest(
+        %(uuids)s::uuid[],
+        %(products)s::text[],
+        %(quantities)s::integer[],
+        %(prices)s::bigint[],
+        %(split_error_messages)s::text[],
+        %(versions)s::integer[]
+    ) as i(uuid, product, quantity, price, split_error_message, version)
+    ON CONFLICT(uuid, receipt_created_at)
     DO UPDATE SET
         product = EXCLUDED.product, 
         quantity = EXCLUDED.quantity,
         split_error_message = EXCLUDED.split_error_message,
-        price = EXCLUDED.price;
+        price = EXCLUDED.price,
+        version = tbl_receipt_item.version + 1
+    WHERE tbl_receipt_item.version = EXCLUDED.version
+    RETURNING uuid, version;
 """
 
 SELECT_RECEIPT_ITEM_SQL = b"""
@@ -76,12 +126,14 @@ SELECT_RECEIPT_ITEM_SQL = b"""
         i.price, 
         i.created_at, 
         i.split_error_message,
-        json_agg(json_build_object('username', s.username, 'quantity', s.quantity))
+        i.version,
+        array_agg(s.username) FILTER (WHERE s.uuid IS NOT NULL),
+        array_agg(s.quantity) FILTER (WHERE s.uuid IS NOT NULL)
     FROM tbl_receipt_item as i
     LEFT JOIN tbl_receipt_item_split as s
-    ON (i.uuid = s.uuid)
+    ON (i.uuid = s.uuid AND i.receipt_created_at = s.receipt_created_at)
     WHERE i.uuid = %(uuid)s
-    GROUP BY i.uuid;
+    GROUP BY i.uuid, i.receipt_created_at;
 """
 
 SELECT_RECEIPT_ITEMS_SQL = b"""
@@ -92,127 +144,212 @@ SELECT_RECEIPT_ITEMS_SQL = b"""
         i.price, 
         i.created_at,
         i.split_error_message,
-        json_agg(json_build_object('username', s.username, 'quantity', s.quantity))
+        i.version,
+        array_agg(s.username) FILTER (WHERE s.uuid IS NOT NULL),
+        array_agg(s.quantity) FILTER (WHERE s.uuid IS NOT NULL)
     FROM tbl_receipt_item as i
     LEFT JOIN tbl_receipt_item_split as s
-    ON (i.uuid = s.uuid)
+    ON (i.uuid = s.uuid AND i.receipt_created_at = s.receipt_created_at)
     WHERE i.receipt_uuid=%(receipt_uuid)s
-    GROUP BY i.uuid;
+    GROUP BY i.uuid, i.receipt_created_at
+    ORDER BY i.created_at, i.uuid;
 """
 
-CREATE_RECEIPT_ITEM_SPLIT_SQL = b"""
-    CREATE TABLE IF NOT EXISTS tbl_receipt_item_split (
-        uuid           varchar(255),
-        username       text,
-        quantity       integer,
-        UNIQUE(uuid, username)
-    );
+SELECT_RECEIPTS_ITEMS_SQL = b"""
+    SELECT
+        i.receipt_uuid,
+        i.uuid, 
+        i.product, 
+        i.quantity, 
+        i.price, 
+        i.created_at,
+        i.split_error_message,
+        i.version,
+        array_agg(s.username) FILTER (WHERE s.uuid IS NOT NULL),
+        array_agg(s.quantity) FILTER (WHERE s.uuid IS NOT NULL)
+    FROM tbl_receipt_item as i
+    LEFT JOIN tbl_receipt_item_split as s
+    ON (i.uuid = s.uuid AND i.receipt_created_at = s.receipt_created_at)
+    WHERE i.receipt_uuid = ANY(%(receipt_uuids)s)
+    GROUP BY i.uuid, i.receipt_created_at
+    ORDER BY i.created_at, i.uuid;
+"""
+
+# SELECT_RECEIPTS_ITEMS_SQL for receipts of known creation times, which reads only the
+# partitions of their months when the tables are partitioned (see apps.partition)
+SELECT_RECEIPTS_ITEMS_AT_SQL = b"""
+    SELECT
+        i.receipt_uuid,
+        i.uuid,
+        i.product,
+        i.quantity,
+        i.price,
+        i.created_at,
+        i.split_error_message,
+        i.version,
+        array_agg(s.username) FILTER (WHERE s.uuid IS NOT NULL),
+        array_agg(s.quantity) FILTER (WHERE s.uuid IS NOT NULL)
+    FROM tbl_receipt_item as i
+    LEFT JOIN tbl_receipt_item_split as s
+    ON (
+        i.uuid = s.uuid
+        AND i.receipt_created_at = s.receipt_created_at
+        AND s.receipt_created_at = ANY(%(receipt_created_ats)s::timestamptz[])
+    )
+    WHERE i.receipt_uuid = ANY(%(receipt_uuids)s::uuid[])
+      AND i.receipt_created_at = ANY(%(receipt_created_ats)s::timestamptz[])
+      AND (i.receipt_uuid, i.receipt_created_at) IN (
+          SELECT * FROM unnest(%(receipt_uuids)s::uuid[], %(receipt_created_ats)s::timestamptz[])
+      )
+    GROUP BY i.uuid, i.receipt_created_at
+    ORDER BY i.created_at, i.uuid;
 """
 
 CLEAN_RECEIPT_ITEM_SPLIT_SQL = b"""
     truncate table tbl_receipt_item_split;
 """
 
-UPSERT_RECEIPT_ITEM_SPLIT_SQL = b"""
+UPSERT_RECEIPT_ITEM_SPLITS_SQL = b"""
     INSERT INTO tbl_receipt_item_split (
         uuid,
+        receipt_created_at,
         username,
         quantity
     )
-    VALUES (%s, %s, %s)
-    ON CONFLICT(uuid, username)
+    SELECT
+        s.uuid,
+        %(receipt_created_at)s,
+        s.username,
+        s.quantity
+    FROM unnest(
+        %(uuids)s::uuid[],
+        %(usernames)s::text[],
+        %(quantities)s::integer[]
+    ) as s(uuid, username, quantity)
+    ON CONFLICT(uuid, username, receipt_created_at)
     DO UPDATE SET
-        quantity = EXCLUDED.quantity;
+        quantity = EXCLUDED.quantity
+    WHERE tbl_receipt_item_split.quantity IS DISTINCT FROM EXCLUDED.quantity;
 """
 
+# the splits of the items are replaced by the given ones: the splits missing from
+# them are deleted and the others upserted by one statement (the two parts don't
+# touch the same rows)
+REPLACE_RECEIPT_ITEM_SPLITS_SQL = b"""
+    WITH splits as (
+        SELECT * FROM unnest(
+            %(uuids)s::uuid[],
+            %(usernames)s::text[],
+            %(quantities)s::integer[]
+        ) as s(uuid, username, quantity)
+    ), deleted as (
+        DELETE FROM tbl_receipt_item_split as s
+        WHERE s.uuid = ANY(%(item_uuids)s::uuid[])
+          AND s.receipt_created_at = %(receipt_created_at)s
+          AND NOT EXISTS (
+              SELECT 1 FROM splits as n WHERE n.uuid = s.uuid AND n.username = s.username
+          )
+    )
+    INSERT INTO tbl_receipt_item_split (
+        uuid,
+        receipt_created_at,
+        username,
+        quantity
+    )
+    SELECT
+        s.uuid,
+        %(receipt_created_at)s,
+        s.username,
+        s.quantity
+    FROM splits as s
+    ON CONFLICT(uuid, username, receipt_created_at)
+    DO UPDATE SET
+        quantity = EXCLUDED.quantity
+    WHERE tbl_receipt_item_split.quantity IS DISTINCT FROM EXCLUDED.quantity;
+"""
 
-class Repository(ICreator, IUpdater, IReader):
-    def __init__(self, conn: psycopg.Connection):
-        self._conn = conn
-        self.init_schema()
 
-    def init_schema(self):
-        with self._conn.cursor() as cur:
-            cur.execute(query=CREATE_RECEIPT_ITEM_SQL)
-            cur.execute(query=CREATE_RECEIPT_ITEM_SPLIT_SQL)
-        self._conn.commit()
-        logger.info("receipt item schema is ready")
+class Repository(ICreator, IUpdater, IReader):
+    def __init__(self, pool: ConnectionProvider):
+        self._pool = pool
 
     def clean(self):
-        with self._conn.cursor() as cur:
-            cur.execute(query=CLEAN_RECEIPT_ITEM_SQL)
-            cur.execute(query=CLEAN_RECEIPT_ITEM_SPLIT_SQL)
-        self._conn.commit()
+        with self._pool.connection() as conn:
+            conn.execute(query=CLEAN_RECEIPT_ITEM_SQL)
+            conn.execute(query=CLEAN_RECEIPT_ITEM_SPLIT_SQL)
         logger.info("receipt item schema cleaned")
 
-    def create_many(self, receipt_uuid: UUID4, receipt_items: t.List[ReceiptItem]):
+    def create_many(
+            self,
+            receipt_uuid: UUID4,
+            receipt_created_at: datetime,
+            receipt_items: t.List[ReceiptItem],
+    ):
         try:
-            with self._conn.cursor() as cur:
-                cur.executemany(
-                    query=UPSERT_RECEIPT_ITEM_SPLIT_SQL,
-                    params_seq=[
-                        (
-                            receipt_item.uuid,
-                            split.username,
-                            split.quantity
-                        ) for receipt_item in receipt_items for split in receipt_item.splits
-                    ]
-                )
-                cur.executemany(
-                    query=INSERT_RECEIPT_ITEM_SQL,
-                    params_seq=[
-                        (
-                            receipt_uuid,
-                            item.uuid,
-                            item.product,
-                            item.quantity,
-                            item.price,
-                            item.created_at,
-                            item.split_error_message
-                        ) for item in receipt_items
-                    ]
-                )
+            with self._pool.transaction() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        query=INSERT_RECEIPT_ITEMS_SQL,
+                        params=items_params(receipt_uuid, receipt_created_at, receipt_items)
+                    )
+                    cur.execute(
+                        query=UPSERT_RECEIPT_ITEM_SPLITS_SQL,
+                        params=splits_params(receipt_created_at, receipt_items)
+                    )
+                    if any(item.splits for item in receipt_items):
+                        refresh(conn, [receipt_uuid], [receipt_created_at])
+                    cur.execute(
+                        query=NOTIFY_RECEIPT_CHANGED_SQL,
+                        params={"receipt_uuid": receipt_uuid}
+                    )
         except psycopg.errors.DatabaseError as e:
-            self._conn.rollback()
             raise ReceiptItemCreateError("insert receipt_items err: %s" % e)
         else:
-            self._conn.commit()
+            self._pool.written(receipt_uuid, *(item.uuid for item in receipt_items))
             logger.info(
                 "receipt receipt_items created: receipt_uuid=%s, items_count=%d" % (receipt_uuid, len(receipt_items))
             )
         return None
 
-    def update_many(self, receipt_uuid: UUID4, receipt_items: t.List[ReceiptItem]):
+    def update_many(
+            self,
+            receipt_uuid: UUID4,
+            receipt_created_at: datetime,
+            receipt_items: t.List[ReceiptItem],
+    ):
         try:
-            with self._conn.cursor() as cur:
-                cur.executemany(
-                    query=UPSERT_RECEIPT_ITEM_SPLIT_SQL,
-                    params_seq=[
-                        (
-                            receipt_item.uuid,
-                            split.username,
-                            split.quantity
-                        ) for receipt_item in receipt_items for split in receipt_item.splits
-                    ]
-                )
-                cur.executemany(
-                    query=UPSERT_RECEIPT_ITEM_SQL,
-                    params_seq=[
-                        (
-                            receipt_uuid,
-                            item.uuid,
-                            item.product,
-                            item.quantity,
-                            item.price,
-                            item.split_error_message
-                        ) for item in receipt_items
-                    ]
-                )
+            with self._pool.transaction() as conn:
+                # the settlement is updated first, from the splits the items had
+                apply_delta(conn, receipt_uuid, receipt_created_at, receipt_items)
+                with conn.cursor() as cur:
+                    cur.execute(
+                        query=UPSERT_RECEIPT_ITEMS_SQL,
+                        params=items_params(receipt_uuid, receipt_created_at, receipt_items)
+                    )
+                    versions = dict(cur.fetchall())
+                    conflicts = [item for item in receipt_items if item.uuid not in versions]
+                    if conflicts:
+                        raise ReceiptItemConflictError(
+                            "receipt_items changed concurrently: uuids=%s" % [str(item.uuid) for item in conflicts]
+                        )
+                    cur.execute(
+                        query=REPLACE_RECEIPT_ITEM_SPLITS_SQL,
+                        params=splits_params(receipt_created_at, receipt_items)
+                    )
+                    cur.execute(
+                        query=NOTIFY_RECEIPT_CHANGED_SQL,
+                        params={"receipt_uuid": receipt_uuid}
+                    )
         except psycopg.errors.DatabaseError as e:
-            self._conn.rollback()
             raise ReceiptItemUpdateError("upsert receipt_items err: %s" % e)
+        except ReceiptItemConflictError:
+            # the reads of the caller retrying with fresh items must see the concurrent update
+            self._pool.written(receipt_uuid, *(item.uuid for item in receipt_items))
+            raise
         else:
-            self._conn.commit()
+            for item in receipt_items:
+                item.version = versions[item.uuid]
+            self._pool.written(receipt_uuid, *(item.uuid for item in receipt_items))
             logger.info(
                 "receipt receipt_items updated: receipt_uuid=%s, items_count=%d" % (receipt_uuid, len(receipt_items))
             )
@@ -220,62 +357,191 @@ class Repository(ICreator, IUpdater, IReader):
 
     def read_by_uuid(self, uuid: UUID4) -> t.Optional[ReceiptItem]:
         try:
-            with self._conn.cursor() as cur:
-                cur.execute(
-                    SELECT_RECEIPT_ITEM_SQL,
-                    params={
-                        "uuid": str(uuid)
-                    }
-                )
-
-                row = cur.fetchone()
+            with self._pool.replica(uuid) as conn:
+                with conn.cursor(binary=True, row_factory=item_row) as cur:
+                    cur.execute(
+                        SELECT_RECEIPT_ITEM_SQL,
+                        params={
+                            "uuid": uuid
+                        },
+                        prepare=True,
+                    )
+
+                    item = cur.fetchone()
         except psycopg.errors.DatabaseError as e:
             raise ReceiptItemReadError("select item err: %s" % e)
 
-        return ReceiptItem(
-            uuid=row[0],
-            product=row[1],
-            quantity=row[2],
-            price=row[3],
-            created_at=row[4],
-            split_error_message=row[5] if row[5] else "",
-            splits=parse_splits(row[6])
-        )
+        return item
 
     def read_by_receipt_uuid(self, receipt_uuid: UUID4) -> t.List[ReceiptItem]:
-        receipt_items = []
         try:
-            with self._conn.cursor() as cur:
-                cur.execute(
-                    SELECT_RECEIPT_ITEMS_SQL,
-                    params={
-                        "receipt_uuid": str(receipt_uuid),
-                    }
-                )
-                for row in cur:
-                    receipt_items.append(
-                        ReceiptItem(
-                            uuid=row[0],
-                            product=row[1],
-                            quantity=row[2],
-                            price=row[3],
-                            created_at=row[4],
-                            split_error_message=row[5] if row[5] else "",
-                            splits=parse_splits(row[6])
-                        )
+            with self._pool.replica(receipt_uuid) as conn:
+                with conn.cursor(binary=True, row_factory=item_row) as cur:
+                    cur.execute(
+                        SELECT_RECEIPT_ITEMS_SQL,
+                        params={
+                            "receipt_uuid": receipt_uuid,
+                        },
+                        prepare=True,
                     )
+                    receipt_items = cur.fetchall()
         except psycopg.errors.DatabaseError as e:
             raise ReceiptItemReadError("select receipt_items err: %s" % e)
 
         return receipt_items
 
+    def read_by_receipt_uuids(
+            self,
+            receipt_uuids: t.List[UUID4],
+            receipt_created_ats: t.Optional[t.List[datetime]] = None,
+    ) -> t.Dict[UUID4, t.List[ReceiptItem]]:
+        # batched read of the items of many receipts in a single query
+        receipt_items = {receipt_uuid: [] for receipt_uuid in receipt_uuids}
+        if not receipt_uuids:
+            return receipt_items
+
+        try:
+            with self._pool.replica(*receipt_uuids) as conn:
+                with conn.cursor(binary=True) as cur:
+                    cur.execute(
+                        *receipts_items_query(receipt_uuids, receipt_created_ats),
+                        prepare=True,
+                    )
+                    for row in cur:
+                        receipt_items[row[0]].append(
+                            parse_item(row[1:])
+                        )
+        except psycopg.errors.DatabaseError as e:
+            raise ReceiptItemReadError("select receipts receipt_items err: %s" % e)
+
+        return receipt_items
+
+
+def receipts_items_query(
+        receipt_uuids: t.List[UUID4],
+        receipt_created_ats: t.Optional[t.List[datetime]],
+) -> t.Tuple[bytes, t.Dict[str, t.Any]]:
+    if receipt_created_ats is None:
+        return SELECT_RECEIPTS_ITEMS_SQL, {"receipt_uuids": list(receipt_uuids)}
+    return SELECT_RECEIPTS_ITEMS_AT_SQL, {
+        "receipt_uuids": list(receipt_uuids),
+        "receipt_created_ats": list(receipt_created_ats),
+    }
+
+
+def items_params(
+        receipt_uuid: UUID4,
+        receipt_created_at: datetime,
+        receipt_items: t.List[ReceiptItem],
+) -> t.Dict[str, t.Any]:
+    return {
+        "receipt_uuid": receipt_uuid,
+        "receipt_created_at": receipt_created_at,
+        "uuids": [item.uuid for item in receipt_items],
+        "products": [item.product for item in receipt_items],
+        "quantities": [item.quantity for item in receipt_items],
+        "prices": [to_minor(item.price) for item in receipt_items],
+        "created_ats": [item.created_at for item in receipt_items],
+        "split_error_messages": [item.split_error_message for item in receipt_items],
+        "versions": [item.version for item in receipt_items],
+    }
 
-def parse_splits(data) -> t.Set[Split]:
-    ret = set()
-    for ob in data:
-        if ob and ob.get("username") and ob.get('quantity'):
-            ret.add(
-                Split(username=ob['username'], quantity=ob['quantity'])
-            )
+
+def splits_params(receipt_created_at: datetime, receipt_items: t.List[ReceiptItem]) -> t.Dict[str, t.Any]:
+    splits = [(item.uuid, username, quantity) for item in receipt_items for username, quantity in item.splits.items()]
+    return {
+        "receipt_created_at": receipt_created_at,
+        "item_uuids": [item.uuid for item in receipt_items],
+        "uuids": [split[0] for split in splits],
+        "usernames": [split[1] for split in splits],
+        "quantities": [split[2] for split in splits],
+    }
+
+
+def item_row(_cursor) -> RowMaker[ReceiptItem]:
+    return parse_item
+
+
+def parse_item(row) -> ReceiptItem:
+    # Rows are read in the binary format from our own typed schema, so the values
+    # already have the field types and the item is built without validation.
+    # The splits come as parallel arrays of usernames and quantities.
+    return new_item(
+        row[0],
+        row[1],
+        row[2],
+        row[3],
+        row[4],
+        row[5],
+        row[6],
+        parse_splits(row[7], row[8]),
+    )
+
+
+def parse_items(
+        uuids: t.Optional[t.List[UUID4]],
+        products: t.List[str],
+        quantities: t.List[int],
+        prices: t.List[int],
+        created_ats: t.List[datetime],
+        split_error_messages: t.List[t.Optional[str]],
+        versions: t.List[int],
+        split_uuids: t.Optional[t.List[UUID4]],
+        split_usernames: t.List[str],
+        split_quantities: t.List[int],
+) -> t.List[ReceiptItem]:
+    # items of a receipt aggregated into parallel arrays, None when there are no items,
+    # and the splits of all of them keyed by item uuid
+    if uuids is None:
+        return []
+
+    splits = defaultdict(SplitLedger)
+    if split_uuids is not None:
+        for uuid, username, quantity in zip(split_uuids, split_usernames, split_quantities):
+            if username and quantity:
+                splits[uuid].assign(username, quantity)
+
+    return [
+        new_item(uuid, product, quantity, price, created_at, split_error_message, version, splits[uuid])
+        for uuid, product, quantity, price, created_at, split_error_message, version in zip(
+            uuids, products, quantities, prices, created_ats, split_error_messages, versions
+        )
+    ]
+
+
+def new_item(
+        uuid: UUID4,
+        product: str,
+        quantity: int,
+        price: int,
+        created_at: datetime,
+        split_error_message: t.Optional[str],
+        version: int,
+        splits: SplitLedger,
+) -> ReceiptItem:
+    return construct(
+        ReceiptItem,
+        uuid=uuid,
+        product=product,
+        quantity=quantity,
+        price=from_minor(price),
+        created_at=created_at,
+        splits=splits,
+        split_error_message=split_error_message if split_error_message else "",
+        version=version,
+    )
+
+
+def parse_splits(usernames: t.Optional[t.List[str]], quantities: t.Optional[t.List[int]]) -> SplitLedger:
+    ret = SplitLedger()
+    if usernames is None:
+        return ret
+
+    for username, quantity in zip(usernames, quantities):
+        if username and quantity:
+            ret.assign(username, quantity)
 
     return ret
+
+
+name_statements("receipt_item", globals())
@@ -0,0 +1,75 @@
+import typing as t
+from collections import defaultdict
+from datetime import datetime
+
+from pydantic import UUID4
+
+from internal.domain.receipt.item import (
+    ReceiptItem,
+    ReceiptItemCreateError,
+    ReceiptItemUpdateError,
+    ReceiptItemReadError,
+)
+from internal.repository.receipt_item.storage.postgres.repository import Repository as ItemRepository
+from internal.repository.shard.directory import Directory, DirectoryError
+from internal.usecase.adapters.receipt.item import (
+    ICreator,
+    IUpdater,
+    IReader,
+)
+
+
+class Repository(ICreator, IUpdater, IReader):
+    # Receipt items on the shard of their receipt, found by its uuid in the directory
+    # (see the sharded receipt repository, which registers the receipts).
+    def __init__(self, directory: Directory, repos: t.Dict[str, ItemRepository]):
+        self._directory = directory
+        self._repos = repos
+
+    def create_many(self, receipt_uuid: UUID4, receipt_created_at: datetime, receipt_items: t.List[ReceiptItem]):
+        try:
+            with self._directory.receipt_writing(receipt_uuid) as shards:
+                if receipt_uuid not in shards:
+                    raise ReceiptItemCreateError("find receipt err: receipt_uuid=%s is not registered" % receipt_uuid)
+
+                return self._repos[shards[receipt_uuid]].create_many(receipt_uuid, receipt_created_at, receipt_items)
+        except DirectoryError as e:
+            raise ReceiptItemCreateError("find receipt err: %s" % e)
+
+    def update_many(self, receipt_uuid: UUID4, receipt_created_at: datetime, receipt_items: t.List[ReceiptItem]):
+        try:
+            with self._directory.receipt_writing(receipt_uuid) as shards:
+                if receipt_uuid not in shards:
+                    raise ReceiptItemUpdateError("find receipt err: receipt_uuid=%s is not registered" % receipt_uuid)
+
+                return self._repos[shards[receipt_uuid]].update_many(receipt_uuid, receipt_created_at, receipt_items)
+        except DirectoryError as e:
+            raise ReceiptItemUpdateError("find receipt err: %s" % e)
+
+    def read_by_receipt_uuid(self, receipt_uuid: UUID4) -> t.List[ReceiptItem]:
+        return self.read_by_receipt_uuids([receipt_uuid])[receipt_uuid]
+
+    def read_by_receipt_uuids(
+            self,
+            receipt_uuids: t.List[UUID4],
+            receipt_created_ats: t.Optional[t.List[datetime]] = None,
+    ) -> t.Dict[UUID4, t.List[ReceiptItem]]:
+        try:
+            placements = self._directory.receipt_placements(receipt_uuids)
+        except DirectoryError as e:
+            raise ReceiptItemReadError("find receipts err: %s" % e)
+
+        created_ats = dict(zip(receipt_uuids, receipt_created_ats)) if receipt_created_ats is not None else None
+        by_shard = defaultdict(list)
+        for receipt_uuid, placement in placements.items():
+            by_shard[placement.shard].append(receipt_uuid)
+
+        items = {receipt_uuid: [] for receipt_uuid in receipt_uuids}
+        for shard, shard_receipt_uuids in by_shard.items():
+            items.update(
+                self._repos[shard].read_by_receipt_uuids(
+                    shard_receipt_uuids,
+                    [created_ats[uuid] for uuid in shard_receipt_uuids] if created_ats is not None else None,
+                )
+            )
+        return items
@@ -0,0 +1,344 @@
+import json
+import sqlite3
+import typing as t
+from collections import defaultdict
+from datetime import datetime
+from logging import getLogger
+from uuid import UUID
+
+from pydantic import UUID4
+
+from internal.domain.receipt.item import ReceiptItem, SplitLedger
+from internal.domain.receipt.item import (
+    ReceiptItemCreateError,
+    ReceiptItemUpdateError,
+    ReceiptItemConflictError,
+    ReceiptItemReadError,
+)
+from internal.usecase.adapters.receipt.item import (
+    ICreator,
+    IUpdater,
+    IReader,
+)
+from pkg.model import construct
+from pkg.money import to_minor, from_minor
+from pkg.sqlite import Database, to_micros, from_micros
+
+logger = getLogger("receipt_item.storage.sqlite")
+
+CLEAN_RECEIPT_ITEM_SQL = """
+    DELETE FROM tbl_receipt_item;
+"""
+
+CLEAN_RECEIPT_ITEM_SPLIT_SQL = """
+    DELETE FROM tbl_receipt_item_split;
+"""
+
+# the rows are written with `executemany`, which runs one prepared statement per row
+# in the transaction of the batch
+
+INSERT_RECEIPT_ITEM_SQL = """
+    INSERT INTO tbl_receipt_item (
+        receipt_uuid,
+        uuid,
+        product,
+        quantity,
+        price,
+        created_at,
+        split_error_message
+    )
+    VALUES (
+        :receipt_uuid,
+        :uuid,
+        :product,
+        :quantity,
+        :price,
+        :created_at,
+        :split_error_message
+    )
+    ON CONFLICT (receipt_uuid, product)
+    DO NOTHING;
+"""
+
+UPSERT_RECEIPT_ITEM_SQL = """
+    INSERT INTO tbl_receipt_item (
+        receipt_uuid,
+        uuid,
+        product,
+        quantity,
+        price,
+        created_at,
+        split_error_message,
+        version
+    )
+    VALUES (
+        :receipt_uuid,
+        :uuid,
+        :product,
+        :quantity,
+        :price,
+        :created_at,
+        :split_error_message,
+        :version
+    )
+    ON CONFLICT (uuid)
+    DO UPDATE SET
+        product = excluded.product,
+        quantity = excluded.quantity,
+        split_error_message = excluded.split_error_message,
+        price = excluded.price,
+        version = tbl_receipt_item.version + 1;
+"""
+
+# lists of values are sent as one json array parameter, so the statement text, and
+# the prepared statement, is the same whatever their length
+SELECT_VERSIONS_SQL = """
+    SELECT uuid, version
+    FROM tbl_receipt_item
+    WHERE uuid IN (SELECT value FROM json_each(:uuids));
+"""
+
+UPSERT_RECEIPT_ITEM_SPLIT_SQL = """
+    INSERT INTO tbl_receipt_item_split (
+        uuid,
+        username,
+        quantity
+    )
+    VALUES (
+        :uuid,
+        :username,
+        :quantity
+    )
+    ON CONFLICT (uuid, username)
+    DO UPDATE SET
+        quantity = excluded.quantity;
+"""
+
+DELETE_RECEIPT_ITEMS_SPLITS_SQL = """
+    DELETE FROM tbl_receipt_item_split
+    WHERE uuid IN (SELECT value FROM json_each(:uuids));
+"""
+
+SELECT_RECEIPT_ITEM_SQL = """
+    SELECT
+        uuid,
+        product,
+        quantity,
+        price,
+        created_at,
+        split_error_message,
+        version
+    FROM tbl_receipt_item
+    WHERE uuid = :uuid;
+"""
+
+SELECT_RECEIPT_ITEM_SPLITS_SQL = """
+    SELECT
+        username,
+        quantity
+    FROM tbl_receipt_item_split
+    WHERE uuid = :uuid;
+"""
+
+SELECT_RECEIPTS_ITEMS_SQL = """
+    SELECT
+        receipt_uuid,
+        uuid,
+        product,
+        quantity,
+        price,
+        created_at,
+        split_error_message,
+        version
+    FROM tbl_receipt_item
+    WHERE receipt_uuid IN (SELECT value FROM json_each(:receipt_uuids))
+    ORDER BY created_at, uuid;
+"""
+
+SELECT_RECEIPTS_ITEMS_SPLITS_SQL = """
+    SELECT
+        s.uuid,
+        s.username,
+        s.quantity
+    FROM tbl_receipt_item as i
+    JOIN tbl_receipt_item_split as s ON s.uuid = i.uuid
+    WHERE i.receipt_uuid IN (SELECT value FROM json_each(:receipt_uuids));
+"""
+
+
+class Repository(ICreator, IUpdater, IReader):
+    # the receipt_created_at arguments partition the postgres tables, they are not stored
+    def __init__(self, db: Database):
+        self._db = db
+
+    def clean(self):
+        with self._db.connection() as conn:
+            conn.execute(CLEAN_RECEIPT_ITEM_SQL)
+            conn.execute(CLEAN_RECEIPT_ITEM_SPLIT_SQL)
+        logger.info("receipt item schema cleaned")
+
+    def create_many(
+            self,
+            receipt_uuid: UUID4,
+            receipt_created_at: datetime,
+            receipt_items: t.List[ReceiptItem],
+    ):
+        try:
+            with self._db.connection() as conn:
+                insert_items(conn, receipt_uuid, receipt_items)
+                upsert_splits(conn, receipt_items)
+        except sqlite3.Error as e:
+            raise ReceiptItemCreateError("insert receipt_items err: %s" % e)
+        else:
+            logger.info(
+                "receipt receipt_items created: receipt_uuid=%s, items_count=%d" % (receipt_uuid, len(receipt_items))
+            )
+        return None
+
+    def update_many(
+            self,
+            receipt_uuid: UUID4,
+            receipt_created_at: datetime,
+            receipt_items: t.List[ReceiptItem],
+    ):
+        # Compare and swap as in the postgres storage: the write transaction holds the
+        # database lock, so the versions read can't change before the items are written.
+        try:
+            with self._db.connection() as conn:
+                stored = dict(
+                    conn.execute(
+                        SELECT_VERSIONS_SQL,
+                        {"uuids": json.dumps([str(item.uuid) for item in receipt_items])},
+                    ).fetchall()
+                )
+                conflicts = [
+                    item for item in receipt_items
+                    if str(item.uuid) in stored and stored[str(item.uuid)] != item.version
+                ]
+                if conflicts:
+                    raise ReceiptItemConflictError(
+                        "receipt_items changed concurrently: uuids=%s" % [str(item.uuid) for item in conflicts]
+                    )
+
+                conn.executemany(
+                    UPSERT_RECEIPT_ITEM_SQL,
+                    [item_params(receipt_uuid, item) for item in receipt_items],
+                )
+                conn.execute(
+                    DELETE_RECEIPT_ITEMS_SPLITS_SQL,
+                    {"uuids": json.dumps([str(item.uuid) for item in receipt_items])},
+                )
+                upsert_splits(conn, receipt_items)
+        except sqlite3.Error as e:
+            raise ReceiptItemUpdateError("upsert receipt_items err: %s" % e)
+        else:
+            for item in receipt_items:
+                if str(item.uuid) in stored:
+                    item.version = stored[str(item.uuid)] + 1
+            logger.info(
+                "receipt receipt_items updated: receipt_uuid=%s, items_count=%d" % (receipt_uuid, len(receipt_items))
+            )
+        return None
+
+    def read_by_uuid(self, uuid: UUID4) -> t.Optional[ReceiptItem]:
+        try:
+            with self._db.reader() as conn:
+                row = conn.execute(SELECT_RECEIPT_ITEM_SQL, {"uuid": str(uuid)}).fetchone()
+                split_rows = conn.execute(SELECT_RECEIPT_ITEM_SPLITS_SQL, {"uuid": str(uuid)}).fetchall()
+        except sqlite3.Error as e:
+            raise ReceiptItemReadError("select item err: %s" % e)
+
+        if row is None:
+            return None
+
+        return parse_item(row, parse_splits(split_rows))
+
+    def read_by_receipt_uuid(self, receipt_uuid: UUID4) -> t.List[ReceiptItem]:
+        return self.read_by_receipt_uuids([receipt_uuid])[receipt_uuid]
+
+    def read_by_receipt_uuids(
+            self,
+            receipt_uuids: t.List[UUID4],
+            receipt_created_ats: t.Optional[t.List[datetime]] = None,
+    ) -> t.Dict[UUID4, t.List[ReceiptItem]]:
+        # the items and their splits are read by two statements in one snapshot
+        receipt_items = {receipt_uuid: [] for receipt_uuid in receipt_uuids}
+        if not receipt_uuids:
+            return receipt_items
+
+        params = {"receipt_uuids": json.dumps([str(receipt_uuid) for receipt_uuid in receipt_uuids])}
+        try:
+            with self._db.reader() as conn:
+                rows = conn.execute(SELECT_RECEIPTS_ITEMS_SQL, params).fetchall()
+                split_rows = conn.execute(SELECT_RECEIPTS_ITEMS_SPLITS_SQL, params).fetchall()
+        except sqlite3.Error as e:
+            raise ReceiptItemReadError("select receipts receipt_items err: %s" % e)
+
+        splits = defaultdict(list)
+        for row in split_rows:
+            splits[row[0]].append(row[1:])
+
+        by_uuid = {str(receipt_uuid): receipt_uuid for receipt_uuid in receipt_uuids}
+        for row in rows:
+            receipt_items[by_uuid[row[0]]].append(
+                parse_item(row[1:], parse_splits(splits[row[1]]))
+            )
+
+        return receipt_items
+
+
+def insert_items(conn: sqlite3.Connection, receipt_uuid: UUID4, receipt_items: t.List[ReceiptItem]):
+    conn.executemany(
+        INSERT_RECEIPT_ITEM_SQL,
+        [item_params(receipt_uuid, item) for item in receipt_items],
+    )
+
+
+def upsert_splits(conn: sqlite3.Connection, receipt_items: t.List[ReceiptItem]):
+    conn.executemany(
+        UPSERT_RECEIPT_ITEM_SPLIT_SQL,
+        [
+            {
+                "uuid": str(item.uuid),
+                "username": username,
+                "quantity": quantity,
+            }
+            for item in receipt_items for username, quantity in item.splits.items()
+        ],
+    )
+
+
+def item_params(receipt_uuid: UUID4, item: ReceiptItem) -> t.Dict[str, t.Any]:
+    return {
+        "receipt_uuid": str(receipt_uuid),
+        "uuid": str(item.uuid),
+        "product": item.product,
+        "quantity": item.quantity,
+        "price": to_minor(item.price),
+        "created_at": to_micros(item.created_at),
+        "split_error_message": item.split_error_message,
+        "version": item.version,
+    }
+
+
+def parse_item(row, splits: SplitLedger) -> ReceiptItem:
+    # rows of our own schema, the item is built without validation
+    return construct(
+        ReceiptItem,
+        uuid=UUID(row[0]),
+        product=row[1],
+        quantity=row[2],
+        price=from_minor(row[3]),
+        created_at=from_micros(row[4]),
+        splits=splits,
+        split_error_message=row[5] if row[5] else "",
+        version=row[6],
+    )
+
+
+def parse_splits(rows) -> SplitLedger:
+    ret = SplitLedger()
+    for username, quantity in rows:
+        if username and quantity:
+            ret.assign(username, quantity)
+    return ret
@@ -0,0 +1,134 @@
+import typing as t
+import uuid
+from datetime import datetime
+
+import pytest
+
+from pydantic import UUID4
+
+from internal.domain.receipt.item import ReceiptItem, Split, Choice, ReceiptItemConflictError, SplitLedger
+from internal.repository.receipt_item.storage.sqlite.repository import Repository
+from internal.repository.migrations.sqlite import migrations
+from pkg.datetime import now
+from pkg.sqlite import Database, Migrator
+
+
+@pytest.fixture(scope="session")
+def db(tmp_path_factory) -> Database:
+    db = Database(str(tmp_path_factory.mktemp("sqlite") / "receipts.db"))
+    Migrator(db, migrations()).migrate()
+    yield db
+    db.close()
+
+
+@pytest.fixture(scope="function")
+def repo(db) -> Repository:
+    repo = Repository(db)
+
+    yield repo
+
+    repo.clean()
+
+
+@pytest.fixture(scope="function")
+def receipt_uuid() -> UUID4:
+    return uuid.uuid4()
+
+
+@pytest.fixture(scope="function")
+def receipt_created_at() -> datetime:
+    return now()
+
+
+@pytest.fixture(scope="function")
+def receipt_items() -> t.List[ReceiptItem]:
+    return [
+        ReceiptItem(
+            product="pepsi cola",
+            quantity=3,
+            price=5678,
+            splits={
+                Split(username="user1", quantity=2),
+                Split(username="user2")
+            }
+        ),
+        ReceiptItem(
+            product="banan",
+            quantity=3,
+            price=100,
+            splits={
+                Split(username="user1"),
+                Split(username="user2", quantity=2)
+            }
+        ),
+        ReceiptItem(
+            product="apple",
+            quantity=3,
+            price=100,
+            split_error_message="receipt item can't be split",
+        ),
+    ]
+
+
+def test_create_many(repo, receipt_uuid, receipt_created_at, receipt_items):
+    repo.create_many(receipt_uuid, receipt_created_at, receipt_items)
+
+    created_items = repo.read_by_receipt_uuid(receipt_uuid)
+
+    assert [item.uuid for item in created_items] == [item.uuid for item in receipt_items]
+    assert created_items[0].splits == receipt_items[0].splits
+    assert created_items[0].price == receipt_items[0].price
+    assert created_items[0].created_at == receipt_items[0].created_at
+    assert created_items[2].split_error_message == receipt_items[2].split_error_message
+
+
+def test_update_many(repo, receipt_uuid, receipt_created_at, receipt_items):
+    repo.create_many(receipt_uuid, receipt_created_at, receipt_items)
+
+    receipt_items[1].product = "new name"
+    receipt_items[1].quantity = 777
+    receipt_items[1].split(
+        Choice(
+            username="user1",
+            uuid=receipt_items[1].uuid,
+        )
+    )
+
+    repo.update_many(receipt_uuid, receipt_created_at, receipt_items)
+
+    updated_item = repo.read_by_uuid(receipt_items[1].uuid)
+
+    assert receipt_items[1].product == updated_item.product
+    assert receipt_items[1].quantity == updated_item.quantity
+
+
+def test_update_many_replaces_splits(repo, receipt_uuid, receipt_created_at, receipt_items):
+    repo.create_many(receipt_uuid, receipt_created_at, receipt_items)
+
+    receipt_items[0].splits = SplitLedger({Split(username="user1", quantity=3)})
+    receipt_items[1].splits = SplitLedger()
+
+    repo.update_many(receipt_uuid, receipt_created_at, receipt_items[:2])
+
+    items = {item.uuid: item for item in repo.read_by_receipt_uuid(receipt_uuid)}
+    assert [(s.username, s.quantity) for s in items[receipt_items[0].uuid].splits] == [("user1", 3)]
+    assert items[receipt_items[1].uuid].splits == set()
+
+
+def test_update_many_conflict(repo, receipt_uuid, receipt_created_at, receipt_items):
+    repo.create_many(receipt_uuid, receipt_created_at, receipt_items)
+
+    # two users split the same item read at the same version
+    first, second = repo.read_by_uuid(receipt_items[0].uuid), repo.read_by_uuid(receipt_items[0].uuid)
+    first.splits = SplitLedger({Split(username="user1", quantity=3)})
+    second.splits = SplitLedger({Split(username="user2", quantity=3)})
+
+    repo.update_many(receipt_uuid, receipt_created_at, [first])
+    assert first.version == 1
+
+    with pytest.raises(ReceiptItemConflictError):
+        repo.update_many(receipt_uuid, receipt_created_at, [second])
+
+    item = repo.read_by_uuid(receipt_items[0].uuid)
+    assert item.version == 1
+    assert [(s.username, s.quantity) for s in item.splits] == [("user1", 3)]
@@ -0,0 +1,110 @@
+import typing as t
+import uuid
+from datetime import datetime
+
+import pytest
+from pydantic import UUID4
+
+from internal.domain.receipt import Receipt
+from internal.domain.receipt.item import ReceiptItem, Split, ReceiptItemConflictError, SplitLedger
+
+# the contract of the receipt item storages, run against each backend by the `storage` fixture
+
+
+@pytest.fixture(scope="function")
+def receipt(storage) -> Receipt:
+    # the items are saved along with their receipt, the sharded storage finds them by it
+    receipt = Receipt(user_id=3)
+    storage.receipts.create(receipt)
+    return receipt
+
+
+@pytest.fixture(scope="function")
+def receipt_uuid(receipt) -> UUID4:
+    return receipt.uuid
+
+
+@pytest.fixture(scope="function")
+def receipt_created_at(receipt) -> datetime:
+    return receipt.created_at
+
+
+@pytest.fixture(scope="function")
+def receipt_items() -> t.List[ReceiptItem]:
+    return [
+        ReceiptItem(
+            product="pepsi cola",
+            quantity=3,
+            price=5678,
+            splits={
+                Split(username="user1", quantity=2),
+                Split(username="user2")
+            }
+        ),
+        ReceiptItem(
+            product="banan",
+            quantity=3,
+            price=100,
+            split_error_message="receipt item can't be split",
+        ),
+    ]
+
+
+def test_create_many(storage, receipt_uuid, receipt_created_at, receipt_items):
+    storage.receipt_items.create_many(receipt_uuid, receipt_created_at, receipt_items)
+
+    created = storage.receipt_items.read_by_receipt_uuid(receipt_uuid)
+    assert created == receipt_items
+
+    other_uuid = uuid.uuid4()
+    assert storage.receipt_items.read_by_receipt_uuids([receipt_uuid, other_uuid]) == {
+        receipt_uuid: created,
+        other_uuid: [],
+    }
+    assert storage.receipt_items.read_by_receipt_uuids(
+        [receipt_uuid, other_uuid],
+        [receipt_created_at, receipt_created_at],
+    ) == {
+        receipt_uuid: created,
+        other_uuid: [],
+    }
+
+
+def test_create_many_skips_stored_products(storage, receipt_uuid, receipt_created_at, receipt_items):
+    storage.receipt_items.create_many(receipt_uuid, receipt_created_at, receipt_items)
+    storage.receipt_items.create_many(
+        receipt_uuid,
+        receipt_created_at,
+        [ReceiptItem(product="banan", quantity=1, price=1)],
+    )
+
+    assert storage.receipt_items.read_by_receipt_uuid(receipt_uuid) == receipt_items
+
+
+def test_update_many_replaces_splits(storage, receipt_uuid, receipt_created_at, receipt_items):
+    storage.receipt_items.create_many(receipt_uuid, receipt_created_at, receipt_items)
+
+    receipt_items[0].splits = SplitLedger({Split(username="user1", quantity=3)})
+    receipt_items[0].quantity = 4
+    storage.receipt_items.update_many(receipt_uuid, receipt_created_at, receipt_items[:1])
+
+    item = storage.receipt_items.read_by_receipt_uuid(receipt_uuid)[0]
+    assert [(s.username, s.quantity) for s in item.splits] == [("user1", 3)]
+    assert (item.quantity, item.version) == (4, 1)
+
+
+def test_update_many_conflict(storage, receipt_uuid, receipt_created_at, receipt_items):
+    storage.receipt_items.create_many(receipt_uuid, receipt_created_at, receipt_items)
+
+    # two users split the same item read at the same version
+    first = storage.receipt_items.read_by_receipt_uuid(receipt_uuid)[0]
+    second = storage.receipt_items.read_by_receipt_uuid(receipt_uuid)[0]
+    first.splits = SplitLedger({Split(username="user1", quantity=3)})
+    second.splits = SplitLedger({Split(username="user2", quantity=3)})
+
+    storage.receipt_items.update_many(receipt_uuid, receipt_created_at, [first])
+    with pytest.raises(ReceiptItemConflictError):
+        storage.receipt_items.update_many(receipt_uuid, receipt_created_at, [second])
+
+    item = storage.receipt_items.read_by_receipt_uuid(receipt_uuid)[0]
+    assert [(s.username, s.quantity) for s in item.splits] == [("user1", 3)]
@@ -0,0 +1,22 @@
+import typing as t
+from datetime import datetime
+
+from pydantic import UUID4
+
+from internal.domain.receipt import Result
+from internal.usecase.adapters.receipt import IReader as IReceiptReader
+from internal.usecase.adapters.receipt.settlement import IReader, IRepairer
+
+
+class Repository(IReader, IRepairer):
+    # Settlements of the in-memory storage, those of the receipts (see Receipt.results)
+    # when read, so there is never anything to repair.
+    def __init__(self, receipt_reader: IReceiptReader):
+        self._receipt_reader = receipt_reader
+
+    def read_by_receipt_uuid(self, receipt_uuid: UUID4) -> t.List[Result]:
+        receipt = self._receipt_reader.read_by_uuid(receipt_uuid)
+        return receipt.results if receipt is not None else []
+
+    def repair(self, since: t.Optional[datetime] = None) -> int:
+        return 0
@@ -0,0 +1,364 @@
+import typing as t
+from datetime import datetime
+from logging import getLogger
+
+import psycopg
+from pydantic import UUID4
+
+from internal.domain.receipt import Receipt, Result, ReceiptReadError, ReceiptUpdateError, settle
+from internal.domain.receipt.item import ReceiptItem
+from internal.usecase.adapters.receipt.settlement import IReader, IRepairer
+from pkg.money import to_minor
+from pkg.postgres import ConnectionProvider, name_statements
+
+logger = getLogger("receipt_settlement.storage.postgres")
+
+default_batch_size = 1000
+
+CLEAN_SQL = b"""
+    truncate table tbl_receipt_settlement;
+"""
+
+# Adds to the settlement of a receipt the shares of the saved items less the shares
+# they had (see the `receipt_item_shares` function), so only the saved items are
+# read. It runs in the transaction saving them, before they are written, and the
+# version check of their update (see UPSERT_RECEIPT_ITEMS_SQL) rolls it back when
+# they were changed meanwhile.
+APPLY_SETTLEMENT_DELTA_SQL = b"""
+    WITH items as (
+        SELECT * FROM unnest(
+            %(uuids)s::uuid[],
+            %(quantities)s::integer[],
+            %(prices)s::bigint[]
+        ) as i(uuid, quantity, price)
+    ), splits as (
+        SELECT * FROM unnest(
+            %(split_uuids)s::uuid[],
+            %(split_usernames)s::text[],
+            %(split_quantities)s::integer[]
+        ) as s(uuid, username, quantity)
+    ), shares as (
+        SELECT
+            sh.username,
+            sh.amount
+        FROM items as i
+        JOIN (
+            SELECT uuid, array_agg(username) as usernames, array_agg(quantity) as quantities
+            FROM splits
+            GROUP BY uuid
+        ) as s ON s.uuid = i.uuid
+        CROSS JOIN LATERAL receipt_item_shares(i.price, i.quantity, s.usernames, s.quantities) as sh
+        UNION ALL
+        SELECT
+            sh.username,
+            -sh.amount
+        FROM tbl_receipt_item as i
+        JOIN LATERAL (
+            SELECT array_agg(s.username) as usernames, array_agg(s.quantity) as quantities
+            FROM tbl_receipt_item_split as s
+            WHERE s.uuid = i.uuid AND s.receipt_created_at = i.receipt_created_at
+        ) as s ON true
+        CROSS JOIN LATERAL receipt_item_shares(i.price, i.quantity, s.usernames, s.quantities) as sh
+        WHERE i.uuid = ANY(%(uuids)s::uuid[])
+          AND i.receipt_created_at = %(receipt_created_at)s
+    )
+    INSERT INTO tbl_receipt_settlement (
+        receipt_uuid,
+        receipt_created_at,
+        username,
+        amount
+    )
+    SELECT
+        %(receipt_uuid)s,
+        %(receipt_created_at)s,
+        username,
+        sum(amount)
+    FROM shares
+    GROUP BY username
+    HAVING sum(amount) <> 0
+    ON CONFLICT (receipt_uuid, username, receipt_created_at)
+    DO UPDATE SET
+        amount = tbl_receipt_settlement.amount + EXCLUDED.amount;
+"""
+
+# Recomputes the settlements of the receipts from their items and splits: the users
+# no longer in them are deleted and the others upserted by one statement (the two
+# parts don't touch the same rows).
+REFRESH_SETTLEMENTS_SQL = b"""
+    WITH receipts as (
+        SELECT * FROM unnest(
+            %(receipt_uuids)s::uuid[],
+            %(receipt_created_ats)s::timestamptz[]
+        ) as r(uuid, created_at)
+    ), settlements as (
+        SELECT
+            r.uuid,
+            r.created_at,
+            sh.username,
+            sum(sh.amount) as amount
+        FROM receipts as r
+        JOIN tbl_receipt_item as i
+        ON (i.receipt_uuid = r.uuid AND i.receipt_created_at = r.created_at)
+        JOIN LATERAL (
+            SELECT array_agg(s.username) as usernames, array_agg(s.quantity) as quantities
+            FROM tbl_receipt_item_split as s
+            WHERE s.uuid = i.uuid AND s.receipt_created_at = i.receipt_created_at
+        ) as s ON true
+        CROSS JOIN LATERAL receipt_item_shares(i.price, i.quantity, s.usernames, s.quantities) as sh
+        GROUP BY r.uuid, r.created_at, sh.username
+    ), deleted as (
+        DELETE FROM tbl_receipt_settlement as st
+        USING receipts as r
+        WHERE st.receipt_uuid = r.uuid
+          AND st.receipt_created_at = r.created_at
+          AND NOT EXISTS (
+              SELECT 1 FROM settlements as n
+              WHERE n.uuid = st.receipt_uuid AND n.username = st.username
+          )
+    )
+    INSERT INTO tbl_receipt_settlement (
+        receipt_uuid,
+        receipt_created_at,
+        username,
+        amount
+    )
+    SELECT uuid, created_at, username, amount
+    FROM settlements
+    ON CONFLICT (receipt_uuid, username, receipt_created_at)
+    DO UPDATE SET
+        amount = EXCLUDED.amount
+    WHERE tbl_receipt_settlement.amount IS DISTINCT FROM EXCLUDED.amount;
+"""
+
+# settlements of the receipts created since the given time which differ from their
+# splits, with the expected amount and the stored one (NULL when the row is missing),
+# users with nothing to pay being the same as missing ones
+SELECT_DRIFTED_SQL = b"""
+    WITH expected as (
+        SELECT
+            i.receipt_uuid,
+            i.receipt_created_at,
+            sh.username,
+            sum(sh.amount)::bigint as amount
+        FROM tbl_receipt_item as i
+        JOIN LATERAL (
+            SELECT array_agg(s.username) as usernames, array_agg(s.quantity) as quantities
+            FROM tbl_receipt_item_split as s
+            WHERE s.uuid = i.uuid AND s.receipt_created_at = i.receipt_created_at
+        ) as s ON true
+        CROSS JOIN LATERAL receipt_item_shares(i.price, i.quantity, s.usernames, s.quantities) as sh
+        WHERE (%(since)s::timestamptz IS NULL OR i.receipt_created_at >= %(since)s)
+        GROUP BY i.receipt_uuid, i.receipt_created_at, sh.username
+    ), stored as (
+        SELECT receipt_uuid, receipt_created_at, username, amount
+        FROM tbl_receipt_settlement
+        WHERE (%(since)s::timestamptz IS NULL OR receipt_created_at >= %(since)s)
+    )
+    SELECT
+        coalesce(e.receipt_uuid, st.receipt_uuid),
+        coalesce(e.receipt_created_at, st.receipt_created_at),
+        coalesce(e.username, st.username),
+        coalesce(e.amount, 0),
+        st.amount
+    FROM expected as e
+    FULL JOIN stored as st
+    ON (
+        st.receipt_uuid = e.receipt_uuid
+        AND st.receipt_created_at = e.receipt_created_at
+        AND st.username = e.username
+    )
+    WHERE coalesce(e.amount, 0) <> coalesce(st.amount, 0);
+"""
+
+# Sets the expected amounts of SELECT_DRIFTED_SQL only to the rows still holding the
+# amounts read along with them, which a concurrent split would have changed: the
+# repair takes no locks and never overwrites a split made meanwhile.
+REPAIR_SETTLEMENTS_SQL = b"""
+    WITH fixes as (
+        SELECT * FROM unnest(
+            %(receipt_uuids)s::uuid[],
+            %(receipt_created_ats)s::timestamptz[],
+            %(usernames)s::text[],
+            %(amounts)s::bigint[],
+            %(stored_amounts)s::bigint[]
+        ) as f(receipt_uuid, receipt_created_at, username, amount, stored_amount)
+    ), updated as (
+        UPDATE tbl_receipt_settlement as st
+        SET amount = f.amount
+        FROM fixes as f
+        WHERE st.receipt_uuid = f.receipt_uuid
+          AND st.receipt_created_at = f.receipt_created_at
+          AND st.username = f.username
+          AND st.amount = f.stored_amount
+        RETURNING 1
+    ), inserted as (
+        INSERT INTO tbl_receipt_settlement (
+            receipt_uuid,
+            receipt_created_at,
+            username,
+            amount
+        )
+        SELECT receipt_uuid, receipt_created_at, username, amount
+        FROM fixes
+        WHERE stored_amount IS NULL
+        ON CONFLICT DO NOTHING
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM updated) + (SELECT count(*) FROM inserted);
+"""
+
+# the item shares of the users, settled with the totals of the receipt (see `settle`),
+# which are read, along with the total of its items, once per receipt and come along
+# on every row
+SELECT_SETTLEMENT_SQL = b"""
+    WITH settlement as (
+        SELECT
+            receipt_created_at,
+            username,
+            amount
+        FROM tbl_receipt_settlement
+        WHERE receipt_uuid = %(receipt_uuid)s
+          AND amount <> 0
+    ), receipt as (
+        SELECT
+            r.subtotal,
+            r.tips,
+            r.total
+        FROM tbl_receipt as r
+        WHERE r.uuid = %(receipt_uuid)s
+          AND r.created_at = (SELECT max(receipt_created_at) FROM settlement)
+    ), items as (
+        SELECT coalesce(sum(i.price), 0)::bigint as total
+        FROM tbl_receipt_item as i
+        WHERE i.receipt_uuid = %(receipt_uuid)s
+          AND i.receipt_created_at = (SELECT max(receipt_created_at) FROM settlement)
+    )
+    SELECT
+        st.username,
+        st.amount,
+        coalesce(r.subtotal, 0),
+        coalesce(r.tips, 0),
+        coalesce(r.total, 0),
+        items.total
+    FROM settlement as st
+    CROSS JOIN items
+    LEFT JOIN receipt as r ON true
+    ORDER BY st.username;
+"""
+
+
+class Repository(IReader, IRepairer):
+    def __init__(self, pool: ConnectionProvider, batch_size: int = default_batch_size):
+        self._pool = pool
+        self._batch_size = batch_size
+
+    def clean(self):
+        with self._pool.connection() as conn:
+            conn.execute(query=CLEAN_SQL)
+        logger.info("receipt settlement schema cleaned")
+
+    def read_by_receipt_uuid(self, receipt_uuid: UUID4) -> t.List[Result]:
+        try:
+            with self._pool.replica(receipt_uuid) as conn:
+                with conn.cursor(binary=True) as cur:
+                    cur.execute(
+                        SELECT_SETTLEMENT_SQL,
+                        params={
+                            "receipt_uuid": receipt_uuid,
+                        },
+                        prepare=True,
+                    )
+                    rows = cur.fetchall()
+        except psycopg.errors.DatabaseError as e:
+            raise ReceiptReadError("select receipt settlement err: %s" % e)
+
+        if not rows:
+            return []
+        return settle(
+            {row[0]: row[1] for row in rows},
+            rows[0][5],
+            rows[0][2],
+            rows[0][3],
+            rows[0][4],
+            receipt_uuid.int,
+        )
+
+    def repair(self, since: t.Optional[datetime] = None) -> int:
+        repaired = 0
+        try:
+            with self._pool.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        SELECT_DRIFTED_SQL,
+                        params={
+                            "since": since,
+                        },
+                    )
+                    drifted = cur.fetchall()
+                    conn.commit()
+
+                    for i in range(0, len(drifted), self._batch_size):
+                        batch = drifted[i:i + self._batch_size]
+                        cur.execute(
+                            REPAIR_SETTLEMENTS_SQL,
+                            params={
+                                "receipt_uuids": [row[0] for row in batch],
+                                "receipt_created_ats": [row[1] for row in batch],
+                                "usernames": [row[2] for row in batch],
+                                "amounts": [row[3] for row in batch],
+                                "stored_amounts": [row[4] for row in batch],
+                            },
+                        )
+                        repaired += cur.fetchone()[0]
+                        conn.commit()
+        except psycopg.errors.DatabaseError as e:
+            raise ReceiptUpdateError("repair receipt settlements err: %s" % e)
+
+        logger.info("receipt settlements repaired: drifted=%d, repaired=%d" % (len(drifted), repaired))
+        return repaired
+
+
+def apply_delta(conn, receipt_uuid: UUID4, receipt_created_at: datetime, receipt_items: t.List[ReceiptItem]):
+    # to be called in the transaction saving the items, before they are written
+    conn.execute(
+        APPLY_SETTLEMENT_DELTA_SQL,
+        params=delta_params(receipt_uuid, receipt_created_at, receipt_items),
+    )
+
+
+def refresh(conn, receipt_uuids: t.List[UUID4], receipt_created_ats: t.List[datetime]):
+    conn.execute(
+        REFRESH_SETTLEMENTS_SQL,
+        params={
+            "receipt_uuids": receipt_uuids,
+            "receipt_created_ats": receipt_created_ats,
+        },
+    )
+
+
+def refresh_receipts(conn, receipts: t.List[Receipt]):
+    # only the receipts with splits can have a settlement to write
+    receipts = [receipt for receipt in receipts if any(item.splits for item in receipt.items)]
+    if receipts:
+        refresh(conn, [receipt.uuid for receipt in receipts], [receipt.created_at for receipt in receipts])
+
+
+def delta_params(
+        receipt_uuid: UUID4,
+        receipt_created_at: datetime,
+        receipt_items: t.List[ReceiptItem],
+) -> t.Dict[str, t.Any]:
+    splits = [(item.uuid, username, quantity) for item in receipt_items for username, quantity in item.splits.items()]
+    return {
+        "receipt_uuid": receipt_uuid,
+        "receipt_created_at": receipt_created_at,
+        "uuids": [item.uuid for item in receipt_items],
+        "quantities": [item.quantity for item in receipt_items],
+        "prices": [to_minor(item.price) for item in receipt_items],
+        "split_uuids": [split[0] for split in splits],
+        "split_usernames": [split[1] for split in splits],
+        "split_quantities": [split[2] for split in splits],
+    }
+
+
+name_statements("receipt_settlement", globals())
@@ -0,0 +1,30 @@
+import typing as t
+from datetime import datetime
+
+from pydantic import UUID4
+
+from internal.domain.receipt import Result, ReceiptReadError
+from internal.repository.receipt_settlement.storage.postgres.repository import Repository as SettlementRepository
+from internal.repository.shard.directory import Directory, DirectoryError
+from internal.usecase.adapters.receipt.settlement import IReader, IRepairer
+
+
+class Repository(IReader, IRepairer):
+    # Settlements on the shard of their receipt, repaired shard by shard.
+    def __init__(self, directory: Directory, repos: t.Dict[str, SettlementRepository]):
+        self._directory = directory
+        self._repos = repos
+
+    def read_by_receipt_uuid(self, receipt_uuid: UUID4) -> t.List[Result]:
+        try:
+            shard = self._directory.receipt_read_shard(receipt_uuid)
+        except DirectoryError as e:
+            raise ReceiptReadError("find receipt err: %s" % e)
+
+        if shard is None:
+            return []
+
+        return self._repos[shard].read_by_receipt_uuid(receipt_uuid)
+
+    def repair(self, since: t.Optional[datetime] = None) -> int:
+        return sum(repo.repair(since) for repo in self._repos.values())
@@ -0,0 +1,63 @@
+import sqlite3
+import typing as t
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+from pydantic import UUID4
+
+from internal.domain.receipt import Result, ReceiptReadError, settle
+from internal.domain.receipt.item import split_shares
+from internal.usecase.adapters.receipt.settlement import IReader
+from pkg.sqlite import Database
+
+# The sqlite storage keeps no settlement table: the settlement of a receipt is summed
+# from the shares of its items (see `split_shares`) and settled with its tips and
+# totals (see `settle`) when read.
+SELECT_SPLITS_SQL = """
+    SELECT
+        i.uuid,
+        i.price,
+        i.quantity,
+        s.username,
+        s.quantity
+    FROM tbl_receipt_item as i
+    LEFT JOIN tbl_receipt_item_split as s ON s.uuid = i.uuid
+    WHERE i.receipt_uuid = :receipt_uuid
+    ORDER BY i.uuid;
+"""
+
+SELECT_TOTALS_SQL = """
+    SELECT
+        subtotal,
+        tips,
+        total
+    FROM tbl_receipt
+    WHERE uuid = :receipt_uuid;
+"""
+
+
+class Repository(IReader):
+    def __init__(self, db: Database):
+        self._db = db
+
+    def read_by_receipt_uuid(self, receipt_uuid: UUID4) -> t.List[Result]:
+        try:
+            with self._db.reader() as conn:
+                rows = conn.execute(SELECT_SPLITS_SQL, {"receipt_uuid": str(receipt_uuid)}).fetchall()
+                totals = conn.execute(SELECT_TOTALS_SQL, {"receipt_uuid": str(receipt_uuid)}).fetchone()
+        except sqlite3.Error as e:
+            raise ReceiptReadError("select receipt settlement err: %s" % e)
+
+        amounts = defaultdict(int)
+        items_total = 0
+        for _, item_rows in groupby(rows, key=itemgetter(0)):
+            item_rows = list(item_rows)
+            price = item_rows[0][1] or 0
+            items_total += price
+            shares = split_shares(price, item_rows[0][2], [(row[3], row[4]) for row in item_rows if row[3]])
+            for username, amount in shares.items():
+                amounts[username] += amount
+
+        subtotal, tips, total = totals if totals is not None else (0, 0, 0)
+        return settle(amounts, items_total, subtotal or 0, tips or 0, total or 0, receipt_uuid.int)
@@ -0,0 +1,43 @@
+import uuid
+
+import pytest
+
+from internal.domain.receipt.item import ReceiptItem, Split, SplitLedger
+from internal.repository.receipt_item.storage.sqlite.repository import Repository as ItemRepository
+from internal.repository.receipt_settlement.storage.sqlite.repository import Repository
+from internal.repository.migrations.sqlite import migrations
+from pkg.datetime import now
+from pkg.sqlite import Database, Migrator
+
+
+@pytest.fixture(scope="session")
+def db(tmp_path_factory) -> Database:
+    db = Database(str(tmp_path_factory.mktemp("sqlite") / "receipts.db"))
+    Migrator(db, migrations()).migrate()
+    yield db
+    db.close()
+
+
+@pytest.fixture(scope="function")
+def item_repo(db) -> ItemRepository:
+    repo = ItemRepository(db)
+
+    yield repo
+
+    repo.clean()
+
+
+def test_read_by_receipt_uuid(db, item_repo):
+    receipt_uuid, receipt_created_at = uuid.uuid4(), now()
+    items = [
+        ReceiptItem(product="pizza", quantity=3, price=30, splits={Split(username="user1", quantity=2)}),
+        ReceiptItem(product="cola", quantity=3, price=10, splits={Split(username="user2", quantity=1)}),
+        ReceiptItem(product="water", quantity=2, price=5),
+    ]
+    item_repo.create_many(receipt_uuid, receipt_created_at, items)
+
+    items[0].splits = SplitLedger({Split(username="user1", quantity=1), Split(username="user2", quantity=2)})
+    item_repo.update_many(receipt_uuid, receipt_created_at, items[:1])
+
+    results = Repository(db).read_by_receipt_uuid(receipt_uuid)
+    assert [(result.username, result.amount) for result in results] == [("user1", 10.0), ("user2", 23.33)]
@@ -0,0 +1,110 @@
+import typing as t
+from datetime import datetime
+
+import pytest
+from pydantic import UUID4
+
+from internal.domain.receipt import Receipt
+from internal.domain.receipt.item import ReceiptItem, Split, SplitLedger
+from internal.usecase.adapters.receipt.settlement import IRepairer
+
+# the contract of the receipt settlement storages, run against each backend by the
+# `storage` fixture
+
+
+@pytest.fixture(scope="function")
+def receipt(storage) -> Receipt:
+    # the items are saved along with their receipt, the sharded storage finds them by it
+    receipt = Receipt(user_id=3)
+    storage.receipts.create(receipt)
+    return receipt
+
+
+@pytest.fixture(scope="function")
+def receipt_uuid(receipt) -> UUID4:
+    return receipt.uuid
+
+
+@pytest.fixture(scope="function")
+def receipt_created_at(receipt) -> datetime:
+    return receipt.created_at
+
+
+@pytest.fixture(scope="function")
+def receipt_items() -> t.List[ReceiptItem]:
+    return [
+        ReceiptItem(
+            product="pizza",
+            quantity=3,
+            price=30,
+            splits={
+                Split(username="user1", quantity=2),
+                Split(username="user2"),
+            }
+        ),
+        ReceiptItem(
+            product="cola",
+            quantity=2,
+            price=5,
+        ),
+    ]
+
+
+def results(storage, receipt_uuid) -> t.List[t.Tuple[str, float]]:
+    return [(result.username, result.amount) for result in storage.settlements.read_by_receipt_uuid(receipt_uuid)]
+
+
+def test_read_by_receipt_uuid(storage, receipt_uuid, receipt_created_at, receipt_items):
+    assert results(storage, receipt_uuid) == []
+
+    storage.receipt_items.create_many(receipt_uuid, receipt_created_at, receipt_items)
+    assert results(storage, receipt_uuid) == [("user1", 20.0), ("user2", 10.0)]
+
+    receipt_items[0].splits = SplitLedger({Split(username="user2", quantity=3)})
+    receipt_items[1].splits = SplitLedger({Split(username="user1")})
+    storage.receipt_items.update_many(receipt_uuid, receipt_created_at, receipt_items)
+    assert results(storage, receipt_uuid) == [("user1", 2.5), ("user2", 30.0)]
+
+
+def test_repair(storage, receipt_uuid, receipt_created_at, receipt_items):
+    if not isinstance(storage.settlements, IRepairer):
+        pytest.skip("%s storage keeps no settlements to repair" % storage.backend)
+
+    storage.receipt_items.create_many(receipt_uuid, receipt_created_at, receipt_items)
+
+    assert storage.settlements.repair() == 0
+    assert results(storage, receipt_uuid) == [("user1", 20.0), ("user2", 10.0)]
+
+
+def test_shares_sum_to_price(storage, receipt, receipt_items):
+    # the settlements are those of Receipt.results, an entirely split item is owed in full
+    receipt_items[0].price = 100
+    receipt_items[0].splits = SplitLedger({Split(username=username) for username in ("user3", "user2", "user1")})
+    receipt_items[1].price = 0.05
+    receipt_items[1].splits = SplitLedger({Split(username="user3"), Split(username="user1")})
+    storage.receipt_items.create_many(receipt.uuid, receipt.created_at, receipt_items)
+
+    receipt.items = receipt_items
+    expected = [(result.username, result.amount) for result in receipt.results]
+    assert expected == [("user1", 33.37), ("user2", 33.33), ("user3", 33.35)]
+    assert results(storage, receipt.uuid) == expected
+
+
+def test_tips_and_adjustments(storage, receipt_items):
+    # tax of 3.50 and tips of 7.00 over a subtotal of 35.00
+    receipt = Receipt(user_id=3, subtotal=35, tips=7, total=45.5)
+    storage.receipts.create(receipt)
+    storage.receipt_items.create_many(receipt.uuid, receipt.created_at, receipt_items)
+
+    def settled():
+        return [(r.username, r.amount, r.tips) for r in storage.settlements.read_by_receipt_uuid(receipt.uuid)]
+
+    # the cola nobody took keeps its part
+    assert settled() == [("user1", 22.0, 4.0), ("user2", 11.0, 2.0)]
+
+    receipt_items[1].splits = SplitLedger({Split(username="user2", quantity=2)})
+    storage.receipt_items.update_many(receipt.uuid, receipt.created_at, receipt_items[1:])
+    assert settled() == [("user1", 22.0, 4.0), ("user2", 16.5, 3.0)]
+
+    receipt.items = receipt_items
+    assert settled() == [(r.username, r.amount, r.tips) for r in receipt.results]
@@ -0,0 +1,360 @@
+import time
+import typing as t
+from contextlib import contextmanager
+from logging import getLogger
+
+import psycopg
+from pydantic import UUID4
+
+from pkg.postgres import ConnectionProvider, HashRing, name_statements
+
+logger = getLogger("shard.directory")
+
+# how long the writes of a user being moved wait for the move to finish, polling
+# the directory every default_move_poll seconds
+default_move_wait = 5.0
+default_move_poll = 0.05
+
+CLEAN_SQL = b"""
+    truncate table tbl_shard_user, tbl_shard_receipt, tbl_shard_username;
+"""
+
+# Returns the placement of the user, placing them on the given shard when they have
+# none. A concurrent placement of the same user makes the statement return no row, as
+# its snapshot misses the row it conflicted with: the caller runs it again.
+PLACE_USER_SQL = b"""
+    WITH placed as (
+        INSERT INTO tbl_shard_user (
+            user_id,
+            shard
+        )
+        VALUES (
+            %(user_id)s,
+            %(shard)s
+        )
+        ON CONFLICT (user_id) DO NOTHING
+        RETURNING shard, moving_to
+    )
+    SELECT shard, moving_to FROM placed
+    UNION ALL
+    SELECT shard, moving_to FROM tbl_shard_user WHERE user_id = %(user_id)s;
+"""
+
+SELECT_USER_SQL = b"""
+    SELECT shard, moving_to
+    FROM tbl_shard_user
+    WHERE user_id = %(user_id)s;
+"""
+
+SELECT_USERS_SQL = b"""
+    SELECT user_id, shard, moving_to
+    FROM tbl_shard_user
+    ORDER BY user_id;
+"""
+
+# Locks the placements of the users being written for the writes (see
+# Directory.writing), in the order of their ids.
+LOCK_USERS_SQL = b"""
+    SELECT user_id, shard, moving_to
+    FROM tbl_shard_user
+    WHERE user_id = ANY(%(user_ids)s::bigint[])
+    ORDER BY user_id
+    FOR SHARE;
+"""
+
+LOCK_RECEIPT_SQL = b"""
+    SELECT r.receipt_uuid, u.shard, u.moving_to
+    FROM tbl_shard_receipt as r
+    JOIN tbl_shard_user as u ON u.user_id = r.user_id
+    WHERE r.receipt_uuid = %(receipt_uuid)s
+    FOR SHARE OF u;
+"""
+
+REGISTER_RECEIPTS_SQL = b"""
+    INSERT INTO tbl_shard_receipt (
+        receipt_uuid,
+        user_id
+    )
+    SELECT * FROM unnest(
+        %(receipt_uuids)s::uuid[],
+        %(user_ids)s::bigint[]
+    )
+    ON CONFLICT (receipt_uuid) DO NOTHING;
+"""
+
+SELECT_RECEIPTS_SQL = b"""
+    SELECT r.receipt_uuid, u.shard, u.moving_to
+    FROM tbl_shard_receipt as r
+    JOIN tbl_shard_user as u ON u.user_id = r.user_id
+    WHERE r.receipt_uuid = ANY(%(receipt_uuids)s::uuid[]);
+"""
+
+# A username taken by another user is theirs from then on.
+NAME_USERS_SQL = b"""
+    INSERT INTO tbl_shard_username (
+        username,
+        user_id
+    )
+    SELECT * FROM unnest(
+        %(usernames)s::text[],
+        %(user_ids)s::bigint[]
+    )
+    ON CONFLICT (username)
+    DO UPDATE SET
+        user_id = EXCLUDED.user_id
+    WHERE tbl_shard_username.user_id <> EXCLUDED.user_id;
+"""
+
+SELECT_USERNAME_SQL = b"""
+    SELECT u.shard
+    FROM tbl_shard_username as n
+    JOIN tbl_shard_user as u ON u.user_id = n.user_id
+    WHERE n.username = %(username)s;
+"""
+
+BEGIN_MOVE_SQL = b"""
+    UPDATE tbl_shard_user
+    SET moving_to = %(shard)s
+    WHERE user_id = %(user_id)s
+      AND moving_to IS NULL
+      AND shard <> %(shard)s;
+"""
+
+FINISH_MOVE_SQL = b"""
+    UPDATE tbl_shard_user
+    SET shard = moving_to,
+        moving_to = NULL
+    WHERE user_id = %(user_id)s
+      AND moving_to IS NOT NULL;
+"""
+
+ABORT_MOVE_SQL = b"""
+    UPDATE tbl_shard_user
+    SET moving_to = NULL
+    WHERE user_id = %(user_id)s;
+"""
+
+
+class DirectoryError(Exception):
+    pass
+
+
+class UserMovingError(DirectoryError):
+    # the user is still being moved to another shard after the writes waited for the
+    # move, they may be retried
+    pass
+
+
+class Placement(t.NamedTuple):
+    shard: str
+    moving_to: t.Optional[str] = None
+
+
+class Directory:
+    # Where the data of each user is in the sharded storage. A user is placed on the
+    # shard the hash ring gives on their first write and stays there until moved by
+    # apps.reshard (see Mover), so adding a shard to the ring moves nobody by itself.
+    # Receipts are registered with their user before they are written, so a receipt
+    # read by uuid is found on the shard of its user, and usernames are named with
+    # their user when written, so a user read by username is found on their shard.
+    # The writes hold a share lock of the directory rows of their users until done,
+    # which fences the moves: a move is begun once the running writes of the user are
+    # done, and the writes begun after wait for it to finish (see Mover).
+    def __init__(
+            self,
+            pool: ConnectionProvider,
+            ring: HashRing,
+            move_wait: float = default_move_wait,
+            move_poll: float = default_move_poll,
+    ):
+        self._pool = pool
+        self._ring = ring
+        self._move_wait = move_wait
+        self._move_poll = move_poll
+
+    def clean(self):
+        with self._pool.connection() as conn:
+            conn.execute(query=CLEAN_SQL)
+        logger.info("shard directory cleaned")
+
+    def shards(self) -> t.List[str]:
+        return self._ring.nodes()
+
+    def ring_shard(self, user_id: int) -> str:
+        return self._ring.node(user_id)
+
+    def read_shard(self, user_id: int) -> str:
+        # the users with no data yet are read from the shard they would be placed on
+        placement = self.placement(user_id)
+        return placement.shard if placement is not None else self._ring.node(user_id)
+
+    def writing(self, user_ids: t.List[int]) -> t.ContextManager[t.Dict[int, str]]:
+        # the shards to write the users to by id, placing the users with none; the
+        # placements are locked until the context exits
+        user_ids = sorted(set(user_ids))
+
+        def lock(conn) -> t.Dict[int, Placement]:
+            for user_id in user_ids:
+                self._place(conn, user_id)
+            conn.commit()
+            rows = conn.execute(LOCK_USERS_SQL, params={"user_ids": user_ids}, prepare=True).fetchall()
+            return {row[0]: Placement(row[1], row[2]) for row in rows}
+
+        return self._writing(lock, "user_ids=%s" % user_ids)
+
+    def receipt_writing(self, receipt_uuid: UUID4) -> t.ContextManager[t.Dict[UUID4, str]]:
+        # the shard of the receipt's user by the receipt uuid, locked as by `writing`;
+        # empty when the receipt isn't registered
+        def lock(conn) -> t.Dict[UUID4, Placement]:
+            rows = conn.execute(LOCK_RECEIPT_SQL, params={"receipt_uuid": receipt_uuid}, prepare=True).fetchall()
+            return {row[0]: Placement(row[1], row[2]) for row in rows}
+
+        return self._writing(lock, "receipt_uuid=%s" % receipt_uuid)
+
+    @contextmanager
+    def _writing(self, lock: t.Callable[[t.Any], t.Dict[t.Any, Placement]], name: str) -> t.Iterator[t.Dict]:
+        deadline = time.monotonic() + self._move_wait
+        while True:
+            with self._pool.connection() as conn:
+                try:
+                    placements = lock(conn)
+                except psycopg.errors.DatabaseError as e:
+                    raise DirectoryError("lock placements err: %s" % e)
+
+                moving = {key: placement.moving_to for key, placement in placements.items() if placement.moving_to}
+                if not moving:
+                    yield {key: placement.shard for key, placement in placements.items()}
+                    return
+
+            if time.monotonic() >= deadline:
+                raise UserMovingError("being moved: %s, to=%s" % (name, moving))
+            time.sleep(self._move_poll)
+
+    def placement(self, user_id: int) -> t.Optional[Placement]:
+        try:
+            with self._pool.connection() as conn:
+                row = conn.execute(SELECT_USER_SQL, params={"user_id": user_id}, prepare=True).fetchone()
+        except psycopg.errors.DatabaseError as e:
+            raise DirectoryError("select user placement err: %s" % e)
+
+        return Placement(*row) if row is not None else None
+
+    def place(self, user_id: int) -> Placement:
+        try:
+            with self._pool.connection() as conn:
+                return self._place(conn, user_id)
+        except psycopg.errors.DatabaseError as e:
+            raise DirectoryError("place user err: %s" % e)
+
+    def _place(self, conn, user_id: int) -> Placement:
+        for _ in range(2):
+            row = conn.execute(
+                PLACE_USER_SQL,
+                params={
+                    "user_id": user_id,
+                    "shard": self._ring.node(user_id),
+                },
+                prepare=True,
+            ).fetchone()
+            if row is not None:
+                return Placement(*row)
+
+        raise DirectoryError("place user err: no placement of user_id=%d" % user_id)
+
+    def users(self) -> t.Iterator[t.Tuple[int, Placement]]:
+        try:
+            with self._pool.connection() as conn:
+                with conn.cursor(name="shard_users") as cur:
+                    cur.execute(SELECT_USERS_SQL)
+                    for row in cur:
+                        yield row[0], Placement(row[1], row[2])
+        except psycopg.errors.DatabaseError as e:
+            raise DirectoryError("select user placements err: %s" % e)
+
+    def register(self, receipts: t.List[t.Tuple[UUID4, int]]):
+        # (receipt uuid, user id) pairs, the registered receipts are kept as they are
+        if not receipts:
+            return
+
+        try:
+            with self._pool.connection() as conn:
+                conn.execute(
+                    REGISTER_RECEIPTS_SQL,
+                    params={
+                        "receipt_uuids": [receipt[0] for receipt in receipts],
+                        "user_ids": [receipt[1] for receipt in receipts],
+                    },
+                )
+        except psycopg.errors.DatabaseError as e:
+            raise DirectoryError("register receipts err: %s" % e)
+
+    def receipt_placements(self, receipt_uuids: t.List[UUID4]) -> t.Dict[UUID4, Placement]:
+        # the receipts which are not registered are missing from the result
+        try:
+            with self._pool.connection() as conn:
+                rows = conn.execute(
+                    SELECT_RECEIPTS_SQL,
+                    params={"receipt_uuids": receipt_uuids},
+                    prepare=True,
+                ).fetchall()
+        except psycopg.errors.DatabaseError as e:
+            raise DirectoryError("select receipt placements err: %s" % e)
+
+        return {row[0]: Placement(row[1], row[2]) for row in rows}
+
+    def receipt_read_shard(self, receipt_uuid: UUID4) -> t.Optional[str]:
+        placement = self.receipt_placements([receipt_uuid]).get(receipt_uuid)
+        return placement.shard if placement is not None else None
+
+    def name(self, users: t.List[t.Tuple[str, int]]):
+        # (username, user id) pairs, the last user of a username wins
+        usernames = dict(users)
+        if not usernames:
+            return
+
+        try:
+            with self._pool.connection() as conn:
+                conn.execute(
+                    NAME_USERS_SQL,
+                    params={
+                        "usernames": list(usernames.keys()),
+                        "user_ids": list(usernames.values()),
+                    },
+                    prepare=True,
+                )
+        except psycopg.errors.DatabaseError as e:
+            raise DirectoryError("name users err: %s" % e)
+
+    def username_read_shard(self, username: str) -> t.Optional[str]:
+        # None when no user was written with the username
+        try:
+            with self._pool.connection() as conn:
+                row = conn.execute(SELECT_USERNAME_SQL, params={"username": username}, prepare=True).fetchone()
+        except psycopg.errors.DatabaseError as e:
+            raise DirectoryError("select username placement err: %s" % e)
+
+        return row[0] if row is not None else None
+
+    def begin_move(self, user_id: int, shard: str) -> bool:
+        # false when the user is already on the shard or being moved; waits for the
+        # running writes of the user, which hold the lock of their row
+        return self._update(BEGIN_MOVE_SQL, {"user_id": user_id, "shard": shard}, "begin move")
+
+    def finish_move(self, user_id: int) -> bool:
+        return self._update(FINISH_MOVE_SQL, {"user_id": user_id}, "finish move")
+
+    def abort_move(self, user_id: int) -> bool:
+        return self._update(ABORT_MOVE_SQL, {"user_id": user_id}, "abort move")
+
+    def _update(self, query: bytes, params: t.Dict[str, t.Any], name: str) -> bool:
+        try:
+            with self._pool.connection() as conn:
+                updated = conn.execute(query, params=params).rowcount
+        except psycopg.errors.DatabaseError as e:
+            raise DirectoryError("%s err: %s" % (name, e))
+
+        logger.info("%s: params=%s, updated=%d" % (name, params, updated))
+        return updated == 1
+
+
+name_statements("shard", globals())
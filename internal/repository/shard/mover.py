@@ -0,0 +1,149 @@
+import typing as t
+from logging import getLogger
+
+import psycopg
+from psycopg import sql
+
+from pkg.postgres import ConnectionProvider
+from .directory import Directory, DirectoryError
+
+logger = getLogger("shard.mover")
+
+# The rows of a user by table, parents first, each selected by a condition on the
+# user id: the receipts of the user, their items, splits and settlements.
+USER_ROWS = (
+    ("tbl_user", "user_id = {user_id}"),
+    ("tbl_receipt", "user_id = {user_id}"),
+    (
+        "tbl_receipt_item",
+        "(receipt_uuid, receipt_created_at) IN (SELECT uuid, created_at FROM tbl_receipt WHERE user_id = {user_id})",
+    ),
+    (
+        "tbl_receipt_item_split",
+        "(uuid, receipt_created_at) IN ("
+        "SELECT i.uuid, i.receipt_created_at FROM tbl_receipt_item as i "
+        "JOIN tbl_receipt as r ON (r.uuid = i.receipt_uuid AND r.created_at = i.receipt_created_at) "
+        "WHERE r.user_id = {user_id})",
+    ),
+    (
+        "tbl_receipt_settlement",
+        "(receipt_uuid, receipt_created_at) IN (SELECT uuid, created_at FROM tbl_receipt WHERE user_id = {user_id})",
+    ),
+)
+
+
+class Mover:
+    # Online moves of users between the shards, one user at a time:
+    #  1. the move is begun in the directory, once the running writes of the user are
+    #     done (they lock the directory row of the user, see Directory.writing),
+    #  2. the writes begun after wait for the move (reads go on from the old shard),
+    #  3. the rows of the user are copied to the new shard in one transaction, after
+    #     deleting the ones left there by an interrupted move,
+    #  4. the move is finished in the directory, the user is read from and written to
+    #     the new shard,
+    #  5. the rows of the user are deleted from the old shard.
+    # A move interrupted before 4 is run again from 3, one interrupted after 4 leaves
+    # the rows in the old shard, where nothing reads them.
+    def __init__(self, directory: Directory, pools: t.Dict[str, ConnectionProvider]):
+        self._directory = directory
+        self._pools = pools
+
+    def misplaced(self) -> t.Iterator[t.Tuple[int, str]]:
+        # the users not on the shard the ring gives for them, e.g. after adding a
+        # shard, with that shard
+        for user_id, placement in self._directory.users():
+            shard = self._directory.ring_shard(user_id)
+            if placement.shard != shard or placement.moving_to is not None:
+                yield user_id, shard
+
+    def rebalance(self) -> int:
+        moved = 0
+        for user_id, shard in list(self.misplaced()):
+            moved += self.move(user_id, shard)
+        return moved
+
+    def move(self, user_id: int, shard: str) -> bool:
+        placement = self._directory.placement(user_id)
+        if placement is None or placement.shard == shard:
+            if placement is not None and placement.moving_to is not None:
+                self._directory.abort_move(user_id)
+            return False
+
+        if placement.moving_to != shard:
+            if placement.moving_to is not None:
+                self._directory.abort_move(user_id)
+            if not self._directory.begin_move(user_id, shard):
+                raise DirectoryError("begin move err: user_id=%d is being moved" % user_id)
+
+        try:
+            copied = self._copy(user_id, self._pools[placement.shard], self._pools[shard])
+        except psycopg.errors.DatabaseError as e:
+            self._directory.abort_move(user_id)
+            raise DirectoryError("copy user err: user_id=%d, err=%s" % (user_id, e))
+
+        self._directory.finish_move(user_id)
+        deleted = self._delete(user_id, self._pools[placement.shard])
+        logger.info(
+            "user moved: user_id=%d, from=%s, to=%s, copied=%d, deleted=%d"
+            % (user_id, placement.shard, shard, copied, deleted)
+        )
+        return True
+
+    @staticmethod
+    def _copy(user_id: int, source: ConnectionProvider, target: ConnectionProvider) -> int:
+        copied = 0
+        with source.connection() as src, target.connection() as dst:
+            # one snapshot of all the tables of the user
+            src.execute(b"SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            for table, condition in reversed(USER_ROWS):
+                dst.execute(delete_query(table, condition, user_id))
+
+            for table, condition in USER_ROWS:
+                columns = sql.SQL(", ").join(
+                    sql.Identifier(column.name)
+                    for column in src.execute(
+                        sql.SQL("SELECT * FROM {} LIMIT 0").format(sql.Identifier(table))
+                    ).description
+                )
+                with src.cursor().copy(
+                        sql.SQL("COPY (SELECT {columns} FROM {table} WHERE {condition}) TO STDOUT").format(
+                            columns=columns,
+                            table=sql.Identifier(table),
+                            condition=user_condition(condition, user_id),
+                        )
+                ) as copy_out:
+                    with dst.cursor().copy(
+                            sql.SQL("COPY {table} ({columns}) FROM STDIN").format(
+                                table=sql.Identifier(table),
+                                columns=columns,
+                            )
+                    ) as copy_in:
+                        for data in copy_out:
+                            copy_in.write(data)
+                copied += dst.execute(
+                    sql.SQL("SELECT count(*) FROM {table} WHERE {condition}").format(
+                        table=sql.Identifier(table),
+                        condition=user_condition(condition, user_id),
+                    )
+                ).fetchone()[0]
+        return copied
+
+    @staticmethod
+    def _delete(user_id: int, pool: ConnectionProvider) -> int:
+        deleted = 0
+        with pool.connection() as conn:
+            # children first, their conditions go through the parents
+            for table, condition in reversed(USER_ROWS):
+                deleted += conn.execute(delete_query(table, condition, user_id)).rowcount
+        return deleted
+
+
+def user_condition(condition: str, user_id: int) -> sql.Composable:
+    return sql.SQL(condition).format(user_id=sql.Literal(user_id))
+
+
+def delete_query(table: str, condition: str, user_id: int) -> sql.Composable:
+    return sql.SQL("DELETE FROM {table} WHERE {condition}").format(
+        table=sql.Identifier(table),
+        condition=user_condition(condition, user_id),
+    )
@@ -0,0 +1,106 @@
+import threading
+import uuid
+
+import pytest
+
+from internal.repository.shard.directory import Directory, Placement, UserMovingError
+from pkg.postgres import HashRing
+
+
+@pytest.fixture(scope="function")
+def directory(postgres_pool) -> Directory:
+    directory = Directory(postgres_pool, HashRing(["s1", "s2"]), move_wait=0.5)
+
+    yield directory
+
+    directory.clean()
+
+
+def test_place(directory):
+    user_id = 42
+    shard = directory.ring_shard(user_id)
+
+    assert directory.placement(user_id) is None
+    assert directory.read_shard(user_id) == shard
+
+    assert directory.place(user_id) == Placement(shard)
+    assert directory.placement(user_id) == Placement(shard)
+    assert list(directory.users()) == [(user_id, Placement(shard))]
+
+
+def test_move(directory):
+    user_id = 42
+    with directory.writing([user_id]) as shards:
+        shard = shards[user_id]
+    other = "s2" if shard == "s1" else "s1"
+
+    assert directory.begin_move(user_id, other)
+    assert not directory.begin_move(user_id, other)
+    with pytest.raises(UserMovingError):
+        with directory.writing([user_id]):
+            pass
+    # reads go on from the old shard
+    assert directory.read_shard(user_id) == shard
+
+    assert directory.finish_move(user_id)
+    with directory.writing([user_id]) as shards:
+        assert shards == {user_id: other}
+
+    assert directory.begin_move(user_id, shard)
+    assert directory.abort_move(user_id)
+    with directory.writing([user_id]) as shards:
+        assert shards == {user_id: other}
+
+
+def test_move_fences_writes(directory, postgres_pool):
+    user_id = 42
+    with directory.writing([user_id]) as shards:
+        other = "s2" if shards[user_id] == "s1" else "s1"
+        # the move is begun once the running write is done
+        begun = []
+        mover = threading.Thread(target=lambda: begun.append(directory.begin_move(user_id, other)))
+        mover.start()
+        mover.join(0.2)
+        assert begun == []
+    mover.join()
+    assert begun == [True]
+
+    # the writes begun after wait for the move to finish
+    threading.Timer(0.2, directory.finish_move, args=(user_id,)).start()
+    with Directory(postgres_pool, HashRing(["s1", "s2"]), move_wait=10).writing([user_id]) as shards:
+        assert shards == {user_id: other}
+
+
+def test_receipt_placements(directory):
+    receipt_uuid, unknown_uuid = uuid.uuid4(), uuid.uuid4()
+    shard = directory.place(42).shard
+
+    directory.register([(receipt_uuid, 42)])
+    directory.register([(receipt_uuid, 43)])
+
+    assert directory.receipt_placements([receipt_uuid, unknown_uuid]) == {receipt_uuid: Placement(shard)}
+    assert directory.receipt_read_shard(unknown_uuid) is None
+    with directory.receipt_writing(unknown_uuid) as shards:
+        assert shards == {}
+
+    directory.begin_move(42, "s2" if shard == "s1" else "s1")
+    assert directory.receipt_read_shard(receipt_uuid) == shard
+    with pytest.raises(UserMovingError):
+        with directory.receipt_writing(receipt_uuid):
+            pass
+
+
+def test_name(directory):
+    shard = directory.place(42).shard
+    # a user placed on the other shard
+    user_id = next(user_id for user_id in range(43, 1000) if directory.ring_shard(user_id) != shard)
+    other = directory.place(user_id).shard
+
+    directory.name([("alice", 42)])
+    assert directory.username_read_shard("alice") == shard
+    assert directory.username_read_shard("bob") is None
+
+    # the username taken by another user is theirs
+    directory.name([("alice", 42), ("alice", user_id), ("bob", 42)])
+    assert directory.username_read_shard("alice") == other
+    assert directory.username_read_shard("bob") == shard
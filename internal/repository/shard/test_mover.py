@@ -0,0 +1,95 @@
+import pytest
+
+from internal.domain.receipt import Receipt, ReceiptItem
+from internal.domain.receipt.item import Choice
+from internal.domain.user import User
+from internal.domain.user.id import UserId
+from internal.repository.receipt.storage.postgres.repository import Repository as ReceiptPostgres
+from internal.repository.receipt.storage.sharded.repository import Repository as ReceiptSharded
+from internal.repository.receipt_item.storage.postgres.repository import Repository as ItemPostgres
+from internal.repository.receipt_settlement.storage.postgres.repository import Repository as SettlementPostgres
+from internal.repository.receipt_settlement.storage.sharded.repository import Repository as SettlementSharded
+from internal.repository.shard.directory import Directory
+from internal.repository.shard.mover import Mover
+from internal.repository.user.storage.postgres.repository import Repository as UserPostgres
+from internal.repository.user.storage.sharded.repository import Repository as UserSharded
+from pkg.postgres import HashRing
+
+
+@pytest.fixture(scope="function")
+def pools(shard_pools):
+    yield shard_pools
+
+    for pool in shard_pools.values():
+        ReceiptPostgres(pool, ItemPostgres(pool)).clean()
+        ItemPostgres(pool).clean()
+        UserPostgres(pool).clean()
+        SettlementPostgres(pool).clean()
+
+
+def sharded(pools, ring: HashRing):
+    directory = Directory(pools["s1"], ring)
+    receipts = ReceiptSharded(
+        directory,
+        {shard: ReceiptPostgres(pool, ItemPostgres(pool)) for shard, pool in pools.items()},
+    )
+    users = UserSharded(directory, {shard: UserPostgres(pool) for shard, pool in pools.items()})
+    settlements = SettlementSharded(directory, {shard: SettlementPostgres(pool) for shard, pool in pools.items()})
+    return directory, receipts, users, settlements
+
+
+def test_rebalance(pools):
+    # all the users are placed on s1, then s2 joins the ring
+    directory, receipts, users, settlements = sharded(pools, HashRing(["s1"]))
+    for user_id in range(1, 21):
+        users.upsert_returning(User(user_id=user_id, username="user%d" % user_id))
+        receipt = Receipt(user_id=user_id, items=[ReceiptItem(product="pizza", quantity=2, price=30)])
+        receipt.items[0].split(Choice(uuid=receipt.items[0].uuid, username="user%d" % user_id, quantity=1))
+        receipts.create(receipt)
+
+    directory, receipts, users, settlements = sharded(pools, HashRing(["s1", "s2"]))
+    mover = Mover(directory, pools)
+    misplaced = dict(mover.misplaced())
+    assert set(misplaced.values()) == {"s2"}
+
+    try:
+        assert mover.rebalance() == len(misplaced)
+        assert list(mover.misplaced()) == []
+
+        for user_id in range(1, 21):
+            assert users.read_by_id(UserId(user_id)).username.string() == "user%d" % user_id
+            [receipt] = receipts.read_many(UserId(user_id), limit=10)
+            assert receipts.read_by_uuid(receipt.uuid) == receipt
+            assert [(r.username, r.amount) for r in settlements.read_by_receipt_uuid(receipt.uuid)] == [
+                ("user%d" % user_id, 15.0)
+            ]
+
+        # the moved users are gone from s1
+        s1 = ReceiptPostgres(pools["s1"], ItemPostgres(pools["s1"]))
+        for user_id in misplaced:
+            assert s1.read_many(UserId(user_id), limit=10) == []
+    finally:
+        directory.clean()
+
+
+def test_move_resumes_interrupted(pools):
+    directory, receipts, users, settlements = sharded(pools, HashRing(["s1"]))
+    user = users.upsert_returning(User(user_id=7, username="user7"))
+    receipt = Receipt(user_id=7, items=[ReceiptItem(product="pizza", quantity=2, price=30)])
+    receipt.items[0].split(Choice(uuid=receipt.items[0].uuid, username="user7", quantity=1))
+    receipts.create(receipt)
+
+    # a move interrupted while copying: begun, with part of the rows on s2
+    directory, receipts, users, settlements = sharded(pools, HashRing(["s1", "s2"]))
+    assert directory.begin_move(7, "s2")
+    UserPostgres(pools["s2"]).create(user)
+
+    try:
+        assert Mover(directory, pools).move(7, "s2")
+        assert directory.read_shard(7) == "s2"
+        assert users.read_by_id(UserId(7)) == user
+        assert receipts.read_by_uuid(receipt.uuid) == receipt
+        assert [(r.username, r.amount) for r in settlements.read_by_receipt_uuid(receipt.uuid)] == [("user7", 15.0)]
+        assert ReceiptPostgres(pools["s1"], ItemPostgres(pools["s1"])).read_by_uuid(receipt.uuid) is None
+    finally:
+        directory.clean()
@@ -0,0 +1,33 @@
+from internal.domain.user.username import Username
+from internal.repository.conftest import postgres_url
+from internal.repository.factory import StorageSettings, new_storages
+from internal.repository.migrations import sqlite as sqlite_migrations
+from internal.repository.receipt.storage.sharded.repository import Repository as ReceiptSharded
+from internal.repository.user.storage.sharded.repository import Repository as UserSharded
+from pkg import sqlite
+
+
+def test_sqlite_storages(tmp_path):
+    storages = new_storages(StorageSettings(
+        database_url="sqlite:///%s" % (tmp_path / "receipts.db"),
+        sqlite_pool_max_size=2,
+    ))
+    sqlite.Migrator(storages.pool, sqlite_migrations.migrations()).migrate()
+
+    assert storages.shard_pools == {}
+    assert storages.users.read_by_username(Username("nobody")) is None
+    storages.close()
+
+
+def test_sharded_storages(shard_pools):
+    storages = new_storages(StorageSettings(
+        database_url=postgres_url,
+        postgresql_shard_urls={"s1": postgres_url, "s2": postgres_url + "/receipts_shard"},
+        postgresql_pool_min_size=0,
+    ))
+
+    assert set(storages.shard_pools) == set(shard_pools)
+    assert isinstance(storages.receipts, ReceiptSharded)
+    assert isinstance(storages.users, UserSharded)
+    assert storages.users.read_by_username(Username("nobody")) is None
+    storages.close()
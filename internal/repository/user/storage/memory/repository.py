@@ -0,0 +1,107 @@
+import threading
+import typing as t
+from datetime import datetime
+
+from internal.domain.user import User, UserCreateError
+from internal.domain.user.id import UserId
+from internal.domain.user.username import Username
+from internal.usecase.adapters.user import IReader, ICreator, IUpserter
+
+
+class Row(t.NamedTuple):
+    user_id: int
+    username: t.Optional[str]
+    created_at: datetime
+
+
+class Repository(IReader, ICreator, IUpserter):
+    # Users held in process for tests and benchmarks, indexed by id and by username,
+    # which is unique as in the postgres storage. A lock serializes the operations.
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._users: t.Dict[int, Row] = {}
+        self._by_username: t.Dict[str, int] = {}
+
+    def clean(self):
+        with self._lock:
+            self._users.clear()
+            self._by_username.clear()
+
+    def read_by_id(self, user_id: UserId) -> t.Optional[User]:
+        with self._lock:
+            row = self._users.get(user_id.int())
+
+        if row is None:
+            return
+
+        return parse_user(row)
+
+    def read_by_username(self, username: Username) -> t.Optional[User]:
+        with self._lock:
+            user_id = self._by_username.get(username.string())
+            row = self._users.get(user_id) if user_id is not None else None
+
+        if row is None:
+            return
+
+        return parse_user(row)
+
+    def create(self, user: User) -> User:
+        with self._lock:
+            if user.user_id.int() not in self._users:
+                self._check_username(user)
+                self._write(user_row(user))
+
+        return user
+
+    def upsert_returning(self, user: User) -> User:
+        return self.upsert_many_returning([user])[0]
+
+    def upsert_many_returning(self, users: t.List[User]) -> t.List[User]:
+        # the last of the users with the same id wins
+        users = list({user.user_id.int(): user for user in users}.values())
+        with self._lock:
+            rows = []
+            for user in users:
+                row = user_row(user)
+                owner = self._by_username.get(row.username)
+                if owner is not None and owner != row.user_id:
+                    # the other user renamed since, their username is cleared
+                    self._users[owner] = self._users[owner]._replace(username=None)
+
+                stored = self._users.get(row.user_id)
+                if stored is not None:
+                    # a returning user keeps the creation time
+                    self._by_username.pop(stored.username, None)
+                    row = row._replace(created_at=stored.created_at)
+                self._write(row)
+                rows.append(row)
+
+        return [parse_user(row) for row in rows]
+
+    def _check_username(self, user: User):
+        owner = self._by_username.get(user.username.string())
+        if owner is not None and owner != user.user_id.int():
+            raise UserCreateError("insert user err: duplicate username=%s" % user.username.string())
+
+    def _write(self, row: Row):
+        self._users[row.user_id] = row
+        self._by_username[row.username] = row.user_id
+
+
+def user_row(user: User) -> Row:
+    return Row(
+        user_id=user.user_id.int(),
+        username=user.username.string(),
+        created_at=user.created_at,
+    )
+
+
+def parse_user(row: Row) -> User:
+    # the username taken over by another user is cleared until the next login
+    return User(
+        user_id=row.user_id,
+        username=row.username if row.username is not None else "unknown",
+        created_at=row.created_at
+    )
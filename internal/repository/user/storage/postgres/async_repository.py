@@ -0,0 +1,131 @@
+import typing as t
+
+import psycopg
+
+from internal.domain.user import User, UserCreateError, UserReadError
+from internal.domain.user.id import UserId
+from internal.domain.user.username import Username
+from internal.usecase.adapters.user import IAsyncReader, IAsyncCreator, IAsyncUpserter
+from pkg.postgres import AsyncPool
+from .repository import (
+    INSERT_SQL,
+    SELECT_BY_USER_ID_SQL,
+    SELECT_BY_USERNAME_SQL,
+    UPSERT_RETURNING_SQL,
+    UPSERT_MANY_RETURNING_SQL,
+    user_params,
+    users_params,
+    parse_user,
+)
+
+
+class AsyncRepository(IAsyncReader, IAsyncCreator, IAsyncUpserter):
+
+    def __init__(self, pool: AsyncPool):
+        self._pool = pool
+
+    async def read_by_id(self, user_id: UserId) -> t.Optional[User]:
+        try:
+            async with self._pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        SELECT_BY_USER_ID_SQL,
+                        params={
+                            "user_id": user_id.int()
+                        }
+                    )
+                    row = await cur.fetchone()
+        except psycopg.errors.DatabaseError as e:
+            raise UserReadError("select user err: %s" % e)
+
+        if row is None:
+            return
+
+        return parse_user(row)
+
+    async def read_by_username(self, username: Username) -> t.Optional[User]:
+        try:
+            async with self._pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        SELECT_BY_USERNAME_SQL,
+                        params={
+                            "username": username.string()
+                        }
+                    )
+                    row = await cur.fetchone()
+        except psycopg.errors.DatabaseError as e:
+            raise UserReadError("select user err: %s" % e)
+
+        if row is None:
+            return
+
+        return parse_user(row)
+
+    async def create(self, user: User) -> User:
+
+        try:
+            async with self._pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        query=INSERT_SQL,
+                        params={
+                            'user_id': user.user_id.int(),
+                            'username': user.username.string(),
+                            'created_at': user.created_at
+                        }
+                    )
+
+        except psycopg.errors.DatabaseError as e:
+
+            raise UserCreateError("insert user err: %s" % e)
+
+        return user
+
+    async def upsert_returning(self, user: User) -> User:
+        try:
+            async with self._pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    # a user inserted by a concurrent login after the snapshot of the
+                    # statement is seen neither by its insert nor by its select, the
+                    # statement is run again
+                    for _ in range(2):
+                        await cur.execute(
+                            query=UPSERT_RETURNING_SQL,
+                            params=user_params(user),
+                            prepare=True,
+                        )
+                        row = await cur.fetchone()
+                        if row is not None:
+                            break
+
+        except psycopg.errors.DatabaseError as e:
+
+            raise UserCreateError("upsert user err: %s" % e)
+
+        return parse_user(row)
+
+    async def upsert_many_returning(self, users: t.List[User]) -> t.List[User]:
+        # a statement can't update a row twice, the last of the users with the same id wins
+        users = list({user.user_id.int(): user for user in users}.values())
+        if not users:
+            return []
+
+        try:
+            async with self._pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    # run again for the users inserted concurrently, as UPSERT_RETURNING_SQL
+                    for _ in range(2):
+                        await cur.execute(
+                            query=UPSERT_MANY_RETURNING_SQL,
+                            params=users_params(users),
+                        )
+                        rows = await cur.fetchall()
+                        if len(rows) == len(users):
+                            break
+
+        except psycopg.errors.DatabaseError as e:
+
+            raise UserCreateError("upsert users err: %s" % e)
+
+        return [parse_user(row) for row in rows]
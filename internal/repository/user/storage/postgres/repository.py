@@ -5,14 +5,11 @@ import psycopg
 from internal.domain.user import User, UserCreateError, UserReadError
 from internal.domain.user.id import UserId
 from internal.domain.user.username import Username
-from internal.usecase.adapters.user import IReader, ICreator
-
-CREATE_SCHEMA_SQL = b"""
-    CREATE TABLE IF NOT EXISTS tbl_user (
-        user_id  integer PRIMARY KEY,
-        username varchar(300) UNIQUE,
-        created_at timestamp without time zone
-    );
+from internal.usecase.adapters.user import IReader, ICreator, IUpserter
+from pkg.postgres import ConnectionProvider, name_statements
+
+CLEAN_SQL = b"""
+    truncate table tbl_user;
 """
 
 INSERT_SQL = b"""
@@ -43,87 +40,254 @@ SELECT_BY_USERNAME_SQL = b"""
         username,
         created_at
     FROM tbl_user 
-    WHERE user_id = %(user_id)s;
+    WHERE username = %(username)s;
 """
 
+# Creates the user or updates the username of the existing one, which can change in
+# telegram, and returns the stored user in one statement. The username is written
+# only when it changed, a returning user is read by the fallback select, so logins
+# write nothing; another user keeping the new username (renamed since in telegram)
+# has it cleared first, to get it back on their next login. The insert reads the
+# released CTE to run after it.
+UPSERT_RETURNING_SQL = b"""
+    WITH input as (
+        SELECT
+            %(user_id)s::bigint as user_id,
+            %(username)s::text as username,
+            %(created_at)s::timestamptz as created_at
+    ), released as (
+        UPDATE tbl_user
+        SET username = NULL
+        FROM input
+        WHERE tbl_user.username = input.username
+          AND tbl_user.user_id <> input.user_id
+        RETURNING tbl_user.user_id
+    ), upserted as (
+        INSERT INTO tbl_user (
+            user_id,
+            username,
+            created_at
+        )
+        SELECT
+            input.user_id,
+            input.username,
+            input.created_at
+        FROM input
+        WHERE NOT EXISTS (SELECT 1 FROM released WHERE released.user_id IS NULL)
+        ON CONFLICT (user_id)
+        DO UPDATE SET
+            username = EXCLUDED.username
+        WHERE tbl_user.username IS DISTINCT FROM EXCLUDED.username
+        RETURNING
+            user_id,
+            username,
+            created_at
+    )
+    SELECT user_id, username, created_at FROM upserted
+    UNION ALL
+    SELECT
+        u.user_id,
+        u.username,
+        u.created_at
+    FROM tbl_user as u
+    JOIN input ON u.user_id = input.user_id
+    WHERE NOT EXISTS (SELECT 1 FROM upserted);
+"""
 
-class Repository(IReader, ICreator):
+# UPSERT_RETURNING_SQL of many users
+UPSERT_MANY_RETURNING_SQL = b"""
+    WITH input as (
+        SELECT
+            u.user_id,
+            u.username,
+            u.created_at
+        FROM unnest(
+            %(user_ids)s::bigint[],
+            %(usernames)s::text[],
+            %(created_ats)s::timestamptz[]
+        ) as u(user_id, username, created_at)
+    ), released as (
+        UPDATE tbl_user
+        SET username = NULL
+        FROM input
+        WHERE tbl_user.username = input.username
+          AND tbl_user.user_id NOT IN (SELECT user_id FROM input)
+        RETURNING tbl_user.user_id
+    ), upserted as (
+        INSERT INTO tbl_user (
+            user_id,
+            username,
+            created_at
+        )
+        SELECT
+            input.user_id,
+            input.username,
+            input.created_at
+        FROM input
+        WHERE NOT EXISTS (SELECT 1 FROM released WHERE released.user_id IS NULL)
+        ON CONFLICT (user_id)
+        DO UPDATE SET
+            username = EXCLUDED.username
+        WHERE tbl_user.username IS DISTINCT FROM EXCLUDED.username
+        RETURNING
+            user_id,
+            username,
+            created_at
+    )
+    SELECT user_id, username, created_at FROM upserted
+    UNION ALL
+    SELECT
+        u.user_id,
+        u.username,
+        u.created_at
+    FROM tbl_user as u
+    JOIN input ON u.user_id = input.user_id
+    WHERE u.user_id NOT IN (SELECT user_id FROM upserted);
+"""
 
-    def __init__(self, conn: psycopg.Connection):
-        self._conn = conn
-        self.init_schema()
 
-    def init_schema(self):
-        with self._conn.cursor() as cur:
-            cur.execute(query=CREATE_SCHEMA_SQL)
-        self._conn.commit()
+class Repository(IReader, ICreator, IUpserter):
+
+    def __init__(self, pool: ConnectionProvider):
+        self._pool = pool
+
+    def clean(self):
+        with self._pool.connection() as conn:
+            conn.execute(query=CLEAN_SQL)
 
     def read_by_id(self, user_id: UserId) -> t.Optional[User]:
         try:
-            with self._conn.cursor() as cur:
-                cur.execute(
-                    SELECT_BY_USER_ID_SQL,
-                    params={
-                        "user_id": user_id.string()
-                    }
-                )
-                row = cur.fetchone()
+            with self._pool.replica(user_id.int()) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        SELECT_BY_USER_ID_SQL,
+                        params={
+                            "user_id": user_id.int()
+                        }
+                    )
+                    row = cur.fetchone()
         except psycopg.errors.DatabaseError as e:
             raise UserReadError("select user err: %s" % e)
 
         if row is None:
             return
 
-        ret = User(
-            user_id=row[0],
-            username=row[1],
-            created_at=row[2]
-        )
-        return ret
+        return parse_user(row)
 
     def read_by_username(self, username: Username) -> t.Optional[User]:
         try:
-            with self._conn.cursor() as cur:
-                cur.execute(
-                    SELECT_BY_USERNAME_SQL,
-                    params={
-                        "username": username.string()
-                    }
-                )
-                row = cur.fetchone()
+            with self._pool.replica(username.string()) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        SELECT_BY_USERNAME_SQL,
+                        params={
+                            "username": username.string()
+                        }
+                    )
+                    row = cur.fetchone()
         except psycopg.errors.DatabaseError as e:
             raise UserReadError("select user err: %s" % e)
 
         if row is None:
             return
 
-        ret = User(
-            user_id=row[0],
-            username=row[1],
-            created_at=row[2]
-        )
-        return ret
+        return parse_user(row)
 
     def create(self, user: User) -> User:
 
         try:
-            with self._conn.cursor() as cur:
-                cur.execute(
-                    query=INSERT_SQL,
-                    params={
-                        'user_id': user.user_id.int(),
-                        'username': user.username.string(),
-                        'created_at': user.created_at
-                    }
-                )
+            with self._pool.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        query=INSERT_SQL,
+                        params={
+                            'user_id': user.user_id.int(),
+                            'username': user.username.string(),
+                            'created_at': user.created_at
+                        }
+                    )
 
         except psycopg.errors.DatabaseError as e:
 
-            self._conn.rollback()
-
             raise UserCreateError("insert user err: %s" % e)
 
-        else:
-            self._conn.commit()
-
+        self._pool.written(user.user_id.int(), user.username.string())
         return user
+
+    def upsert_returning(self, user: User) -> User:
+        try:
+            with self._pool.connection() as conn:
+                with conn.cursor() as cur:
+                    # a user inserted by a concurrent login after the snapshot of the
+                    # statement is seen neither by its insert nor by its select, the
+                    # statement is run again
+                    for _ in range(2):
+                        cur.execute(
+                            query=UPSERT_RETURNING_SQL,
+                            params=user_params(user),
+                            prepare=True,
+                        )
+                        row = cur.fetchone()
+                        if row is not None:
+                            break
+
+        except psycopg.errors.DatabaseError as e:
+
+            raise UserCreateError("upsert user err: %s" % e)
+
+        self._pool.written(user.user_id.int(), user.username.string())
+        return parse_user(row)
+
+    def upsert_many_returning(self, users: t.List[User]) -> t.List[User]:
+        # a statement can't update a row twice, the last of the users with the same id wins
+        users = list({user.user_id.int(): user for user in users}.values())
+        if not users:
+            return []
+
+        try:
+            with self._pool.connection() as conn:
+                with conn.cursor() as cur:
+                    # run again for the users inserted concurrently, as UPSERT_RETURNING_SQL
+                    for _ in range(2):
+                        cur.execute(
+                            query=UPSERT_MANY_RETURNING_SQL,
+                            params=users_params(users),
+                        )
+                        rows = cur.fetchall()
+                        if len(rows) == len(users):
+                            break
+
+        except psycopg.errors.DatabaseError as e:
+
+            raise UserCreateError("upsert users err: %s" % e)
+
+        self._pool.written(*(user.user_id.int() for user in users), *(user.username.string() for user in users))
+        return [parse_user(row) for row in rows]
+
+
+def user_params(user: User) -> t.Dict[str, t.Any]:
+    return {
+        'user_id': user.user_id.int(),
+        'username': user.username.string(),
+        'created_at': user.created_at
+    }
+
+
+def users_params(users: t.List[User]) -> t.Dict[str, t.Any]:
+    return {
+        'user_ids': [user.user_id.int() for user in users],
+        'usernames': [user.username.string() for user in users],
+        'created_ats': [user.created_at for user in users],
+    }
+
+
+def parse_user(row) -> User:
+    # the username taken over by another user is cleared until the next login
+    return User(
+        user_id=row[0],
+        username=row[1] if row[1] is not None else "unknown",
+        created_at=row[2]
+    )
+
+
+name_statements("user", globals())
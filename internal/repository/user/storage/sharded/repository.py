@@ -0,0 +1,74 @@
+import typing as t
+from collections import defaultdict
+from contextlib import contextmanager
+
+from internal.domain.user import User, UserCreateError, UserReadError
+from internal.domain.user.id import UserId
+from internal.domain.user.username import Username
+from internal.repository.shard.directory import Directory, DirectoryError
+from internal.repository.user.storage.postgres.repository import Repository as UserRepository
+from internal.usecase.adapters.user import IReader, ICreator, IUpserter
+
+
+class Repository(IReader, ICreator, IUpserter):
+    # Users on the shard the directory places them on, next to their receipts. Their
+    # usernames are named in the directory with the writes, reads by username go to
+    # the shard of the user named so.
+    def __init__(self, directory: Directory, repos: t.Dict[str, UserRepository]):
+        self._directory = directory
+        self._repos = repos
+
+    def read_by_id(self, user_id: UserId) -> t.Optional[User]:
+        try:
+            shard = self._directory.read_shard(user_id.int())
+        except DirectoryError as e:
+            raise UserReadError("find user err: %s" % e)
+
+        return self._repos[shard].read_by_id(user_id)
+
+    def read_by_username(self, username: Username) -> t.Optional[User]:
+        try:
+            shard = self._directory.username_read_shard(username.string())
+        except DirectoryError as e:
+            raise UserReadError("find user err: %s" % e)
+
+        if shard is None:
+            return None
+        return self._repos[shard].read_by_username(username)
+
+    def create(self, user: User) -> User:
+        with self._writing([user]) as shards:
+            return self._named([self._repos[shards[user.user_id.int()]].create(user)])[0]
+
+    def upsert_returning(self, user: User) -> User:
+        with self._writing([user]) as shards:
+            return self._named([self._repos[shards[user.user_id.int()]].upsert_returning(user)])[0]
+
+    def upsert_many_returning(self, users: t.List[User]) -> t.List[User]:
+        with self._writing(users) as shards:
+            by_shard = defaultdict(list)
+            for user in users:
+                by_shard[shards[user.user_id.int()]].append(user)
+
+            return self._named([
+                upserted
+                for shard, shard_users in by_shard.items()
+                for upserted in self._repos[shard].upsert_many_returning(shard_users)
+            ])
+
+    def _named(self, users: t.List[User]) -> t.List[User]:
+        # the written users named in the directory, still holding their placements
+        try:
+            self._directory.name([(user.username.string(), user.user_id.int()) for user in users])
+        except DirectoryError as e:
+            raise UserCreateError("name user err: %s" % e)
+        return users
+
+    @contextmanager
+    def _writing(self, users: t.List[User]) -> t.Iterator[t.Dict[int, str]]:
+        # the shards of the users, held for the writes (see Directory.writing)
+        try:
+            with self._directory.writing([user.user_id.int() for user in users]) as shards:
+                yield shards
+        except DirectoryError as e:
+            raise UserCreateError("place user err: %s" % e)
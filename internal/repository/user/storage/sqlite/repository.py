@@ -0,0 +1,156 @@
+import sqlite3
+import typing as t
+
+from internal.domain.user import User, UserCreateError, UserReadError
+from internal.domain.user.id import UserId
+from internal.domain.user.username import Username
+from internal.usecase.adapters.user import IReader, ICreator, IUpserter
+from pkg.sqlite import Database, to_micros, from_micros
+
+CLEAN_SQL = """
+    DELETE FROM tbl_user;
+"""
+
+INSERT_SQL = """
+    INSERT INTO tbl_user (
+        user_id,
+        username,
+        created_at
+    )
+    VALUES (
+        :user_id,
+        :username,
+        :created_at
+    ) ON CONFLICT (user_id) DO NOTHING;
+"""
+
+SELECT_BY_USER_ID_SQL = """
+    SELECT
+        user_id,
+        username,
+        created_at
+    FROM tbl_user
+    WHERE user_id = :user_id;
+"""
+
+SELECT_BY_USERNAME_SQL = """
+    SELECT
+        user_id,
+        username,
+        created_at
+    FROM tbl_user
+    WHERE username = :username;
+"""
+
+# the released CTE of UPSERT_RETURNING_SQL of the postgres storage
+RELEASE_USERNAME_SQL = """
+    UPDATE tbl_user
+    SET username = NULL
+    WHERE username = :username
+      AND user_id <> :user_id;
+"""
+
+# UPSERT_RETURNING_SQL of the postgres storage, which falls back to SELECT_BY_USER_ID_SQL
+# when the username is unchanged
+UPSERT_RETURNING_SQL = """
+    INSERT INTO tbl_user (
+        user_id,
+        username,
+        created_at
+    )
+    VALUES (
+        :user_id,
+        :username,
+        :created_at
+    )
+    ON CONFLICT (user_id)
+    DO UPDATE SET
+        username = excluded.username
+    WHERE tbl_user.username IS NOT excluded.username
+    RETURNING
+        user_id,
+        username,
+        created_at;
+"""
+
+
+class Repository(IReader, ICreator, IUpserter):
+
+    def __init__(self, db: Database):
+        self._db = db
+
+    def clean(self):
+        with self._db.connection() as conn:
+            conn.execute(CLEAN_SQL)
+
+    def read_by_id(self, user_id: UserId) -> t.Optional[User]:
+        try:
+            with self._db.reader() as conn:
+                row = conn.execute(SELECT_BY_USER_ID_SQL, {"user_id": user_id.int()}).fetchone()
+        except sqlite3.Error as e:
+            raise UserReadError("select user err: %s" % e)
+
+        if row is None:
+            return
+
+        return parse_user(row)
+
+    def read_by_username(self, username: Username) -> t.Optional[User]:
+        try:
+            with self._db.reader() as conn:
+                row = conn.execute(SELECT_BY_USERNAME_SQL, {"username": username.string()}).fetchone()
+        except sqlite3.Error as e:
+            raise UserReadError("select user err: %s" % e)
+
+        if row is None:
+            return
+
+        return parse_user(row)
+
+    def create(self, user: User) -> User:
+        try:
+            with self._db.connection() as conn:
+                conn.execute(INSERT_SQL, user_params(user))
+        except sqlite3.Error as e:
+            raise UserCreateError("insert user err: %s" % e)
+
+        return user
+
+    def upsert_returning(self, user: User) -> User:
+        return self.upsert_many_returning([user])[0]
+
+    def upsert_many_returning(self, users: t.List[User]) -> t.List[User]:
+        # one prepared statement per user in one transaction, as executemany() returns
+        # no rows; the last of the users with the same id wins
+        users = list({user.user_id.int(): user for user in users}.values())
+        try:
+            with self._db.connection() as conn:
+                rows = []
+                for user in users:
+                    params = user_params(user)
+                    conn.execute(RELEASE_USERNAME_SQL, params)
+                    row = conn.execute(UPSERT_RETURNING_SQL, params).fetchone()
+                    if row is None:
+                        row = conn.execute(SELECT_BY_USER_ID_SQL, params).fetchone()
+                    rows.append(row)
+        except sqlite3.Error as e:
+            raise UserCreateError("upsert users err: %s" % e)
+
+        return [parse_user(row) for row in rows]
+
+
+def user_params(user: User) -> t.Dict[str, t.Any]:
+    return {
+        'user_id': user.user_id.int(),
+        'username': user.username.string(),
+        'created_at': to_micros(user.created_at),
+    }
+
+
+def parse_user(row) -> User:
+    # the username taken over by another user is cleared until the next login
+    return User(
+        user_id=row[0],
+        username=row[1] if row[1] is not None else "unknown",
+        created_at=from_micros(row[2])
+    )
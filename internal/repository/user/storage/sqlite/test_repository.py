@@ -0,0 +1,80 @@
+import threading
+from datetime import timedelta
+
+import pytest
+
+from internal.domain.user import User
+from internal.domain.user.id import UserId
+from internal.domain.user.username import Username
+from internal.repository.user.storage.sqlite.repository import Repository
+from internal.repository.migrations.sqlite import migrations
+from pkg.sqlite import Database, Migrator
+
+
+@pytest.fixture(scope="session")
+def db(tmp_path_factory) -> Database:
+    db = Database(str(tmp_path_factory.mktemp("sqlite") / "users.db"))
+    Migrator(db, migrations()).migrate()
+    yield db
+    db.close()
+
+
+@pytest.fixture(scope="function")
+def repo(db) -> Repository:
+    repo = Repository(db)
+
+    yield repo
+
+    repo.clean()
+
+
+@pytest.fixture(scope="function")
+def user() -> User:
+    return User(user_id=42, username="user42")
+
+
+def test_read_by_username(repo, user):
+    repo.create(user)
+    repo.create(User(user_id=43, username="user43"))
+
+    assert repo.read_by_username(Username("user42")) == user
+    assert repo.read_by_username(Username("nobody")) is None
+
+
+def test_upsert_returning(repo, user):
+    created = repo.upsert_returning(user)
+    assert created == user
+
+    # a returning user keeps the creation time and gets the new username
+    renamed = repo.upsert_returning(
+        User(user_id=42, username="renamed", created_at=user.created_at + timedelta(days=1))
+    )
+    assert renamed.username == Username("renamed")
+    assert renamed.created_at == user.created_at
+    assert repo.read_by_id(UserId(42)) == renamed
+
+
+def test_upsert_returning_concurrently(repo, user):
+    users = []
+    threads = [threading.Thread(target=lambda: users.append(repo.upsert_returning(user))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert users == [user] * 8
+
+
+def test_upsert_many_returning(repo, user):
+    repo.create(user)
+
+    users = repo.upsert_many_returning(
+        [
+            User(user_id=42, username="renamed"),
+            User(user_id=43, username="user43"),
+            User(user_id=43, username="user43 renamed"),
+        ]
+    )
+
+    assert sorted((u.user_id.int(), u.username.string()) for u in users) == [(42, "renamed"), (43, "user43 renamed")]
+    assert repo.upsert_many_returning([]) == []
@@ -0,0 +1,86 @@
+import threading
+from datetime import timedelta
+
+import pytest
+
+from internal.domain.user import User, UserCreateError
+from internal.domain.user.id import UserId
+from internal.domain.user.username import Username
+
+# the contract of the user storages, run against each backend by the `storage` fixture
+
+
+@pytest.fixture(scope="function")
+def user() -> User:
+    return User(user_id=42, username="user42")
+
+
+def test_create(storage, user):
+    assert storage.users.create(user) == user
+    # a stored user is kept
+    storage.users.create(User(user_id=42, username="renamed"))
+
+    assert storage.users.read_by_id(UserId(42)) == user
+    assert storage.users.read_by_username(Username("user42")) == user
+    assert storage.users.read_by_id(UserId(43)) is None
+    assert storage.users.read_by_username(Username("nobody")) is None
+
+
+def test_create_duplicate_username(storage, user):
+    storage.users.create(user)
+
+    with pytest.raises(UserCreateError):
+        storage.users.create(User(user_id=43, username="user42"))
+
+
+def test_upsert_returning(storage, user):
+    assert storage.users.upsert_returning(user) == user
+
+    # a returning user keeps the creation time and gets the new username
+    renamed = storage.users.upsert_returning(
+        User(user_id=42, username="renamed", created_at=user.created_at + timedelta(days=1))
+    )
+    assert (renamed.username, renamed.created_at) == (Username("renamed"), user.created_at)
+    assert storage.users.read_by_username(Username("renamed")) == renamed
+    assert storage.users.read_by_username(Username("user42")) is None
+
+
+def test_upsert_returning_taken_username(storage, user):
+    storage.users.upsert_returning(user)
+
+    # user42 renamed in telegram and another user took the name: the stale name is
+    # cleared, user42 gets a name again on their next login
+    taken = storage.users.upsert_returning(User(user_id=43, username="user42"))
+    assert taken.username == Username("user42")
+    assert storage.users.read_by_username(Username("user42")) == taken
+    assert storage.users.read_by_id(UserId(42)).username == Username("unknown")
+
+    users = storage.users.upsert_many_returning([User(user_id=42, username="user42")])
+    assert [u.username for u in users] == [Username("user42")]
+    assert storage.users.read_by_id(UserId(43)).username == Username("unknown")
+
+
+def test_upsert_returning_concurrently(storage, user):
+    users = []
+    threads = [threading.Thread(target=lambda: users.append(storage.users.upsert_returning(user))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert users == [user] * 8
+
+
+def test_upsert_many_returning(storage, user):
+    storage.users.create(user)
+
+    users = storage.users.upsert_many_returning(
+        [
+            User(user_id=42, username="renamed"),
+            User(user_id=43, username="user43"),
+            User(user_id=43, username="user43 renamed"),
+        ]
+    )
+
+    assert sorted((u.user_id.int(), u.username.string()) for u in users) == [(42, "renamed"), (43, "user43 renamed")]
+    assert storage.users.upsert_many_returning([]) == []
@@ -1,8 +1,25 @@
-from internal.usecase.adapters.receipt._interface import ICreator, IUpdater, IReader, IRecognizer
+from internal.usecase.adapters.receipt._interface import (
+    ICreator,
+    IBulkCreator,
+    IUpdater,
+    IReader,
+    IStreamer,
+    ISearcher,
+    IAsyncCreator,
+    IAsyncUpdater,
+    IAsyncReader,
+    IRecognizer,
+)
 
 __all__ = (
     'ICreator',
+    'IBulkCreator',
     'IUpdater',
     'IReader',
+    'IStreamer',
+    'ISearcher',
+    'IAsyncCreator',
+    'IAsyncUpdater',
+    'IAsyncReader',
     'IRecognizer',
 )
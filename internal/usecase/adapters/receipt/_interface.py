@@ -1,10 +1,12 @@
 import typing as t
 from abc import ABC, abstractmethod
+from datetime import datetime
 from pydantic import UUID4
 
 from internal.domain.image import Image
 from internal.domain.user.id import UserId
-from internal.domain.receipt import Receipt
+from internal.domain.receipt import Receipt, ReceiptMatch
+from internal.domain.receipt.cursor import Cursor, SearchCursor
 
 
 class ICreator(ABC):
@@ -13,6 +15,13 @@ class ICreator(ABC):
         raise NotImplementedError("method `.create()` must be implemented")
 
 
+class IBulkCreator(ABC):
+    @abstractmethod
+    def create_many(self, receipts: t.List[Receipt]) -> int:
+        # returns the number of created receipts
+        raise NotImplementedError("method `.create_many()` must be implemented")
+
+
 class IUpdater(ABC):
     @abstractmethod
     def update(self, receipt: Receipt):
@@ -25,7 +34,56 @@ class IReader(ABC):
         raise NotImplementedError("method `.read_by_uuid()` must be implemented")
 
     @abstractmethod
-    def read_many(self, user_id: UserId, limit: int, offset: int) -> t.List[Receipt]:
+    def read_many(self, user_id: UserId, limit: int, cursor: t.Optional[Cursor] = None) -> t.List[Receipt]:
+        # returns up to `limit` receipts of the user created before `cursor`, newest first
+        raise NotImplementedError("method `.read_many()` must be implemented")
+
+
+class IStreamer(ABC):
+    @abstractmethod
+    def stream(
+            self,
+            user_id: t.Optional[UserId] = None,
+            since: t.Optional[datetime] = None,
+            until: t.Optional[datetime] = None,
+    ) -> t.Iterator[Receipt]:
+        # yields receipts ordered by creation time without loading them all into memory
+        raise NotImplementedError("method `.stream()` must be implemented")
+
+
+class ISearcher(ABC):
+    @abstractmethod
+    def search(
+            self,
+            user_id: UserId,
+            query: str,
+            limit: int,
+            cursor: t.Optional[SearchCursor] = None,
+    ) -> t.List[ReceiptMatch]:
+        # returns up to `limit` receipts of the user whose store or products contain the
+        # query, best matches first, continuing after `cursor`
+        raise NotImplementedError("method `.search()` must be implemented")
+
+
+class IAsyncCreator(ABC):
+    @abstractmethod
+    async def create(self, receipt: Receipt):
+        raise NotImplementedError("method `.create()` must be implemented")
+
+
+class IAsyncUpdater(ABC):
+    @abstractmethod
+    async def update(self, receipt: Receipt):
+        raise NotImplementedError("method `.update()` must be implemented")
+
+
+class IAsyncReader(ABC):
+    @abstractmethod
+    async def read_by_uuid(self, uuid: UUID4) -> t.Optional[Receipt]:
+        raise NotImplementedError("method `.read_by_uuid()` must be implemented")
+
+    @abstractmethod
+    async def read_many(self, user_id: UserId, limit: int, cursor: t.Optional[Cursor] = None) -> t.List[Receipt]:
         raise NotImplementedError("method `.read_many()` must be implemented")
 
 
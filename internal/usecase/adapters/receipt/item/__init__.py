@@ -1,7 +1,10 @@
-from ._interface import ICreator, IUpdater, IReader
+from ._interface import ICreator, IUpdater, IReader, IAsyncCreator, IAsyncUpdater, IAsyncReader
 
 __all__ = (
     'ICreator',
     'IUpdater',
     'IReader',
+    'IAsyncCreator',
+    'IAsyncUpdater',
+    'IAsyncReader',
 )
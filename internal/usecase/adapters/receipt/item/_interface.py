@@ -1,5 +1,7 @@
 import typing as t
 from abc import ABC, abstractmethod
+from datetime import datetime
+
 from pydantic import UUID4
 
 from internal.domain.receipt.item import ReceiptItem
@@ -7,17 +9,53 @@ from internal.domain.receipt.item import ReceiptItem
 
 class ICreator(ABC):
     @abstractmethod
-    def create_many(self, receipt_uuid: str, items: t.List[ReceiptItem]):
+    def create_many(self, receipt_uuid: UUID4, receipt_created_at: datetime, receipt_items: t.List[ReceiptItem]):
         raise NotImplementedError("method `.create_many()` must be implemented")
 
 
 class IUpdater(ABC):
     @abstractmethod
-    def update_many(self, receipt_uuid: UUID4, items: t.List[ReceiptItem]):
+    def update_many(self, receipt_uuid: UUID4, receipt_created_at: datetime, receipt_items: t.List[ReceiptItem]):
         raise NotImplementedError("method `.update_many()` must be implemented")
 
 
 class IReader(ABC):
     @abstractmethod
     def read_by_receipt_uuid(self, receipt_uuid: UUID4) -> t.List[ReceiptItem]:
-        raise NotImplementedError("method `.read_many()` must be implemented")
+        raise NotImplementedError("method `.read_by_receipt_uuid()` must be implemented")
+
+    @abstractmethod
+    def read_by_receipt_uuids(
+            self,
+            receipt_uuids: t.List[UUID4],
+            receipt_created_ats: t.Optional[t.List[datetime]] = None,
+    ) -> t.Dict[UUID4, t.List[ReceiptItem]]:
+        # the creation times of the receipts, when known, let a partitioned storage
+        # read only the partitions of their months
+        raise NotImplementedError("method `.read_by_receipt_uuids()` must be implemented")
+
+
+class IAsyncCreator(ABC):
+    @abstractmethod
+    async def create_many(self, receipt_uuid: UUID4, receipt_created_at: datetime, receipt_items: t.List[ReceiptItem]):
+        raise NotImplementedError("method `.create_many()` must be implemented")
+
+
+class IAsyncUpdater(ABC):
+    @abstractmethod
+    async def update_many(self, receipt_uuid: UUID4, receipt_created_at: datetime, receipt_items: t.List[ReceiptItem]):
+        raise NotImplementedError("method `.update_many()` must be implemented")
+
+
+class IAsyncReader(ABC):
+    @abstractmethod
+    async def read_by_receipt_uuid(self, receipt_uuid: UUID4) -> t.List[ReceiptItem]:
+        raise NotImplementedError("method `.read_by_receipt_uuid()` must be implemented")
+
+    @abstractmethod
+    async def read_by_receipt_uuids(
+            self,
+            receipt_uuids: t.List[UUID4],
+            receipt_created_ats: t.Optional[t.List[datetime]] = None,
+    ) -> t.Dict[UUID4, t.List[ReceiptItem]]:
+        raise NotImplementedError("method `.read_by_receipt_uuids()` must be implemented")
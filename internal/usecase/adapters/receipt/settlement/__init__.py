@@ -0,0 +1,6 @@
+from ._interface import IReader, IRepairer
+
+__all__ = (
+    'IReader',
+    'IRepairer',
+)
@@ -0,0 +1,21 @@
+import typing as t
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from pydantic import UUID4
+
+from internal.domain.receipt import Result
+
+
+class IReader(ABC):
+    @abstractmethod
+    def read_by_receipt_uuid(self, receipt_uuid: UUID4) -> t.List[Result]:
+        raise NotImplementedError("method `.read_by_receipt_uuid()` must be implemented")
+
+
+class IRepairer(ABC):
+    @abstractmethod
+    def repair(self, since: t.Optional[datetime] = None) -> int:
+        # recomputes the settlements which differ from the splits of the receipts created
+        # since `since`, returns the number of repaired rows
+        raise NotImplementedError("method `.repair()` must be implemented")
@@ -1,6 +1,10 @@
-from ._interface import IReader, ICreator
+from ._interface import IReader, ICreator, IUpserter, IAsyncReader, IAsyncCreator, IAsyncUpserter
 
 __all__ = (
     "IReader",
     "ICreator",
+    "IUpserter",
+    "IAsyncReader",
+    "IAsyncCreator",
+    "IAsyncUpserter",
 )
@@ -10,6 +10,17 @@ class ICreator(ABC):
         raise NotImplementedError("method `.create()` must be implemented")
 
 
+class IUpserter(ABC):
+    @abstractmethod
+    def upsert_returning(self, user: User) -> User:
+        # creates the user or updates the existing one, returns the stored user
+        raise NotImplementedError("method `.upsert_returning()` must be implemented")
+
+    @abstractmethod
+    def upsert_many_returning(self, users: t.List[User]) -> t.List[User]:
+        raise NotImplementedError("method `.upsert_many_returning()` must be implemented")
+
+
 class IReader(ABC):
     @abstractmethod
     def read_by_id(self, user_id: int) -> t.Optional[User]:
@@ -18,3 +29,29 @@ class IReader(ABC):
     @abstractmethod
     def read_by_username(self, username: str) -> t.Optional[User]:
         raise NotImplementedError("method `.read_by_username()` must be implemented")
+
+
+class IAsyncCreator(ABC):
+    @abstractmethod
+    async def create(self, user: User) -> User:
+        raise NotImplementedError("method `.create()` must be implemented")
+
+
+class IAsyncUpserter(ABC):
+    @abstractmethod
+    async def upsert_returning(self, user: User) -> User:
+        raise NotImplementedError("method `.upsert_returning()` must be implemented")
+
+    @abstractmethod
+    async def upsert_many_returning(self, users: t.List[User]) -> t.List[User]:
+        raise NotImplementedError("method `.upsert_many_returning()` must be implemented")
+
+
+class IAsyncReader(ABC):
+    @abstractmethod
+    async def read_by_id(self, user_id: int) -> t.Optional[User]:
+        raise NotImplementedError("method `.read_by_id()` must be implemented")
+
+    @abstractmethod
+    async def read_by_username(self, username: str) -> t.Optional[User]:
+        raise NotImplementedError("method `.read_by_username()` must be implemented")
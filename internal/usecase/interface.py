@@ -6,7 +6,8 @@ from pydantic import UUID4
 
 from internal.domain.user.id import UserId
 from internal.domain.image import Image
-from internal.domain.receipt import Receipt
+from internal.domain.receipt import Receipt, ReceiptMatch, Result
+from internal.domain.receipt.cursor import Cursor, SearchCursor
 from internal.domain.receipt.item import Choice
 from internal.domain.user import User
 
@@ -17,6 +18,13 @@ class IReceiptRecognizeUC(ABC):
         raise NotImplementedError("method `.recognize()` must be implemented")
 
 
+class IReceiptIngestUC(ABC):
+    @abstractmethod
+    def ingest(self, receipts: t.Iterable[Receipt]) -> int:
+        # public bulk load interface
+        raise NotImplementedError("method `.ingest()` must be implemented")
+
+
 class IReceiptReadUC(ABC):
     @abstractmethod
     def read(self, receipt_uuid: UUID4) -> t.Optional[Receipt]:
@@ -24,15 +32,33 @@ class IReceiptReadUC(ABC):
         raise NotImplementedError("method `.read()` must be implemented")
 
     @abstractmethod
-    def read_many(self, user_id: UserId, limit: int, offset: int) -> t.List[Receipt]:
+    def read_many(self, user_id: UserId, limit: int, cursor: t.Optional[Cursor] = None) -> t.List[Receipt]:
         raise NotImplementedError("method `.read_many()` must be implemented")
 
+    @abstractmethod
+    def read_results(self, receipt_uuid: UUID4) -> t.List[Result]:
+        # what each user owes for the receipt
+        raise NotImplementedError("method `.read_results()` must be implemented")
+
+
+class IReceiptSearchUC(ABC):
+    @abstractmethod
+    def search(
+            self,
+            user_id: UserId,
+            query: str,
+            limit: int,
+            cursor: t.Optional[SearchCursor] = None,
+    ) -> t.List[ReceiptMatch]:
+        # receipts of the user by store or product, best matches first
+        raise NotImplementedError("method `.search()` must be implemented")
+
 
 class IReceiptSplitUC(ABC):
 
     @abstractmethod
-    def split(self, receipt: Receipt, choices: t.List[Choice]):
-        # public split interface
+    def split(self, receipt: Receipt, choices: t.List[Choice]) -> Receipt:
+        # public split interface, returns the split receipt
         raise NotImplementedError("method `.create()` must be implemented")
 
 
@@ -0,0 +1,31 @@
+import itertools
+import typing as t
+from logging import getLogger
+
+from internal.domain.receipt import Receipt
+from internal.usecase.adapters.receipt import IBulkCreator
+from internal.usecase.interface import IReceiptIngestUC
+
+logger = getLogger("receipt.ingest")
+
+default_batch_size = 1000
+
+
+class ReceiptIngestUseCase(IReceiptIngestUC):
+    def __init__(self, creator: IBulkCreator, batch_size: int = default_batch_size):
+        self._creator = creator
+        self._batch_size = batch_size
+
+    def ingest(self, receipts: t.Iterable[Receipt]) -> int:
+        # receipts are loaded in batches, so the input can be streamed
+        created = 0
+        for batch in batched(receipts, self._batch_size):
+            created += self._creator.create_many(batch)
+            logger.info("receipts batch ingested: batch_size=%d, created=%d" % (len(batch), created))
+        return created
+
+
+def batched(iterable: t.Iterable[Receipt], size: int) -> t.Iterator[t.List[Receipt]]:
+    it = iter(iterable)
+    while batch := list(itertools.islice(it, size)):
+        yield batch
@@ -2,18 +2,24 @@ import typing as t
 
 from pydantic import UUID4
 
-from internal.domain.receipt import Receipt
+from internal.domain.receipt import Receipt, Result
+from internal.domain.receipt.cursor import Cursor
 from internal.domain.user.id import UserId
 from internal.usecase.adapters.receipt import IReader
+from internal.usecase.adapters.receipt import settlement
 from internal.usecase.interface import IReceiptReadUC
 
 
 class ReceiptReadUseCase(IReceiptReadUC):
-    def __init__(self, reader: IReader):
+    def __init__(self, reader: IReader, settlement_reader: settlement.IReader):
         self._reader = reader
+        self._settlement_reader = settlement_reader
 
     def read(self, receipt_uuid: UUID4) -> t.Optional[Receipt]:
         return self._reader.read_by_uuid(receipt_uuid)
 
-    def read_many(self, user_id: UserId, limit: int, offset: int) -> t.List[Receipt]:
-        return self._reader.read_many(user_id, limit, offset)
+    def read_many(self, user_id: UserId, limit: int, cursor: t.Optional[Cursor] = None) -> t.List[Receipt]:
+        return self._reader.read_many(user_id, limit, cursor)
+
+    def read_results(self, receipt_uuid: UUID4) -> t.List[Result]:
+        return self._settlement_reader.read_by_receipt_uuid(receipt_uuid)
@@ -0,0 +1,28 @@
+import typing as t
+
+from internal.domain.receipt import ReceiptMatch, ReceiptSearchError
+from internal.domain.receipt.cursor import SearchCursor
+from internal.domain.user.id import UserId
+from internal.usecase.adapters.receipt import ISearcher
+from internal.usecase.interface import IReceiptSearchUC
+
+# shorter queries have no trigram to look up in the indexes and would scan the tables
+min_query_length = 3
+
+
+class ReceiptSearchUseCase(IReceiptSearchUC):
+    def __init__(self, searcher: ISearcher):
+        self._searcher = searcher
+
+    def search(
+            self,
+            user_id: UserId,
+            query: str,
+            limit: int,
+            cursor: t.Optional[SearchCursor] = None,
+    ) -> t.List[ReceiptMatch]:
+        query = query.strip()
+        if len(query) < min_query_length:
+            raise ReceiptSearchError("search query must have at least %d characters" % min_query_length)
+
+        return self._searcher.search(user_id, query, limit, cursor)
@@ -1,8 +1,9 @@
 import typing as t
 from logging import getLogger
 
-from internal.domain.receipt import Receipt
-from internal.domain.receipt.item import Choice
+from internal.domain.receipt import Receipt, ReceiptReadError
+from internal.domain.receipt.item import Choice, ReceiptItemConflictError
+from internal.usecase.adapters.receipt import IReader
 from internal.usecase.adapters.receipt.item import IUpdater
 from internal.usecase.interface import (
     IUserReadUC,
@@ -11,19 +12,44 @@ from internal.usecase.interface import (
 
 logger = getLogger("receipt.split")
 
+default_attempts = 5
+
 
 class ReceiptSplitUseCase(IReceiptSplitUC):
     def __init__(
             self,
             user_uc: IUserReadUC,
+            receipt_reader: IReader,
             receipt_item_updater: IUpdater,
+            attempts: int = default_attempts,
     ):
         self._user_uc = user_uc
+        self._receipt_reader = receipt_reader
         self._receipt_item_updater = receipt_item_updater
+        self._attempts = attempts
+
+    def split(self, receipt: Receipt, choices: t.List[Choice]) -> Receipt:
+        # The items are saved only if nobody changed them since they were read (see
+        # ReceiptItemConflictError), otherwise the choices are applied again to the
+        # fresh receipt, so concurrent splits neither overwrite each other nor split
+        # an item beyond its quantity, and no rows are locked meanwhile.
+        for attempt in range(1, self._attempts + 1):
+            try:
+                self._receipt_item_updater.update_many(
+                    receipt.uuid,
+                    receipt.created_at,
+                    receipt.split(choices)
+                )
+            except ReceiptItemConflictError as err:
+                logger.info(
+                    "receipt split conflict: receipt_uuid=%s, attempt=%d, err=%s" % (receipt.uuid, attempt, err)
+                )
+                if attempt == self._attempts:
+                    raise
 
-    def split(self, receipt: Receipt, choices: t.List[Choice]):
-        # split receipt items
-        self._receipt_item_updater.update_many(
-            receipt.uuid,
-            receipt.split(choices)
-        )
+                receipt_uuid = receipt.uuid
+                receipt = self._receipt_reader.read_by_uuid(receipt_uuid)
+                if receipt is None:
+                    raise ReceiptReadError("receipt not found: receipt_uuid=%s" % receipt_uuid)
+            else:
+                return receipt
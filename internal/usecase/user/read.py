@@ -2,21 +2,18 @@ import typing as t
 
 from internal.domain.user import User
 from internal.domain.user.id import UserId
-from internal.usecase.adapters.user import IReader, ICreator
+from internal.usecase.adapters.user import IReader, IUpserter
 from internal.usecase.interface import IUserReadUC
 
 
 class UserReadUseCase(IUserReadUC):
-    def __init__(self, reader: IReader, creator: ICreator):
+    def __init__(self, reader: IReader, upserter: IUpserter):
         self._reader = reader
-        self._creator = creator
+        self._upserter = upserter
 
     def get_by_id(self, user_id: UserId) -> t.Optional[User]:
         return self._reader.read_by_id(user_id)
 
     def get_or_create(self, user: User) -> User:
-        exist = self._reader.read_by_id(user.user_id)
-        if exist:
-            return exist
-
-        return self._creator.create(user)
+        # one atomic statement, the username of an existing user is refreshed
+        return self._upserter.upsert_returning(user)
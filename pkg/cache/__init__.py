@@ -0,0 +1,5 @@
+from ._lru import LRUCache
+
+__all__ = (
+    'LRUCache',
+)
@@ -0,0 +1,72 @@
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+
+default_ttl = 300.0
+default_max_bytes = 64 * 1024 * 1024
+
+
+class LRUCache:
+    # Thread safe cache of serialized values bounded by their total size in bytes:
+    # the least recently used values are evicted beyond `max_bytes` and every value
+    # expires `ttl` seconds after it was set.
+    def __init__(self, max_bytes: int = default_max_bytes, ttl: float = default_ttl):
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        # key -> (expiry, value), least recently used first
+        self._values: t.OrderedDict[t.Hashable, t.Tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: t.Hashable) -> t.Optional[bytes]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._remove(key)
+                self._misses += 1
+                return None
+
+            self._values.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def set(self, key: t.Hashable, value: bytes):
+        if len(value) > self._max_bytes:
+            return
+
+        with self._lock:
+            if key in self._values:
+                self._remove(key)
+
+            self._values[key] = (time.monotonic() + self._ttl, value)
+            self._bytes += len(value)
+            while self._bytes > self._max_bytes:
+                self._remove(next(iter(self._values)))
+
+    def delete(self, key: t.Hashable):
+        with self._lock:
+            if key in self._values:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._bytes = 0
+
+    def stats(self) -> t.Dict[str, int]:
+        with self._lock:
+            return {
+                "items": len(self._values),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+    def _remove(self, key: t.Hashable):
+        _, value = self._values.pop(key)
+        self._bytes -= len(value)
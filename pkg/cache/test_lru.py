@@ -0,0 +1,51 @@
+import time
+
+from pkg.cache import LRUCache
+
+
+def test_get_set():
+    cache = LRUCache()
+    cache.set("a", b"1")
+
+    assert cache.get("a") == b"1"
+    assert cache.get("b") is None
+    assert cache.stats() == {"items": 1, "bytes": 1, "hits": 1, "misses": 1}
+
+
+def test_evicts_least_recently_used_beyond_max_bytes():
+    cache = LRUCache(max_bytes=10)
+    cache.set("a", b"x" * 4)
+    cache.set("b", b"x" * 4)
+    cache.get("a")
+    cache.set("c", b"x" * 4)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["bytes"] == 8
+
+
+def test_skips_values_larger_than_max_bytes():
+    cache = LRUCache(max_bytes=2)
+    cache.set("a", b"xxx")
+
+    assert cache.get("a") is None
+
+
+def test_expires():
+    cache = LRUCache(ttl=0.01)
+    cache.set("a", b"1")
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.stats()["items"] == 0
+
+
+def test_delete():
+    cache = LRUCache()
+    cache.set("a", b"1")
+    cache.delete("a")
+    cache.delete("b")
+
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
@@ -0,0 +1,3 @@
+from ._construct import construct
+
+__all__ = ('construct',)
@@ -0,0 +1,24 @@
+import typing as t
+
+from pydantic import BaseModel
+
+M = t.TypeVar("M", bound=BaseModel)
+
+_setattr = object.__setattr__
+
+
+def construct(cls: t.Type[M], **values: t.Any) -> M:
+    # Trusted construction of a pydantic model from values which already have the
+    # field types, e.g. decoded from our own typed schema. Neither validation nor
+    # defaults are applied, so every field must be given. Unlike `model_construct`,
+    # which walks the fields in python and is slower than validation in pydantic 2,
+    # the instance state is set directly.
+    ob = cls.__new__(cls)
+    _setattr(ob, "__dict__", values)
+    _setattr(ob, "__pydantic_fields_set__", set(values))
+    _setattr(ob, "__pydantic_extra__", None)
+    _setattr(ob, "__pydantic_private__", None)
+    if cls.__pydantic_post_init__:
+        # also initializes the private attributes
+        ob.model_post_init(None)
+    return ob
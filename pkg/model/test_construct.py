@@ -0,0 +1,25 @@
+import typing as t
+
+from pydantic import BaseModel, Field, PrivateAttr
+
+from ._construct import construct
+
+
+class Model(BaseModel):
+    name: str
+    tags: t.List[str] = Field(
+        default_factory=list
+    )
+    _cache: t.Dict[str, int] = PrivateAttr(
+        default_factory=dict
+    )
+
+
+def test_construct():
+    ob = construct(Model, name="name", tags=["a"])
+    assert ob == Model(name="name", tags=["a"])
+    assert ob.model_dump() == {"name": "name", "tags": ["a"]}
+    assert ob._cache == {}
+
+    ob.name = "other"
+    assert ob.name == "other"
@@ -0,0 +1,10 @@
+from ._allocate import allocate, share
+from ._minor import to_minor, from_minor, MINOR_UNITS
+
+__all__ = (
+    'allocate',
+    'share',
+    'to_minor',
+    'from_minor',
+    'MINOR_UNITS',
+)
@@ -0,0 +1,30 @@
+import typing as t
+from decimal import Decimal, ROUND_HALF_UP
+
+
+def allocate(amount: int, weights: t.Sequence[int], start: int = 0) -> t.List[int]:
+    # Parts of an amount of minor units in proportion to the weights, summing up to it
+    # exactly (largest remainder method): each part is rounded down and the units left
+    # go one by one to the parts with the largest remainders, on ties the first ones
+    # from the `start` index on (wrapping around).
+    whole = sum(weights)
+    if whole <= 0:
+        return [0] * len(weights)
+
+    parts = []
+    remainders = []
+    for i, weight in enumerate(weights):
+        part, remainder = divmod(amount * weight, whole)
+        parts.append(part)
+        remainders.append((-remainder, (i - start) % len(weights), i))
+
+    for _, _, i in sorted(remainders)[:amount - sum(parts)]:
+        parts[i] += 1
+    return parts
+
+
+def share(amount: int, part: int, whole: int) -> int:
+    # `part / whole` of an amount of minor units, rounded half away from zero
+    if whole <= 0:
+        return 0
+    return int((Decimal(amount) * part / whole).quantize(Decimal(1), rounding=ROUND_HALF_UP))
@@ -0,0 +1,17 @@
+import typing as t
+from decimal import Decimal, ROUND_HALF_UP
+
+# amounts are stored as integer counts of the minor currency unit (cents, tiyn, ...)
+MINOR_UNITS = 100
+
+
+def to_minor(amount: t.Optional[float]) -> t.Optional[int]:
+    if amount is None:
+        return None
+    return int((Decimal(str(amount)) * MINOR_UNITS).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_minor(amount: t.Optional[int]) -> t.Optional[float]:
+    if amount is None:
+        return None
+    return amount / MINOR_UNITS
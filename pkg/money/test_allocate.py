@@ -0,0 +1,20 @@
+from ._allocate import allocate, share
+
+
+def test_allocate():
+    assert allocate(100, [1, 1, 1]) == [34, 33, 33]
+    assert allocate(100, [1, 2]) == [33, 67]
+    assert allocate(-100, [1, 1, 1]) == [-33, -33, -34]
+    assert allocate(5, [0, 3]) == [0, 5]
+    assert allocate(5, [0, 0]) == [0, 0]
+    assert sum(allocate(1000001, [7, 13, 17, 1])) == 1000001
+    # ties from the start index on
+    assert allocate(100, [1, 1, 1], start=1) == [33, 34, 33]
+    assert allocate(101, [1, 1, 1], start=2) == [34, 33, 34]
+
+
+def test_share():
+    assert share(100000, 2, 3) == 66667
+    assert share(5, 1, 2) == 3
+    assert share(-5, 1, 2) == -3
+    assert share(100, 1, 0) == 0
@@ -0,0 +1,24 @@
+from .interface import ConnectionProvider
+from .pool import Pool
+from .router import Router
+from .async_pool import AsyncPool
+from .migrate import Migration, Migrator, load_migrations
+from .partition import Partitioner
+from .listen import Listener
+from .ring import HashRing
+from .timing import StatementTimer, name_statements
+
+__all__ = (
+    'ConnectionProvider',
+    'Pool',
+    'Router',
+    'AsyncPool',
+    'Migration',
+    'Migrator',
+    'load_migrations',
+    'Partitioner',
+    'Listener',
+    'HashRing',
+    'StatementTimer',
+    'name_statements',
+)
@@ -0,0 +1,76 @@
+import typing as t
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from logging import getLogger
+
+import psycopg
+from psycopg_pool import AsyncConnectionPool
+
+from .pool import default_min_size, default_max_size, default_timeout
+
+logger = getLogger("postgres.async_pool")
+
+
+class AsyncPool:
+    # asyncio counterpart of `Pool`: connections are checked out by tasks of one
+    # event loop, the unit of work is tracked per task
+    def __init__(
+            self,
+            conninfo: str,
+            min_size: int = default_min_size,
+            max_size: int = default_max_size,
+            timeout: float = default_timeout,
+            name: t.Optional[str] = None,
+    ):
+        # the pool is opened with `await pool.open()` from a running event loop
+        self._pool = AsyncConnectionPool(
+            conninfo=conninfo,
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+            check=AsyncConnectionPool.check_connection,
+            name=name,
+            open=False,
+        )
+        self._transaction: ContextVar[t.Optional[psycopg.AsyncConnection]] = ContextVar(
+            "postgres_async_transaction_%d" % id(self),
+            default=None,
+        )
+
+    async def open(self):
+        await self._pool.open()
+        logger.info("postgres async pool opened: min_size=%d, max_size=%d" % (self._pool.min_size, self._pool.max_size))
+
+    @asynccontextmanager
+    async def connection(self) -> t.AsyncIterator[psycopg.AsyncConnection]:
+        conn = self._transaction.get()
+        if conn is not None:
+            # join the running unit of work, which commits or rolls back as a whole
+            yield conn
+            return
+
+        async with self._pool.connection() as conn:
+            yield conn
+
+    @asynccontextmanager
+    async def transaction(self) -> t.AsyncIterator[psycopg.AsyncConnection]:
+        # see `Pool.transaction`
+        conn = self._transaction.get()
+        if conn is not None:
+            yield conn
+            return
+
+        async with self._pool.connection() as conn:
+            token = self._transaction.set(conn)
+            try:
+                async with conn.pipeline():
+                    yield conn
+            finally:
+                self._transaction.reset(token)
+
+    def stats(self) -> t.Dict[str, int]:
+        return self._pool.get_stats()
+
+    async def close(self):
+        await self._pool.close()
+        logger.info("postgres async pool closed")
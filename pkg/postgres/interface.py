@@ -0,0 +1,33 @@
+import typing as t
+from abc import ABC, abstractmethod
+
+import psycopg
+
+
+class ConnectionProvider(ABC):
+    @abstractmethod
+    def connection(self) -> t.ContextManager[psycopg.Connection]:
+        # connection to the primary, used for writes
+        raise NotImplementedError("method `.connection()` must be implemented")
+
+    @abstractmethod
+    def transaction(self) -> t.ContextManager[psycopg.Connection]:
+        # unit of work on the primary joined by every `connection()` inside it
+        raise NotImplementedError("method `.transaction()` must be implemented")
+
+    @abstractmethod
+    def replica(self, *keys: t.Hashable) -> t.ContextManager[psycopg.Connection]:
+        # connection for reads of the data identified by `keys`
+        raise NotImplementedError("method `.replica()` must be implemented")
+
+    def written(self, *keys: t.Hashable):
+        # marks the data identified by `keys` as just written
+        return None
+
+    @abstractmethod
+    def stats(self) -> t.Dict[str, t.Any]:
+        raise NotImplementedError("method `.stats()` must be implemented")
+
+    @abstractmethod
+    def close(self):
+        raise NotImplementedError("method `.close()` must be implemented")
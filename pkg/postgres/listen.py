@@ -0,0 +1,77 @@
+import select
+import threading
+import typing as t
+from logging import getLogger
+
+import psycopg
+from psycopg import sql
+
+logger = getLogger("postgres.listen")
+
+default_poll_interval = 1.0
+default_retry_interval = 5.0
+
+
+class Listener:
+    # Calls `on_notify(payload)` for each notification sent to `channel`, from a
+    # daemon thread holding a connection of its own (a pooled one can't stay
+    # listening). Notifications sent while the connection is lost are missed, so
+    # `on_reset()` is called each time listening (re)starts.
+    def __init__(
+            self,
+            conninfo: str,
+            channel: str,
+            on_notify: t.Callable[[str], None],
+            on_reset: t.Optional[t.Callable[[], None]] = None,
+            poll_interval: float = default_poll_interval,
+            retry_interval: float = default_retry_interval,
+    ):
+        self._conninfo = conninfo
+        self._channel = channel
+        self._on_notify = on_notify
+        self._on_reset = on_reset
+        self._poll_interval = poll_interval
+        self._retry_interval = retry_interval
+        self._stopped = threading.Event()
+        self._listening = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="listen-%s" % channel, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def wait(self, timeout: t.Optional[float] = None) -> bool:
+        # waits until the channel is listened to
+        return self._listening.wait(timeout)
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                with psycopg.connect(self._conninfo, autocommit=True) as conn:
+                    conn.add_notify_handler(self._notify)
+                    conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self._channel)))
+                    if self._on_reset is not None:
+                        self._on_reset()
+                    self._listening.set()
+                    logger.info("listening: channel=%s" % self._channel)
+
+                    while not self._stopped.is_set():
+                        # the notifications are read from the socket, and handed to the
+                        # handler, by the next command run on the connection
+                        if select.select([conn.fileno()], [], [], self._poll_interval)[0]:
+                            conn.execute(b"SELECT 1")
+            except psycopg.Error as e:
+                self._listening.clear()
+                logger.warning("listen err: channel=%s, err=%s" % (self._channel, e))
+                self._stopped.wait(self._retry_interval)
+
+        self._listening.clear()
+
+    def _notify(self, notify: psycopg.Notify):
+        try:
+            self._on_notify(notify.payload)
+        except Exception as e:
+            logger.error("notify handler err: channel=%s, payload=%s, err=%s" % (self._channel, notify.payload, e))
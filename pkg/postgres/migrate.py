@@ -0,0 +1,98 @@
+import os
+import typing as t
+from logging import getLogger
+
+from pydantic import BaseModel
+
+from .pool import Pool
+
+logger = getLogger("postgres.migrate")
+
+# arbitrary application wide key of the advisory lock serializing migration runs
+default_lock_key = 7_355_608
+
+CREATE_MIGRATION_TABLE_SQL = b"""
+    CREATE TABLE IF NOT EXISTS tbl_schema_migration (
+        version    integer PRIMARY KEY,
+        name       text NOT NULL,
+        applied_at timestamp with time zone NOT NULL DEFAULT now()
+    );
+"""
+
+SELECT_APPLIED_SQL = b"""
+    SELECT version FROM tbl_schema_migration;
+"""
+
+INSERT_APPLIED_SQL = b"""
+    INSERT INTO tbl_schema_migration (version, name) VALUES (%(version)s, %(name)s);
+"""
+
+LOCK_SQL = b"""
+    SELECT pg_advisory_lock(%(key)s);
+"""
+
+UNLOCK_SQL = b"""
+    SELECT pg_advisory_unlock(%(key)s);
+"""
+
+
+class Migration(BaseModel):
+    version: int
+    name: str
+    sql: str
+
+
+def load_migrations(path: str) -> t.List[Migration]:
+    # loads `<version>_<name>.sql` scripts of the directory ordered by version
+    migrations = []
+    for filename in os.listdir(path):
+        if not filename.endswith(".sql"):
+            continue
+        version, _, name = filename[:-len(".sql")].partition("_")
+        with open(os.path.join(path, filename), encoding="utf-8") as f:
+            migrations.append(
+                Migration(version=int(version), name=name, sql=f.read())
+            )
+
+    migrations.sort(key=lambda m: m.version)
+    return migrations
+
+
+class Migrator:
+    def __init__(self, pool: Pool, migrations: t.List[Migration], lock_key: int = default_lock_key):
+        self._pool = pool
+        self._migrations = migrations
+        self._lock_key = lock_key
+
+    def migrate(self) -> t.List[Migration]:
+        # Applies the pending migrations in version order, each one in its own transaction.
+        # Concurrent runs (e.g. several instances deployed at once) wait on an advisory
+        # lock, so every migration is applied exactly once.
+        applied = []
+        with self._pool.connection() as conn:
+            conn.autocommit = True
+            try:
+                conn.execute(LOCK_SQL, {"key": self._lock_key})
+                try:
+                    conn.execute(CREATE_MIGRATION_TABLE_SQL)
+                    done = {row[0] for row in conn.execute(SELECT_APPLIED_SQL)}
+
+                    for migration in self._migrations:
+                        if migration.version in done:
+                            continue
+
+                        with conn.transaction():
+                            conn.execute(migration.sql.encode("utf-8"))
+                            conn.execute(
+                                INSERT_APPLIED_SQL,
+                                {"version": migration.version, "name": migration.name}
+                            )
+
+                        applied.append(migration)
+                        logger.info("migration applied: version=%d, name=%s" % (migration.version, migration.name))
+                finally:
+                    conn.execute(UNLOCK_SQL, {"key": self._lock_key})
+            finally:
+                conn.autocommit = False
+
+        return applied
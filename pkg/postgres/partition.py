@@ -0,0 +1,244 @@
+import gzip
+import os
+import re
+import typing as t
+from datetime import datetime, UTC
+from logging import getLogger
+
+import psycopg
+from psycopg import sql
+
+from .pool import Pool
+
+logger = getLogger("postgres.partition")
+
+default_months_ahead = 3
+
+# partitions are named <table>_pYYYY_MM after the month they hold
+PARTITION_NAME_RE = re.compile(r"_p(\d{4})_(\d{2})$")
+
+IS_PARTITIONED_SQL = b"""
+    SELECT c.relkind = 'p'
+    FROM pg_class as c
+    WHERE c.oid = %(table)s::regclass;
+"""
+
+SELECT_PARTITIONS_SQL = b"""
+    SELECT c.relname
+    FROM pg_inherits as i
+    JOIN pg_class as c ON c.oid = i.inhrelid
+    WHERE i.inhparent = %(table)s::regclass
+    ORDER BY c.relname;
+"""
+
+
+class Partitioner:
+    # Monthly range partitioning of tables by a timestamptz column, all the tables
+    # being kept in step (the same months are created and archived together):
+    #  - `partition()` converts plain tables into partitioned ones in place, the
+    #    existing table (and its data) becomes the default partition,
+    #  - `create_ahead()` creates the partitions of the current and next months,
+    #  - `archive()` exports the partitions older than the retention to gzipped csv
+    #    files under `<archive_path>/<table>/` and drops them; rows of those months
+    #    left in the default partition are exported and deleted the same way.
+    def __init__(
+            self,
+            pool: Pool,
+            tables: t.Sequence[t.Tuple[str, str]],
+            archive_path: str,
+            months_ahead: int = default_months_ahead,
+            retention_months: t.Optional[int] = None,
+    ):
+        self._pool = pool
+        self._tables = tables
+        self._archive_path = archive_path
+        self._months_ahead = months_ahead
+        self._retention_months = retention_months
+
+    def run(self, now: t.Optional[datetime] = None) -> t.List[str]:
+        self.partition()
+        self.create_ahead(now)
+        return self.archive(now)
+
+    def partition(self) -> bool:
+        with self._pool.connection() as conn:
+            with conn.cursor() as cur:
+                if all(self._is_partitioned(cur, table) for table, _ in self._tables):
+                    return False
+
+                for table, column in self._tables:
+                    if self._is_partitioned(cur, table):
+                        continue
+
+                    # LIKE ... INCLUDING ALL copies the columns, defaults, constraints and
+                    # indexes; attaching as the default partition needs no rewrite
+                    cur.execute(
+                        sql.SQL(
+                            "ALTER TABLE {table} RENAME TO {default};"
+                            "CREATE TABLE {table} (LIKE {default} INCLUDING ALL) PARTITION BY RANGE ({column});"
+                            "ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT;"
+                        ).format(
+                            table=sql.Identifier(table),
+                            default=sql.Identifier(default_partition(table)),
+                            column=sql.Identifier(column),
+                        )
+                    )
+                    logger.info("table partitioned: table=%s, column=%s" % (table, column))
+
+        return True
+
+    def create_ahead(self, now: t.Optional[datetime] = None) -> t.List[str]:
+        created = []
+        start = month_start(now or datetime.now(UTC))
+        with self._pool.connection() as conn:
+            for i in range(self._months_ahead + 1):
+                lower = add_months(start, i)
+                for table, _ in self._tables:
+                    name = partition_name(table, lower)
+                    try:
+                        # a savepoint per partition: a month which already has rows in the
+                        # default partition can't get its own one and is skipped
+                        with conn.transaction():
+                            conn.execute(
+                                sql.SQL(
+                                    "CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                                    "FOR VALUES FROM ({lower}) TO ({upper})"
+                                ).format(
+                                    name=sql.Identifier(name),
+                                    table=sql.Identifier(table),
+                                    lower=sql.Literal(lower),
+                                    upper=sql.Literal(add_months(lower, 1)),
+                                )
+                            )
+                    except psycopg.errors.CheckViolation as e:
+                        logger.warning("partition skipped: partition=%s, err=%s" % (name, e))
+                    else:
+                        created.append(name)
+
+        return created
+
+    def archive(self, now: t.Optional[datetime] = None) -> t.List[str]:
+        if self._retention_months is None:
+            return []
+
+        archived = []
+        cutoff = add_months(month_start(now or datetime.now(UTC)), -self._retention_months)
+        # the exports of the default partitions of all the tables share a name
+        exported_at = datetime.now(UTC)
+        with self._pool.connection() as conn:
+            with conn.cursor() as cur:
+                for table, column in self._tables:
+                    os.makedirs(os.path.join(self._archive_path, table), exist_ok=True)
+
+                    cur.execute(SELECT_PARTITIONS_SQL, params={"table": table})
+                    for name in [row[0] for row in cur.fetchall()]:
+                        match = PARTITION_NAME_RE.search(name)
+                        if match is None or datetime(int(match[1]), int(match[2]), 1, tzinfo=UTC) >= cutoff:
+                            continue
+
+                        # the file is complete before the partition is dropped, a failure in
+                        # between leaves the partition attached to be exported again
+                        tmp, path = self._export(cur, sql.SQL("SELECT * FROM {}").format(sql.Identifier(name)), table, name)
+                        os.replace(tmp, path)
+                        cur.execute(
+                            sql.SQL("ALTER TABLE {table} DETACH PARTITION {name}; DROP TABLE {name};").format(
+                                table=sql.Identifier(table),
+                                name=sql.Identifier(name),
+                            )
+                        )
+                        conn.commit()
+                        archived.append(path)
+                        logger.info("partition archived: partition=%s, path=%s" % (name, path))
+
+                    archived.extend(self._archive_default(conn, cur, table, column, cutoff, exported_at))
+
+        return archived
+
+    def _archive_default(
+            self,
+            conn,
+            cur,
+            table: str,
+            column: str,
+            cutoff: datetime,
+            exported_at: datetime,
+    ) -> t.List[str]:
+        default = default_partition(table)
+        cur.execute(
+            sql.SQL("SELECT EXISTS (SELECT 1 FROM {default} WHERE {column} < %(cutoff)s)").format(
+                default=sql.Identifier(default),
+                column=sql.Identifier(column),
+            ),
+            params={"cutoff": cutoff},
+        )
+        if not cur.fetchone()[0]:
+            return []
+
+        # The rows are exported and deleted in one transaction and the file is published
+        # once it is committed, so none is exported twice. The exports are named after
+        # their time, as older rows may still arrive (e.g. ingested) after one.
+        name = "%s_%s" % (default, exported_at.strftime("%Y_%m_%d_%H%M%S"))
+        with conn.transaction():
+            cur.execute(
+                sql.SQL("LOCK TABLE {default} IN SHARE ROW EXCLUSIVE MODE").format(
+                    default=sql.Identifier(default),
+                )
+            )
+            tmp, path = self._export(
+                cur,
+                sql.SQL("SELECT * FROM {default} WHERE {column} < {cutoff}").format(
+                    default=sql.Identifier(default),
+                    column=sql.Identifier(column),
+                    cutoff=sql.Literal(cutoff),
+                ),
+                table,
+                name,
+            )
+            cur.execute(
+                sql.SQL("DELETE FROM {default} WHERE {column} < %(cutoff)s").format(
+                    default=sql.Identifier(default),
+                    column=sql.Identifier(column),
+                ),
+                params={"cutoff": cutoff},
+            )
+        conn.commit()
+        os.replace(tmp, path)
+        logger.info("default partition archived: table=%s, rows=%d, path=%s" % (table, cur.rowcount, path))
+        return [path]
+
+    def _export(self, cur, query: sql.Composable, table: str, name: str) -> t.Tuple[str, str]:
+        # writes the rows to a temporary file, which the caller renames to the returned path
+        path = os.path.join(self._archive_path, table, "%s.csv.gz" % name)
+        tmp = path + ".tmp"
+        # timestamps are written in UTC whatever the server time zone
+        cur.execute(b"SET LOCAL TIME ZONE 'UTC'")
+        with open(tmp, "wb") as f:
+            with gzip.GzipFile(fileobj=f, mode="wb") as gz:
+                with cur.copy(sql.SQL("COPY ({}) TO STDOUT (FORMAT csv, HEADER)").format(query)) as copy:
+                    for data in copy:
+                        gz.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp, path
+
+    @staticmethod
+    def _is_partitioned(cur, table: str) -> bool:
+        cur.execute(IS_PARTITIONED_SQL, params={"table": table})
+        return cur.fetchone()[0]
+
+
+def default_partition(table: str) -> str:
+    return "%s_default" % table
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return "%s_p%s" % (table, month.strftime("%Y_%m"))
+
+
+def month_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1, tzinfo=UTC)
+
+
+def add_months(dt: datetime, months: int) -> datetime:
+    month = dt.month - 1 + months
+    return dt.replace(year=dt.year + month // 12, month=month % 12 + 1)
@@ -0,0 +1,102 @@
+import typing as t
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from logging import getLogger
+
+import psycopg
+from psycopg_pool import ConnectionPool
+
+from .interface import ConnectionProvider
+from .timing import StatementTimer
+
+logger = getLogger("postgres.pool")
+
+default_min_size = 1
+default_max_size = 10
+default_timeout = 30.0
+
+
+class Pool(ConnectionProvider):
+    # Thread-safe provider of postgres connections shared by the storage repositories.
+    # A connection is checked out for the duration of a `with pool.connection()` block:
+    # the block is committed on success and rolled back on error, so one failed
+    # statement never poisons the connections used by other threads.
+    def __init__(
+            self,
+            conninfo: str,
+            min_size: int = default_min_size,
+            max_size: int = default_max_size,
+            timeout: float = default_timeout,
+            name: t.Optional[str] = None,
+            timer: t.Optional[StatementTimer] = None,
+    ):
+        self._pool = ConnectionPool(
+            conninfo=conninfo,
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+            # health check of idle connections on checkout
+            check=ConnectionPool.check_connection,
+            # the statements of the connections are timed by the timer
+            configure=timer.configure if timer is not None else None,
+            name=name,
+            open=True,
+        )
+        self._timer = timer
+        # connection of the unit of work running in the current thread / task
+        self._transaction: ContextVar[t.Optional[psycopg.Connection]] = ContextVar(
+            "postgres_transaction_%d" % id(self),
+            default=None,
+        )
+        logger.info("postgres pool opened: min_size=%d, max_size=%d" % (min_size, max_size))
+
+    @contextmanager
+    def connection(self) -> t.Iterator[psycopg.Connection]:
+        # raises psycopg_pool.PoolTimeout (an OperationalError) when no connection
+        # can be checked out within `timeout` seconds
+        conn = self._transaction.get()
+        if conn is not None:
+            # join the running unit of work, which commits or rolls back as a whole
+            yield conn
+            return
+
+        with self._pool.connection() as conn:
+            yield conn
+
+    @contextmanager
+    def transaction(self) -> t.Iterator[psycopg.Connection]:
+        # Unit of work: every `connection()` opened by any repository inside the block
+        # shares one connection and one transaction, which is committed once on exit.
+        # Statements are sent in pipeline mode, so they do not wait for each other's
+        # round trip; errors surface at the latest when the block exits.
+        conn = self._transaction.get()
+        if conn is not None:
+            yield conn
+            return
+
+        with self._pool.connection() as conn:
+            token = self._transaction.set(conn)
+            try:
+                with self._timed(conn), conn.pipeline():
+                    yield conn
+            finally:
+                self._transaction.reset(token)
+
+    @contextmanager
+    def replica(self, *keys: t.Hashable) -> t.Iterator[psycopg.Connection]:
+        # a single pool serves reads from the primary
+        with self.connection() as conn:
+            yield conn
+
+    def _timed(self, conn: psycopg.Connection) -> t.ContextManager[None]:
+        return self._timer.unit_of_work(conn) if self._timer is not None else nullcontext()
+
+    def in_transaction(self) -> bool:
+        return self._transaction.get() is not None
+
+    def stats(self) -> t.Dict[str, int]:
+        return self._pool.get_stats()
+
+    def close(self):
+        self._pool.close()
+        logger.info("postgres pool closed")
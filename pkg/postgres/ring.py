@@ -0,0 +1,37 @@
+import bisect
+import hashlib
+import typing as t
+
+# points of each node on the ring, more points spread the keys more evenly
+default_vnodes = 128
+
+
+class HashRing:
+    # Consistent hashing of keys to nodes (e.g. user ids to shards): each node owns
+    # `vnodes` points of a 64-bit ring and a key belongs to the node of the first point
+    # at or after its hash. Adding a node to N ones moves only about 1/(N+1) of the
+    # keys, all of them to the new node.
+    def __init__(self, nodes: t.Iterable[str], vnodes: int = default_vnodes):
+        self._nodes = sorted(set(nodes))
+        if not self._nodes:
+            raise ValueError("hash ring needs at least one node")
+
+        points = sorted(
+            (ring_hash("%s#%d" % (node, i)), node)
+            for node in self._nodes for i in range(vnodes)
+        )
+        self._hashes = [point[0] for point in points]
+        self._owners = [point[1] for point in points]
+
+    def node(self, key: t.Hashable) -> str:
+        i = bisect.bisect_left(self._hashes, ring_hash(str(key)))
+        # past the last point the ring wraps around to the first one
+        return self._owners[i % len(self._owners)]
+
+    def nodes(self) -> t.List[str]:
+        return list(self._nodes)
+
+
+def ring_hash(value: str) -> int:
+    # stable across processes and python versions, unlike hash()
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
@@ -0,0 +1,91 @@
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging import getLogger
+
+import psycopg
+
+from .interface import ConnectionProvider
+from .pool import Pool
+
+logger = getLogger("postgres.router")
+
+# how long reads of just written data stay on the primary, should exceed the replica lag
+default_sticky_for = 5.0
+
+
+class Router(ConnectionProvider):
+    # Routes writes to the primary pool and reads to the replica pool. Reads keep
+    # the read-your-writes guarantee when they
+    #  - run inside a unit of work or a `with router.primary()` block,
+    #  - or read data marked with `written()` less than `sticky_for` seconds ago
+    #    by this process (e.g. the receipt page re-read right after a split).
+    def __init__(self, writer: Pool, reader: Pool, sticky_for: float = default_sticky_for):
+        self._writer = writer
+        self._reader = reader
+        self._sticky_for = sticky_for
+        self._written: t.OrderedDict[t.Hashable, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self._primary: ContextVar[bool] = ContextVar("postgres_primary_%d" % id(self), default=False)
+
+    def connection(self) -> t.ContextManager[psycopg.Connection]:
+        return self._writer.connection()
+
+    def transaction(self) -> t.ContextManager[psycopg.Connection]:
+        return self._writer.transaction()
+
+    @contextmanager
+    def replica(self, *keys: t.Hashable) -> t.Iterator[psycopg.Connection]:
+        if self._primary.get() or self._writer.in_transaction() or self._is_sticky(keys):
+            with self._writer.connection() as conn:
+                yield conn
+            return
+
+        with self._reader.connection() as conn:
+            yield conn
+
+    @contextmanager
+    def primary(self) -> t.Iterator[None]:
+        token = self._primary.set(True)
+        try:
+            yield
+        finally:
+            self._primary.reset(token)
+
+    def written(self, *keys: t.Hashable):
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                self._written[key] = now
+                self._written.move_to_end(key)
+            # entries are ordered by write time, the expired ones are at the front
+            while self._written:
+                key, at = next(iter(self._written.items()))
+                if now - at < self._sticky_for:
+                    break
+                del self._written[key]
+
+    def _is_sticky(self, keys: t.Tuple[t.Hashable, ...]) -> bool:
+        if not keys:
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                at = self._written.get(key)
+                if at is not None and now - at < self._sticky_for:
+                    return True
+        return False
+
+    def stats(self) -> t.Dict[str, t.Any]:
+        return {
+            "writer": self._writer.stats(),
+            "reader": self._reader.stats(),
+        }
+
+    def close(self):
+        self._reader.close()
+        self._writer.close()
@@ -0,0 +1,32 @@
+from collections import Counter
+
+import pytest
+
+from .ring import HashRing
+
+
+def test_node():
+    ring = HashRing(["s1", "s2", "s3"])
+
+    assert ring.nodes() == ["s1", "s2", "s3"]
+    assert ring.node(42) == HashRing(["s3", "s1", "s2"]).node(42)
+
+    owners = Counter(ring.node(user_id) for user_id in range(30000))
+    assert set(owners) == {"s1", "s2", "s3"}
+    assert min(owners.values()) > 30000 / 3 * 0.8
+
+
+def test_node_added():
+    before = HashRing(["s1", "s2", "s3"])
+    after = HashRing(["s1", "s2", "s3", "s4"])
+
+    moved = [user_id for user_id in range(30000) if before.node(user_id) != after.node(user_id)]
+
+    # only the keys of the new node move
+    assert {after.node(user_id) for user_id in moved} == {"s4"}
+    assert 30000 / 4 * 0.8 < len(moved) < 30000 / 4 * 1.2
+
+
+def test_no_nodes():
+    with pytest.raises(ValueError):
+        HashRing([])
@@ -0,0 +1,223 @@
+import bisect
+import random
+import re
+import threading
+import time
+import typing as t
+from contextlib import contextmanager
+from logging import getLogger
+
+import psycopg
+from psycopg import pq
+
+logger = getLogger("postgres.timing")
+
+# upper bounds of the latency buckets in milliseconds, the last bucket is unbounded
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# statements slower than that are logged
+default_slow_ms = 200.0
+# share of the slow statements whose plan is captured, none by default
+default_explain_sample_rate = 0.0
+# seconds between the summaries of the timings in the log, never when None
+default_report_every: t.Optional[float] = None
+
+EXPLAIN_SQL = b"EXPLAIN "
+EXPLAIN_ANALYZE_SQL = b"EXPLAIN (ANALYZE, BUFFERS) "
+
+# the keywords of the statements which write, also in the CTEs of a WITH
+WRITES = re.compile(rb"\b(insert|update|delete|merge)\b", re.IGNORECASE)
+
+# the statements EXPLAIN takes, by their first keyword
+EXPLAINABLE = frozenset((b"select", b"insert", b"update", b"delete", b"with", b"values"))
+
+# names of the statement constants by their text, see `name_statements()`
+_statement_names: t.Dict[bytes, str] = {}
+
+
+def name_statements(prefix: str, namespace: t.Mapping[str, t.Any]):
+    # names the `*_SQL` constants of a module after the module, e.g. the timings of
+    # INSERT_RECEIPT_SQL of the receipt repository are those of
+    # `receipt.INSERT_RECEIPT_SQL`; to be called at the end of the module
+    for name, value in namespace.items():
+        if name.endswith("_SQL") and isinstance(value, bytes):
+            _statement_names.setdefault(value, "%s.%s" % (prefix, name))
+
+
+def statement_name(query: t.Any) -> str:
+    if isinstance(query, bytes):
+        name = _statement_names.get(query)
+        if name is not None:
+            return name
+        query = query.decode(errors="replace")
+
+    # the unnamed statements by their first keyword, which keeps the names few
+    words = query.split(None, 1) if isinstance(query, str) else []
+    return "other.%s" % words[0].lower() if words else "other"
+
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, elapsed_ms: float, rows: int):
+        self.count += 1
+        self.rows += max(rows, 0)
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+
+    def snapshot(self) -> t.Dict[str, t.Any]:
+        return {
+            "count": self.count,
+            "rows": self.rows,
+            "total_ms": round(self.total_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": {
+                ("<=%d" % bound if i < len(BUCKETS_MS) else ">%d" % BUCKETS_MS[-1]): count
+                for i, (bound, count) in enumerate(zip(BUCKETS_MS + (None,), self.buckets)) if count
+            },
+        }
+
+
+class StatementTimer:
+    # Latency histograms and row counts of the statements run through the cursors of
+    # the connections it configures (see the `timer` of Pool), by statement name (see
+    # `name_statements()`). Statements over `slow_ms` go to the slow statement log,
+    # `explain_sample_rate` of them with their plan: reads are run again under
+    # EXPLAIN (ANALYZE, BUFFERS), writes are planned by a plain EXPLAIN, so their work
+    # and row locks aren't repeated, both in a savepoint which is rolled back. Statements queued in pipeline mode don't wait for their results:
+    # the units of work of Pool are timed as a whole instead, named after the
+    # statements they queued (e.g. `uow:receipt.UPSERT_RECEIPT_SQL+...`).
+    def __init__(
+            self,
+            slow_ms: float = default_slow_ms,
+            explain_sample_rate: float = default_explain_sample_rate,
+            report_every: t.Optional[float] = default_report_every,
+    ):
+        self._slow_ms = slow_ms
+        self._explain_sample_rate = explain_sample_rate
+        self._report_every = report_every
+        self._reported_at = time.monotonic()
+        self._histograms: t.Dict[str, Histogram] = {}
+        # names of the statements queued by the running units of work, by connection
+        self._queued: t.Dict[int, t.List[str]] = {}
+        self._lock = threading.Lock()
+        self._cursor_factory = type("TimedCursor", (TimedCursor,), {"timer": self})
+
+    def configure(self, conn: psycopg.Connection):
+        # `configure` callback of the connection pools
+        conn.cursor_factory = self._cursor_factory
+
+    def record(self, cur: psycopg.Cursor, query: t.Any, params: t.Any, elapsed: float):
+        # the empty statements are the health checks of the pools
+        if not query:
+            return
+
+        name = statement_name(query)
+        if cur.connection.pgconn.pipeline_status != pq.PipelineStatus.OFF:
+            with self._lock:
+                queued = self._queued.get(id(cur.connection))
+                if queued is not None and name not in queued:
+                    queued.append(name)
+            return
+
+        plan = None
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms >= self._slow_ms and random.random() < self._explain_sample_rate:
+            plan = explain(cur.connection, query, params)
+        self._add(name, elapsed_ms, cur.rowcount, plan)
+
+    @contextmanager
+    def unit_of_work(self, conn: psycopg.Connection) -> t.Iterator[None]:
+        start = time.perf_counter()
+        with self._lock:
+            self._queued[id(conn)] = []
+        try:
+            yield
+        except BaseException:
+            with self._lock:
+                self._queued.pop(id(conn), None)
+            raise
+
+        with self._lock:
+            queued = self._queued.pop(id(conn), [])
+        if queued:
+            self._add("uow:%s" % "+".join(queued), (time.perf_counter() - start) * 1000, -1, None)
+
+    def _add(self, name: str, elapsed_ms: float, rows: int, plan: t.Optional[str]):
+        report = False
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.add(elapsed_ms, rows)
+
+            if self._report_every is not None and time.monotonic() - self._reported_at >= self._report_every:
+                self._reported_at = time.monotonic()
+                report = True
+
+        if elapsed_ms >= self._slow_ms:
+            logger.warning(
+                "slow statement: name=%s, elapsed_ms=%.1f, rows=%d%s"
+                % (name, elapsed_ms, rows, "\n" + plan if plan else "")
+            )
+
+        if report:
+            self.report()
+
+    def stats(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+        with self._lock:
+            return {name: histogram.snapshot() for name, histogram in sorted(self._histograms.items())}
+
+    def report(self):
+        for name, stats in self.stats().items():
+            logger.info("statement timings: name=%s, stats=%s" % (name, stats))
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+class TimedCursor(psycopg.Cursor):
+    timer: StatementTimer
+
+    def execute(self, query, params=None, **kwargs):
+        start = time.perf_counter()
+        cur = super().execute(query, params, **kwargs)
+        self.timer.record(self, query, params, time.perf_counter() - start)
+        return cur
+
+    def executemany(self, query, params_seq, **kwargs):
+        start = time.perf_counter()
+        super().executemany(query, params_seq, **kwargs)
+        self.timer.record(self, query, None, time.perf_counter() - start)
+
+
+def explain(conn: psycopg.Connection, query: t.Any, params: t.Any) -> t.Optional[str]:
+    # composed statements, those of executemany and those EXPLAIN doesn't take are not
+    # explained
+    if not isinstance(query, (bytes, str)) or (params is None and b"%(" in as_bytes(query)):
+        return None
+    words = as_bytes(query).split(None, 1)
+    if not words or words[0].lower() not in EXPLAINABLE:
+        return None
+
+    try:
+        # a plain cursor, its statement is not timed
+        with conn.transaction(force_rollback=True):
+            with psycopg.Cursor(conn) as cur:
+                explain_sql = EXPLAIN_SQL if WRITES.search(as_bytes(query)) else EXPLAIN_ANALYZE_SQL
+                cur.execute(explain_sql + as_bytes(query).strip().rstrip(b";"), params)
+                return "\n".join(row[0] for row in cur.fetchall())
+    except psycopg.Error as e:
+        logger.warning("explain statement err: %s" % e)
+        return None
+
+
+def as_bytes(query: t.Union[bytes, str]) -> bytes:
+    return query if isinstance(query, bytes) else query.encode()
@@ -0,0 +1,12 @@
+from .database import Database, SqliteDsn, database_path
+from .migrate import Migrator
+from .convert import to_micros, from_micros
+
+__all__ = (
+    'Database',
+    'SqliteDsn',
+    'database_path',
+    'Migrator',
+    'to_micros',
+    'from_micros',
+)
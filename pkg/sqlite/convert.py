@@ -0,0 +1,21 @@
+import typing as t
+from datetime import datetime, timedelta, UTC
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+MICROSECOND = timedelta(microseconds=1)
+
+
+# timestamps are stored as integer microseconds since the epoch, which sort as the
+# times they hold whatever their time zone, unlike iso strings
+
+def to_micros(dt: t.Optional[datetime]) -> t.Optional[int]:
+    if dt is None:
+        return None
+    return (dt - EPOCH) // MICROSECOND
+
+
+def from_micros(value: t.Optional[int]) -> t.Optional[datetime]:
+    if value is None:
+        return None
+    return EPOCH + value * MICROSECOND
@@ -0,0 +1,159 @@
+import queue
+import sqlite3
+import threading
+import typing as t
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging import getLogger
+
+from pydantic import AnyUrl, UrlConstraints
+from typing_extensions import Annotated
+
+from pkg import trgm
+
+logger = getLogger("sqlite.database")
+
+default_max_size = 10
+default_timeout = 30.0
+default_cached_statements = 256
+
+# sqlite:///relative/path.db or sqlite:////absolute/path.db
+SqliteDsn = Annotated[AnyUrl, UrlConstraints(allowed_schemes=["sqlite"])]
+
+
+def database_path(url: AnyUrl) -> str:
+    return url.path[1:]
+
+
+def similarity(a: t.Optional[str], b: t.Optional[str]) -> t.Optional[float]:
+    # similarity() of pg_trgm (see pkg.trgm)
+    return trgm.similarity(a, b) if a is not None and b is not None else None
+
+
+def word_similarity(query: t.Optional[str], value: t.Optional[str]) -> t.Optional[float]:
+    # word_similarity() of pg_trgm (see pkg.trgm)
+    return trgm.word_similarity(query, value) if query is not None and value is not None else None
+
+
+class Database:
+    # Thread-safe pool of connections to a SQLite database, the embedded counterpart
+    # of pkg.postgres.Pool for single node deployments:
+    #  - the database is in WAL mode, so readers don't block the writer nor the
+    #    writer the readers, and synchronous=NORMAL, which keeps it consistent on a
+    #    crash and only fsyncs on checkpoints,
+    #  - `connection()` is a write transaction started with BEGIN IMMEDIATE: it waits
+    #    for the write lock up front, while a deferred transaction upgrading to a
+    #    write fails with SQLITE_BUSY when another one wrote meanwhile,
+    #  - `reader()` is a read transaction, a consistent snapshot of the database,
+    #  - both are joined by the ones opened in the same thread inside them, and are
+    #    committed on success and rolled back on error,
+    #  - every connection caches `cached_statements` prepared statements by their text.
+    def __init__(
+            self,
+            path: str,
+            max_size: int = default_max_size,
+            timeout: float = default_timeout,
+            cached_statements: int = default_cached_statements,
+    ):
+        self._path = path
+        self._timeout = timeout
+        self._cached_statements = cached_statements
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._connections: t.List[sqlite3.Connection] = []
+        # connection of the transaction running in the current thread / task
+        self._transaction: ContextVar[t.Optional[sqlite3.Connection]] = ContextVar(
+            "sqlite_transaction_%d" % id(self),
+            default=None,
+        )
+        logger.info("sqlite database opened: path=%s, max_size=%d" % (path, max_size))
+
+    @contextmanager
+    def connection(self) -> t.Iterator[sqlite3.Connection]:
+        with self._begin("BEGIN IMMEDIATE") as conn:
+            yield conn
+
+    @contextmanager
+    def transaction(self) -> t.Iterator[sqlite3.Connection]:
+        # every write is a unit of work already, see pkg.postgres.Pool.transaction
+        with self.connection() as conn:
+            yield conn
+
+    @contextmanager
+    def reader(self) -> t.Iterator[sqlite3.Connection]:
+        with self._begin("BEGIN") as conn:
+            yield conn
+
+    def stats(self) -> t.Dict[str, int]:
+        return {
+            "pool_size": len(self._connections),
+            "pool_available": self._idle.qsize(),
+        }
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        logger.info("sqlite database closed")
+
+    @contextmanager
+    def _begin(self, begin: str) -> t.Iterator[sqlite3.Connection]:
+        conn = self._transaction.get()
+        if conn is not None:
+            # a write inside a reader upgrades its transaction, which may fail with
+            # SQLITE_BUSY: writes open the connection first
+            yield conn
+            return
+
+        conn = self._acquire()
+        token = self._transaction.set(conn)
+        try:
+            conn.execute(begin)
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+        finally:
+            self._transaction.reset(token)
+            self._release(conn)
+
+    def _acquire(self) -> sqlite3.Connection:
+        if not self._slots.acquire(timeout=self._timeout):
+            raise sqlite3.OperationalError("no sqlite connection available in %.1fs" % self._timeout)
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        try:
+            return self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, conn: sqlite3.Connection):
+        self._idle.put(conn)
+        self._slots.release()
+
+    def _connect(self) -> sqlite3.Connection:
+        # transactions are begun explicitly, the module's implicit ones are disabled
+        conn = sqlite3.connect(
+            self._path,
+            timeout=self._timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self._cached_statements,
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.create_function("similarity", 2, similarity, deterministic=True)
+        conn.create_function("word_similarity", 2, word_similarity, deterministic=True)
+        with self._lock:
+            self._connections.append(conn)
+        return conn
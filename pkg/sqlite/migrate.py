@@ -0,0 +1,67 @@
+import sqlite3
+import typing as t
+from logging import getLogger
+
+from pkg.postgres.migrate import Migration
+from .database import Database
+
+logger = getLogger("sqlite.migrate")
+
+CREATE_MIGRATION_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS tbl_schema_migration (
+        version    integer PRIMARY KEY,
+        name       text NOT NULL,
+        applied_at text NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+SELECT_APPLIED_SQL = """
+    SELECT version FROM tbl_schema_migration;
+"""
+
+INSERT_APPLIED_SQL = """
+    INSERT INTO tbl_schema_migration (version, name) VALUES (:version, :name);
+"""
+
+
+class Migrator:
+    # pkg.postgres.Migrator for sqlite: the pending migrations are applied in version
+    # order in one write transaction, whose lock serializes concurrent runs
+    def __init__(self, db: Database, migrations: t.List[Migration]):
+        self._db = db
+        self._migrations = migrations
+
+    def migrate(self) -> t.List[Migration]:
+        applied = []
+        with self._db.connection() as conn:
+            conn.execute(CREATE_MIGRATION_TABLE_SQL)
+            done = {row[0] for row in conn.execute(SELECT_APPLIED_SQL)}
+
+            for migration in self._migrations:
+                if migration.version in done:
+                    continue
+
+                for statement in split_statements(migration.sql):
+                    conn.execute(statement)
+                conn.execute(
+                    INSERT_APPLIED_SQL,
+                    {"version": migration.version, "name": migration.name}
+                )
+                applied.append(migration)
+
+        for migration in applied:
+            logger.info("migration applied: version=%d, name=%s" % (migration.version, migration.name))
+        return applied
+
+
+def split_statements(script: str) -> t.List[str]:
+    # `executescript` commits the running transaction, so scripts are run statement
+    # by statement; a statement ends on the line completing it
+    statements = []
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            statements.append(statement)
+            statement = ""
+    return statements
@@ -0,0 +1,95 @@
+import sqlite3
+import threading
+from datetime import datetime, UTC
+
+import pytest
+
+from .convert import to_micros, from_micros
+from .database import Database, similarity, word_similarity
+
+
+@pytest.fixture()
+def db(tmp_path) -> Database:
+    db = Database(str(tmp_path / "test.db"), max_size=4)
+    with db.connection() as conn:
+        conn.execute("CREATE TABLE tbl_test (id integer PRIMARY KEY, name text)")
+    yield db
+    db.close()
+
+
+def test_wal(db):
+    with db.reader() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_nested_connections_join(db):
+    with pytest.raises(ValueError):
+        with db.connection() as conn:
+            conn.execute("INSERT INTO tbl_test (id, name) VALUES (1, 'a')")
+            with db.connection() as nested:
+                assert nested is conn
+                nested.execute("INSERT INTO tbl_test (id, name) VALUES (2, 'b')")
+            raise ValueError("rolled back")
+
+    with db.reader() as conn:
+        assert conn.execute("SELECT count(*) FROM tbl_test").fetchone()[0] == 0
+
+    with db.connection() as conn:
+        conn.execute("INSERT INTO tbl_test (id, name) VALUES (1, 'a')")
+
+    with db.reader() as conn:
+        assert conn.execute("SELECT name FROM tbl_test").fetchall() == [("a",)]
+
+
+def test_concurrent_writes(db):
+    def write(i: int):
+        for _ in range(20):
+            with db.connection() as conn:
+                count = conn.execute("SELECT count(*) FROM tbl_test").fetchone()[0]
+                conn.execute("INSERT INTO tbl_test (id, name) VALUES (:id, :name)", {"id": count, "name": "%d" % i})
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # the writes were serialized: no two read the same count
+    with db.reader() as conn:
+        assert conn.execute("SELECT count(*), max(id) FROM tbl_test").fetchone() == (160, 159)
+    assert db.stats()["pool_size"] <= 4
+
+
+def test_similarity(db):
+    with db.reader() as conn:
+        row = conn.execute("SELECT similarity('word', 'two words'), word_similarity('word', 'two words')").fetchone()
+        assert row == (similarity("word", "two words"), word_similarity("word", "two words"))
+        assert conn.execute("SELECT word_similarity('word', NULL)").fetchone()[0] is None
+
+
+def test_micros():
+    dt = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=UTC)
+    assert from_micros(to_micros(dt)) == dt
+    assert to_micros(None) is None
+    assert isinstance(to_micros(dt), int)
+
+
+def test_timeout(tmp_path):
+    db = Database(str(tmp_path / "test.db"), max_size=1, timeout=0.1)
+    errors = []
+
+    def read():
+        try:
+            with db.reader():
+                pass
+        except sqlite3.OperationalError as e:
+            errors.append(e)
+
+    # the only connection is checked out by this thread
+    with db.reader():
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+
+    assert len(errors) == 1
+    db.close()
@@ -0,0 +1,43 @@
+import pytest
+
+from pkg.postgres.migrate import Migration
+from .database import Database
+from .migrate import Migrator, split_statements
+
+
+@pytest.fixture()
+def db(tmp_path) -> Database:
+    db = Database(str(tmp_path / "test.db"))
+    yield db
+    db.close()
+
+
+def test_migrate(db):
+    migrations = [
+        Migration(version=1, name="create", sql="CREATE TABLE tbl_test (id integer);\n-- comment\n"),
+        Migration(version=2, name="alter", sql="ALTER TABLE tbl_test\n    ADD COLUMN name text;\nCREATE INDEX idx_test ON tbl_test (name);"),
+    ]
+
+    assert [m.version for m in Migrator(db, migrations[:1]).migrate()] == [1]
+    assert [m.version for m in Migrator(db, migrations).migrate()] == [2]
+    assert Migrator(db, migrations).migrate() == []
+
+    with db.connection() as conn:
+        conn.execute("INSERT INTO tbl_test (id, name) VALUES (1, 'name')")
+
+
+def test_failed_migration_is_rolled_back(db):
+    migrations = [
+        Migration(version=1, name="create", sql="CREATE TABLE tbl_test (id integer);"),
+        Migration(version=2, name="broken", sql="ALTER TABLE tbl_missing ADD COLUMN name text;"),
+    ]
+
+    with pytest.raises(Exception):
+        Migrator(db, migrations).migrate()
+
+    assert [m.version for m in Migrator(db, migrations[:1]).migrate()] == [1]
+
+
+def test_split_statements():
+    script = "CREATE TABLE a (id integer);\nCREATE TABLE b (\n  name text -- ;\n);\n"
+    assert len(split_statements(script)) == 2
@@ -0,0 +1,9 @@
+from ._similarity import trigrams, similarity, word_similarity, score, word_similarity_threshold
+
+__all__ = (
+    'trigrams',
+    'similarity',
+    'word_similarity',
+    'score',
+    'word_similarity_threshold',
+)
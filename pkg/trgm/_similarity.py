@@ -0,0 +1,54 @@
+import re
+import typing as t
+
+# the default pg_trgm.word_similarity_threshold of postgres, which the `<%` operator
+# matches with
+word_similarity_threshold = 0.6
+
+_word = re.compile(r"[^\W_]+")
+
+
+def trigrams(value: str) -> t.List[str]:
+    # The trigrams of the words of the value in their order, as pg_trgm extracts them:
+    # the words are the runs of letters and digits, lowered and padded with two spaces
+    # before and one after.
+    grams = []
+    for word in _word.findall(value.lower()):
+        padded = "  " + word + " "
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: str, b: str) -> float:
+    # the trigrams shared by the strings over all of their trigrams, similarity() of pg_trgm
+    x, y = set(trigrams(a)), set(trigrams(b))
+    shared = len(x & y)
+    return shared / (len(x) + len(y) - shared) if x and y else 0.0
+
+
+def word_similarity(query: str, value: str) -> float:
+    # The greatest similarity of the trigrams of the query and a continuous extent of
+    # those of the value, word_similarity() of pg_trgm: 1 when the value has the query
+    # as a word whatever else it has.
+    query_grams = set(trigrams(query))
+    grams = trigrams(value)
+    best = 0.0
+    if not query_grams:
+        return best
+
+    for start in range(len(grams)):
+        extent = set()
+        shared = 0
+        for gram in grams[start:]:
+            if gram in extent:
+                continue
+            extent.add(gram)
+            shared += gram in query_grams
+            best = max(best, shared / (len(query_grams) + len(extent) - shared))
+    return best
+
+
+def score(query: str, value: str) -> float:
+    # Rank of the value found by the query, as the receipt searches order them: a
+    # value having the query as a word ranks higher the less else it has.
+    return (word_similarity(query, value) + similarity(query, value)) / 2
@@ -0,0 +1,24 @@
+import pytest
+
+from pkg.trgm import trigrams, similarity, word_similarity, score
+
+
+def test_trigrams():
+    assert trigrams("Word!") == ["  w", " wo", "wor", "ord", "rd "]
+    assert trigrams("a-b") == ["  a", " a ", "  b", " b "]
+    assert trigrams("") == []
+
+
+def test_similarity():
+    # the examples of the pg_trgm documentation
+    assert similarity("word", "two words") == pytest.approx(4 / 11)
+    assert word_similarity("word", "two words") == pytest.approx(0.8)
+
+    assert similarity("Кола", "кола") == word_similarity("Кола", "кола") == 1.0
+    assert similarity("", "cola") == word_similarity("", "cola") == 0.0
+
+
+def test_score():
+    assert score("fanta", "fanta") == 1.0
+    assert score("fanta", "fanta orange") == score("fanta", "orange fanta") > score("fanta", "fanta orange juice")
+    assert score("fanta", "fanta orange") > score("fant", "fanta orange")